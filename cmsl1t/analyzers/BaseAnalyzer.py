@@ -1,9 +1,17 @@
 import os
-from rootpy.io import root_open
-from rootpy import ROOTError
+from cmsl1t.io.manifest import read_manifest, write_manifest
+from cmsl1t.io.merge import merge_histogram_files
+from cmsl1t.io.npz import to_npz, from_npz
+from cmsl1t.plotting.cache import PlotCache
+from cmsl1t.plotting.render import PlotTask, render
 import logging
 logger = logging.getLogger(__name__)
 
+HIST_FORMATS = ('root', 'npz')
+# Settings of the analysis section that are handed to the plotters that have
+# them, e.g. cmsl1t.plotting.efficiency.EfficiencyPlot
+PLOTTER_SETTINGS = ('fit_backend', 'fit_workers')
+
 
 class BaseAnalyzer(object):
     DEFAULT_OUTPUT_FORMAT = 'pdf'
@@ -28,6 +36,52 @@ class BaseAnalyzer(object):
     def params(self):
         return self.__params
 
+    @property
+    def plot_workers(self):
+        """Number of processes used to draw the plots (analysis: plot_workers)"""
+        return self.__params.get('plot_workers', 1)
+
+    @property
+    def merge_workers(self):
+        """
+        Number of processes used to merge histogram files
+        (analysis: merge_workers)
+        """
+        return self.__params.get('merge_workers', 1)
+
+    @property
+    def hist_format(self):
+        """
+        Format of the histogram files (analysis: hist_format): root for
+        pickled plotters, npz for cmsl1t.io.npz
+        """
+        hist_format = self.__params.get('hist_format', 'root')
+        if hist_format not in HIST_FORMATS:
+            raise ValueError("Unknown hist_format '{0}', use one of {1}".format(
+                hist_format, HIST_FORMATS))
+        return hist_format
+
+    @property
+    def plotter_settings(self):
+        """
+        Settings for the plotters (analysis: fit_backend, see
+        cmsl1t.utils.fit_cache.BACKENDS, and fit_workers, the number of
+        processes used for the fits)
+        """
+        return {name: self.__params[name] for name in PLOTTER_SETTINGS
+                if name in self.__params}
+
+    @property
+    def plot_cache(self):
+        """
+        Cache of the plots drawn by previous runs in the same output folder,
+        None if disabled (analysis: plot_cache: False)
+        """
+        if not self.__params.get('plot_cache', True):
+            return None
+        output_file = self._plot_cache_format.format(analyzer=self.name)
+        return PlotCache(os.path.join(self.output_folder, output_file))
+
     def prepare_for_events(self, reader):
         """
         Can be overloaded in the derived class.
@@ -69,14 +123,72 @@ class BaseAnalyzer(object):
           Should return True if histograms were written without problem.
           If anything else is returned, processing of the trees will stop
         """
+        if input_filename.endswith('.npz'):
+            return self.reload_histogram_files([input_filename])
+        plots = self.all_plots
+        manifest = read_manifest(input_filename)
+        if manifest is not None:
+            # Only read the directories that are in the file
+            plots = [hist for hist in plots
+                     if hist.directory_name in manifest['directories']]
+            if len(plots) < len(self.all_plots):
+                logger.warning("{0} has histograms for {1} of {2} plotters".format(
+                    input_filename, len(plots), len(self.all_plots)))
+        from rootpy.io import root_open
         results = []
         with root_open(input_filename, "r") as input_file:
-            for hist in self.all_plots:
+            for hist in plots:
                 indir = input_file.GetDirectory(hist.directory_name)
                 results.append(hist.from_root(indir))
         ok = all(results)
         return ok
 
+    def reload_histogram_files(self, input_filenames):
+        """
+        Read back and merge the histograms of several files.  npz files written
+        with the same configuration are summed as arrays before anything is
+        merged into the plotters, ROOT files are reloaded one by one.
+
+        returns:
+          Should return True if histograms were read without problem.
+        """
+        npz_files = [name for name in input_filenames if name.endswith('.npz')]
+        results = [self.reload_histograms(name) for name in input_filenames
+                   if name not in npz_files]
+        if not npz_files:
+            return all(results)
+
+        for reloaded in from_npz(npz_files):
+            for hist in self.all_plots:
+                if hist.directory_name not in reloaded:
+                    logger.error("No histograms for {0} in {1}".format(
+                        hist.directory_name, npz_files))
+                    results.append(False)
+                    continue
+                results.append(hist.merge_in(reloaded[hist.directory_name]))
+        return all(results)
+
+    def merge_histogram_files(self, input_filenames):
+        """
+        Same as reload_histogram_files, but with merge_workers > 1 the files
+        are merged in parallel by cmsl1t.io.merge.  Files that cannot be read
+        are then reported and left out, and an interrupted merge can be
+        resumed.
+
+        returns:
+          Should return True if all histograms were read without problem.
+        """
+        reload_histograms = getattr(type(self).reload_histograms, '__func__',
+                                    type(self).reload_histograms)
+        # Analyzers that reload their histograms themselves are not supported
+        custom = reload_histograms is not _base_reload_histograms
+        if self.merge_workers < 2 or len(input_filenames) < 3 or custom:
+            return self.reload_histogram_files(input_filenames)
+        work_dir = self._merge_dir_format.format(analyzer=self.name)
+        return merge_histogram_files(
+            self, input_filenames, os.path.join(self.output_folder, work_dir),
+            self.merge_workers)
+
     def write_histograms(self):
         """
         Called after all events have been read, so that histograms can be
@@ -88,14 +200,25 @@ class BaseAnalyzer(object):
           Should return True if histograms were written without problem.
           If anything else is returned, processing of the trees will stop
         """
-        results = []
         outname = self.get_histogram_filename()
+        if self.hist_format == 'npz':
+            # Same as for ROOT files, never overwrite existing histograms
+            if not os.path.exists(outname):
+                logger.info("Saving histograms to: " + outname)
+                to_npz(self.all_plots, outname)
+                write_manifest(outname, self.name, self.all_plots)
+            return True
+
+        from rootpy import ROOTError
+        from rootpy.io import root_open
+        results = []
         try:
             with root_open(outname, "new") as outfile:
                 logger.info("Saving histograms to: " + outname)
                 for hist in self.all_plots:
                     outdir = outfile.mkdir(hist.directory_name)
                     results.append(hist.to_root(outdir))
+            write_manifest(outname, self.name, self.all_plots)
         except ROOTError:
             # Root file already exists, not handled by root_open
             pass
@@ -105,15 +228,15 @@ class BaseAnalyzer(object):
         """
         Called after all events have been read to convert histograms to actual
         plots Might be called on existing files of histograms (ie. without
-        reading tuples in again)
+        reading tuples in again).  Plotters that have not changed since the
+        last run are not drawn again, see cmsl1t.plotting.cache
 
         returns:
           Should return True if plots were produced without problem.
           If anything else is returned, processing of the trees will stop
         """
-        for plot in self.all_plots:
-            plot.draw()
-        return True
+        tasks = [PlotTask(plot) for plot in self.all_plots]
+        return render(tasks, self.plot_workers, self.plot_cache)
 
     def finalize(self):
         """
@@ -129,15 +252,27 @@ class BaseAnalyzer(object):
         Register a plotter with this analyzer, and set up it's outputs
         """
         plotter.set_plot_output_cfg(self.plots_folder, self.file_format)
+        for name, value in self.plotter_settings.items():
+            if hasattr(plotter, name):
+                setattr(plotter, name, value)
         self.all_plots.append(plotter)
 
-    _hist_file_format = "{analyzer}_histograms.root"
+    _hist_file_format = "{analyzer}_histograms.{extension}"
+    _plot_cache_format = ".{analyzer}_plot_cache.json"
+    _merge_dir_format = ".{analyzer}_merge"
 
     def get_histogram_filename(self):
-        output_file = self._hist_file_format.format(analyzer=self.name)
+        output_file = self._hist_file_format.format(
+            analyzer=self.name, extension=self.hist_format)
         return os.path.join(self.output_folder, output_file)
 
     def might_contain_histograms(self, filename):
-        this_file = self._hist_file_format.format(analyzer=self.name)
+        these_files = [self._hist_file_format.format(
+            analyzer=self.name, extension=extension)
+            for extension in HIST_FORMATS]
         base = os.path.basename(filename)
-        return base == this_file
+        return base in these_files
+
+
+_base_reload_histograms = getattr(BaseAnalyzer.reload_histograms, '__func__',
+                                  BaseAnalyzer.reload_histograms)
@@ -0,0 +1,56 @@
+from cmsl1t.analyzers.BaseAnalyzer import BaseAnalyzer
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ColumnarAnalyzer(BaseAnalyzer):
+    """
+    A Base class for analyzers that fill their histograms from chunks of
+    events at a time, rather than one event at a time.
+
+    Derived classes declare the aliases they need in `inputs` and implement
+    fill_histograms_batch.  They can run in the same job as per-event
+    analyzers; bin/cmsl1t reads the inputs of all columnar analyzers with a
+    single cmsl1t.io.batchreader.BatchReader.
+    """
+    inputs = []
+
+    def prepare_for_batches(self, reader):
+        """
+        Can be overloaded in the derived class.
+        Called once, after the batch reader has been prepared, instead of
+        prepare_for_events, which it calls by default so that columnar ports
+        can share the histograms of the per-event analyzer.
+
+        returns:
+          Should return True if everything was prepared ok.
+          If anything else is returned, processing will stop
+        """
+        return self.prepare_for_events(reader)
+
+    def process_batch(self, entries, batch):
+        """Should not really be overloaded in the derived class"""
+        return self.fill_histograms_batch(entries, batch)
+
+    def fill_histograms_batch(self, entries, batch):
+        """
+        Has to be overloaded by users code.
+
+        Called once per chunk of input events in the tuples.
+
+        parameters:
+         - entries -- numpy array with the indices of the entries in the chunk
+         - batch -- dict of alias -> numpy array (one value per event) or
+                    cmsl1t.jagged.JaggedArray (many values per event)
+
+        returns:
+          Should return True if histograms were filled without problem.
+          If anything else is returned, processing of the trees will stop
+        """
+        raise NotImplementedError(
+            "fill_histograms_batch needs to be implemented")
+
+    def fill_histograms(self, entry, event):
+        raise NotImplementedError(
+            "{0} is a columnar analyzer, use fill_histograms_batch".format(
+                self.name))
@@ -8,8 +8,7 @@ import ROOT
 from tabulate import tabulate
 import os
 from cmsl1t.analyzers.BaseAnalyzer import BaseAnalyzer
-from cmsl1t.plotting.rates import RatesPlot
-from cmsl1t.plotting.rate_vs_pileup import RateVsPileupPlot
+from cmsl1t.plotting.paired_rates import PairedRatesPlot
 from cmsl1t.filters import LuminosityFilter
 import cmsl1t.hist.binning as bn
 from cmsl1t.utils.hist import cumulative_hist, normalise_to_collision_rate
@@ -69,35 +68,32 @@ class Analyzer(BaseAnalyzer):
         self._lastRunAndLumi = (-1, -1)
         self._processLumi = True
         self._sumTypes, self._jetTypes = types()
+        # HW and Emu are filled into the same plotter
+        self._pairedTypes = [name for name in self._sumTypes + self._jetTypes
+                             if '_Emu' not in name]
+        self._split_plots = []
 
-        for name in self._sumTypes + self._jetTypes:
-            rates_plot = RatesPlot(name)
-            self.register_plotter(rates_plot)
-            setattr(self, name + "_rates", rates_plot)
-
-            rate_vs_pileup_plot = RateVsPileupPlot(name)
-            self.register_plotter(rate_vs_pileup_plot)
-            setattr(self, name + "_rate_vs_pileup", rate_vs_pileup_plot)
+        for name in self._pairedTypes:
+            paired_plot = PairedRatesPlot(name)
+            self.register_plotter(paired_plot)
+            setattr(self, name + "_paired", paired_plot)
 
     def prepare_for_events(self, reader):
         # bins = np.arange(0.0, 400.0, 1.0)
         puBins = self.puBins
         thresholds = self.thresholds
 
-        for name in self._sumTypes + self._jetTypes:
+        for name in self._pairedTypes:
             trig_thresholds = thresholds.get(name)
-            if(trig_thresholds is None):
-                if "Emu" in name:
-                    trig_thresholds = thresholds.get(name.replace('_Emu', ''))
-                else:
-                    print(
-                        'Error: Please specify thresholds in the config .yaml in dictionary format')
-
-            rates_plot = getattr(self, name + "_rates")
-            rates_plot.build("L1 " + name, puBins, 200, 0, 200, ETA_RANGES.get(name))
+            if trig_thresholds is None:
+                print(
+                    'Error: Please specify thresholds in the config .yaml in dictionary format')
+            emu_thresholds = thresholds.get(name + '_Emu', trig_thresholds)
 
-            rate_vs_pileup_plot = getattr(self, name + "_rate_vs_pileup")
-            rate_vs_pileup_plot.build("L1 " + name, trig_thresholds, 16, 0, 80, ETA_RANGES.get(name))
+            paired_plot = getattr(self, name + "_paired")
+            paired_plot.build("L1 " + name, puBins, trig_thresholds,
+                              200, 0, 200, 16, 0, 80, ETA_RANGES.get(name),
+                              emu_thresholds=emu_thresholds)
 
         '''
         self.rates = HistogramsByPileUpCollection(
@@ -129,82 +125,24 @@ class Analyzer(BaseAnalyzer):
         # Sums:
         online = extractSums(event)
         for name in self._sumTypes:
-            on = online[name]
-            getattr(self, name + "_rates").fill(pileup, on.et)
-            getattr(self, name + "_rate_vs_pileup").fill(pileup, on.et)
-
-        # All jets:
-        l1JetEts = [jet.et for jet in event.l1Jets]
-        nJets = len(l1JetEts)
-        if nJets > 0:
-            maxL1JetEt = max(l1JetEts)
-        else:
-            maxL1JetEt = 0.
-
-        l1EmuJetEts = [jet.et for jet in event.l1EmuJets]
-        nEmuJets = len(l1EmuJetEts)
-        if nEmuJets > 0:
-            maxL1EmuJetEt = max(l1EmuJetEts)
-        else:
-            maxL1EmuJetEt = 0.
-
-        # Central Jets:
-        l1BEJets = [jet for jet in event.l1Jets if abs(jet.eta) < 3.0]
-        l1BEJetEts = [beJet.et for beJet in l1BEJets]
-        nBEJets = len(l1BEJets)
-        if nBEJets > 0:
-            maxL1BEJetEt = max(l1BEJetEts)
-        else:
-            maxL1BEJetEt = 0.
-
-        l1EmuBEJets = [jet for jet in event.l1EmuJets if abs(jet.eta) < 3.0]
-        l1EmuBEJetEts = [beJet.et for beJet in l1EmuBEJets]
-        nEmuBEJets = len(l1EmuBEJetEts)
-        if nEmuBEJets > 0:
-            maxL1EmuBEJetEt = max(l1EmuBEJetEts)
-        else:
-            maxL1EmuBEJetEt = 0.
-
-        # Forward Jets
-        l1HFJets = [jet for jet in event.l1Jets if abs(jet.eta) > 3.0]
-        l1HFJetEts = [hfJet.et for hfJet in l1HFJets]
-        nHFJets = len(l1HFJetEts)
-        if nHFJets > 0:
-            maxL1HFJetEt = max(l1HFJetEts)
-        else:
-            maxL1HFJetEt = 0.
-
-        l1EmuHFJets = [jet for jet in event.l1EmuJets if abs(jet.eta) > 3.0]
-        l1EmuHFJetEts = [hfJet.et for hfJet in l1EmuHFJets]
-        nEmuHFJets = len(l1EmuHFJetEts)
-        if nEmuHFJets > 0:
-            maxL1EmuHFJetEt = max(l1EmuHFJetEts)
-        else:
-            maxL1EmuHFJetEt = 0.
+            if "_Emu" in name:
+                continue
+            getattr(self, name + "_paired").fill(
+                pileup, online[name].et, online[name + "_Emu"].et, entry)
+
+        # Central (BE) and forward (HF) jets:
+        maxJetEts = {}
+        for suffix, jets in [('', event.l1Jets), ('_Emu', event.l1EmuJets)]:
+            beJetEts = [jet.et for jet in jets if abs(jet.eta) < 3.0]
+            hfJetEts = [jet.et for jet in jets if abs(jet.eta) > 3.0]
+            maxJetEts['JetET_BE' + suffix] = max(beJetEts) if beJetEts else 0.
+            maxJetEts['JetET_HF' + suffix] = max(hfJetEts) if hfJetEts else 0.
 
         for name in self._jetTypes:
-            if 'Emu' in name:
-                if 'BE' in name:
-                    getattr(self, name + '_rates').fill(pileup, maxL1EmuBEJetEt)
-                    getattr(self, name + '_rate_vs_pileup').fill(pileup,
-                                                                 maxL1EmuBEJetEt)
-                elif 'HF' in name:
-                    getattr(self, name + '_rates').fill(pileup, maxL1EmuHFJetEt)
-                    getattr(self, name + '_rate_vs_pileup').fill(pileup,
-                                                                 maxL1EmuHFJetEt)
-                else:
-                    getattr(self, name + '_rates').fill(pileup, maxL1EmuJetEt)
-                    getattr(self, name + '_rate_vs_pileup').fill(pileup, maxL1EmuJetEt)
-            else:
-                if 'BE' in name:
-                    getattr(self, name + '_rates').fill(pileup, maxL1BEJetEt)
-                    getattr(self, name + '_rate_vs_pileup').fill(pileup, maxL1BEJetEt)
-                elif 'HF' in name:
-                    getattr(self, name + '_rates').fill(pileup, maxL1HFJetEt)
-                    getattr(self, name + '_rate_vs_pileup').fill(pileup, maxL1HFJetEt)
-                else:
-                    getattr(self, name + '_rates').fill(pileup, maxL1JetEt)
-                    getattr(self, name + '_rate_vs_pileup').fill(pileup, maxL1JetEt)
+            if "_Emu" in name:
+                continue
+            getattr(self, name + "_paired").fill(
+                pileup, maxJetEts[name], maxJetEts[name + "_Emu"], entry)
 
         return True
 
@@ -230,19 +168,19 @@ class Analyzer(BaseAnalyzer):
                 'Error: Please specify thresholds in the config .yaml in dictionary format')
 
         # print hw vs emu for rates and rate vs pileup
-        for histo_name in self._sumTypes + self._jetTypes:
-            if "_Emu" in histo_name:
-                continue
-            plotter = getattr(self, histo_name + '_rates')
-            emu_plotter = getattr(self, histo_name + '_Emu_rates')
+        self._split_plots = []
+        for histo_name in self._pairedTypes:
+            paired_plot = getattr(self, histo_name + '_paired')
+            plotter, emu_plotter = paired_plot.to_rates_plots()
             plotter.overlay_with_emu(emu_plotter)
+            self._split_plots += [plotter, emu_plotter]
 
-            plotter = getattr(self, histo_name + '_rate_vs_pileup')
-            emu_plotter = getattr(self, histo_name + "_Emu" + '_rate_vs_pileup')
+            plotter, emu_plotter = paired_plot.to_rate_vs_pileup_plots()
             plotter.overlay_with_emu(emu_plotter)
+            self._split_plots += [plotter, emu_plotter]
 
         # calculate cumulative histograms
-        for plot in self.all_plots:
+        for plot in self._split_plots:
             if 'rate_vs_pileup' not in plot.filename_format:
                 hist = plot.plots.get_bin_contents([bn.Base.everything])
                 hist = cumulative_hist(hist)
@@ -292,11 +230,24 @@ class Analyzer(BaseAnalyzer):
 
     def finalize(self):
         self.__print_histogram_statistics()
+        self.__print_hw_emu_disagreements()
         return True
 
+    def __print_hw_emu_disagreements(self):
+        paired_plots = [getattr(self, name + '_paired') for name in self._pairedTypes]
+        df = pd.concat([plot.get_disagreements() for plot in paired_plots], sort=False)
+        df.fillna('------', inplace=True)
+        print('HW vs Emu disagreements:')
+        print(tabulate(df, headers='keys', tablefmt='psql', showindex=False))
+
+        df = pd.concat([plot.get_mismatches() for plot in paired_plots], sort=False)
+        df_output = os.path.join(self.output_folder, 'hw_emu_mismatches.csv')
+        df.to_csv(df_output)
+        print('Saved', len(df), 'HW vs Emu mismatches to', df_output)
+
     def __print_histogram_statistics(self):
         all_stats = {}
-        for plot in self.all_plots:
+        for plot in self._split_plots:
             # different hist collection will have different stats formats!
             collection_type = type(plot).__name__
             if collection_type not in all_stats:
@@ -0,0 +1,62 @@
+"""
+Columnar version of cmsl1t.analyzers.HW_Emu_jetMet_rates.
+Produces the same histograms, but fills them from chunks of events.
+"""
+from __future__ import division, print_function
+import numpy as np
+from cmsl1t.analyzers.ColumnarAnalyzer import ColumnarAnalyzer
+from cmsl1t.analyzers.HW_Emu_jetMet_rates import Analyzer as EventAnalyzer
+from cmsl1t.producers.l1sums import batch_sums
+
+SUM_INPUTS = ['L1Upgrade_sumBx', 'L1Upgrade_sumType',
+              'L1Upgrade_sumEt', 'L1Upgrade_sumPhi']
+JET_INPUTS = ['L1Upgrade_jetEt', 'L1Upgrade_jetEta', 'L1Upgrade_jetBx']
+
+
+def extractSums(batch):
+    hw = batch_sums(*[batch[i] for i in SUM_INPUTS])
+    emu = batch_sums(*[batch['emu_' + i] for i in SUM_INPUTS])
+    online = dict(
+        HT=hw['Htt'][0],
+        METBE=hw['Met'][0],
+        METHF=hw['MetHF'][0],
+        HT_Emu=emu['Htt'][0],
+        METBE_Emu=emu['Met'][0],
+        METHF_Emu=emu['MetHF'][0],
+    )
+    return online
+
+
+def extractMaxJetEts(batch):
+    maxJetEts = {}
+    for prefix, suffix in [('', ''), ('emu_', '_Emu')]:
+        et, eta, bx = [batch[prefix + i] for i in JET_INPUTS]
+        in_bx = bx.content == 0
+        abs_eta = np.abs(eta.content)
+        maxJetEts['JetET_BE' + suffix] = et.select(in_bx & (abs_eta < 3.0)).max()
+        maxJetEts['JetET_HF' + suffix] = et.select(in_bx & (abs_eta > 3.0)).max()
+    return maxJetEts
+
+
+class Analyzer(ColumnarAnalyzer, EventAnalyzer):
+    inputs = ['run', 'lumi', 'nVertex'] + SUM_INPUTS + JET_INPUTS + \
+        ['emu_' + i for i in SUM_INPUTS + JET_INPUTS]
+
+    def fill_histograms_batch(self, entries, batch):
+        if self._lumiFilter is not None:
+            selected = self._lumiFilter.mask(batch['run'], batch['lumi'])
+            batch = {alias: values[selected] for alias, values in batch.items()}
+            entries = entries[selected]
+        # If the ntuples have no reco trees, fill the (only) pu bin
+        if 'nVertex' in batch:
+            pileup = batch['nVertex']
+        else:
+            pileup = np.ones(len(batch['run']))
+
+        online = extractSums(batch)
+        online.update(extractMaxJetEts(batch))
+        for name in self._pairedTypes:
+            getattr(self, name + "_paired").fill_batch(
+                pileup, online[name], online[name + "_Emu"], entries)
+
+        return True
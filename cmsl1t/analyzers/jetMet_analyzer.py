@@ -15,6 +15,7 @@ import pprint
 from collections import namedtuple
 import numpy as np
 from cmsl1t.jet import match
+from cmsl1t.plotting.render import PlotTask, render
 
 
 def types(doEmu, doReco, doGen):
@@ -555,119 +556,24 @@ class Analyzer(BaseAnalyzer):
         """
         Custom version, does what the normal one does but also overlays whatever you like.
         """
-        # for plot in self.all_plots:
-        #    plot.draw()
-
+        tasks = []
         if self._doReco:
-            getattr(self, 'caloHT_eff').draw()
-            getattr(self, 'pfHT_eff').draw()
-            getattr(self, 'caloMETBE_eff').draw()
-            getattr(self, 'caloMETHF_eff').draw()
-            getattr(self, 'pfMET_NoMu_eff').draw()
-            getattr(self, 'caloJetET_BE_eff').draw()
-            getattr(self, 'caloJetET_HF_eff').draw()
-            getattr(self, 'pfJetET_BE_eff').draw()
-            getattr(self, 'pfJetET_HF_eff').draw()
-
-            getattr(self, 'caloHT_eff_HR').draw()
-            getattr(self, 'pfHT_eff_HR').draw()
-            getattr(self, 'caloMETBE_eff_HR').draw()
-            getattr(self, 'caloMETHF_eff_HR').draw()
-            getattr(self, 'pfMET_NoMu_eff_HR').draw()
-            getattr(self, 'caloJetET_BE_eff_HR').draw()
-            getattr(self, 'caloJetET_HF_eff_HR').draw()
-            getattr(self, 'pfJetET_BE_eff_HR').draw()
-            getattr(self, 'pfJetET_HF_eff_HR').draw()
-
-            getattr(self, 'caloHT_res').draw()
-            getattr(self, 'pfHT_res').draw()
-            getattr(self, 'caloMETBE_res').draw()
-            getattr(self, 'caloMETHF_res').draw()
-            getattr(self, 'pfMET_NoMu_res').draw()
-            getattr(self, 'caloJetET_BE_res').draw()
-            getattr(self, 'caloJetET_HF_res').draw()
-            getattr(self, 'pfJetET_BE_res').draw()
-            getattr(self, 'pfJetET_HF_res').draw()
-
-            if self._doEmu:
-                getattr(self, 'caloHT_eff').overlay_with_emu(
-                    getattr(self, 'caloHT_Emu_eff'))
-                getattr(self, 'pfHT_eff').overlay_with_emu(
-                    getattr(self, 'pfHT_Emu_eff'))
-                getattr(self, 'caloMETBE_eff').overlay_with_emu(
-                    getattr(self, 'caloMETBE_Emu_eff'))
-                getattr(self, 'caloMETHF_eff').overlay_with_emu(
-                    getattr(self, 'caloMETHF_Emu_eff'))
-                getattr(self, 'pfMET_NoMu_eff').overlay_with_emu(
-                    getattr(self, 'pfMET_NoMu_Emu_eff'))
-                getattr(self, 'caloJetET_BE_eff').overlay_with_emu(
-                    getattr(self, 'caloJetET_BE_Emu_eff'))
-                getattr(self, 'caloJetET_HF_eff').overlay_with_emu(
-                    getattr(self, 'caloJetET_HF_Emu_eff'))
-                getattr(self, 'pfJetET_BE_eff').overlay_with_emu(
-                    getattr(self, 'pfJetET_BE_Emu_eff'))
-                getattr(self, 'pfJetET_HF_eff').overlay_with_emu(
-                    getattr(self, 'pfJetET_HF_Emu_eff'))
-
-                getattr(self, 'caloHT_res').overlay_with_emu(
-                    getattr(self, 'caloHT_Emu_res'))
-                getattr(self, 'pfHT_res').overlay_with_emu(
-                    getattr(self, 'pfHT_Emu_res'))
-                getattr(self, 'caloMETBE_res').overlay_with_emu(
-                    getattr(self, 'caloMETBE_Emu_res'))
-                getattr(self, 'caloMETHF_res').overlay_with_emu(
-                    getattr(self, 'caloMETHF_Emu_res'))
-                getattr(self, 'pfMET_NoMu_res').overlay_with_emu(
-                    getattr(self, 'pfMET_NoMu_Emu_res'))
-                getattr(self, 'caloJetET_BE_res').overlay_with_emu(
-                    getattr(self, 'caloJetET_BE_Emu_res'))
-                getattr(self, 'caloJetET_HF_res').overlay_with_emu(
-                    getattr(self, 'caloJetET_HF_Emu_res'))
-                getattr(self, 'pfJetET_BE_res').overlay_with_emu(
-                    getattr(self, 'pfJetET_BE_Emu_res'))
-                getattr(self, 'pfJetET_HF_res').overlay_with_emu(
-                    getattr(self, 'pfJetET_HF_Emu_res'))
-
+            tasks += self._plot_tasks([
+                'caloHT', 'pfHT', 'caloMETBE', 'caloMETHF', 'pfMET_NoMu',
+                'caloJetET_BE', 'caloJetET_HF', 'pfJetET_BE', 'pfJetET_HF',
+            ])
         if self._doGen:
-            getattr(self, 'genHT_eff').draw()
-            getattr(self, 'genMETBE_eff').draw()
-            getattr(self, 'genMETHF_eff').draw()
-            getattr(self, 'genJetET_BE_eff').draw()
-            getattr(self, 'genJetET_HF_eff').draw()
-
-            getattr(self, 'genHT_eff_HR').draw()
-            getattr(self, 'genMETBE_eff_HR').draw()
-            getattr(self, 'genMETHF_eff_HR').draw()
-            getattr(self, 'genJetET_BE_eff_HR').draw()
-            getattr(self, 'genJetET_HF_eff_HR').draw()
-
-            getattr(self, 'genHT_res').draw()
-            getattr(self, 'genMETBE_res').draw()
-            getattr(self, 'genMETHF_res').draw()
-            getattr(self, 'genJetET_BE_res').draw()
-            getattr(self, 'genJetET_HF_res').draw()
-
-            if self._doEmu:
-                getattr(self, 'genHT_eff').overlay_with_emu(
-                    getattr(self, 'genHT_Emu_eff'))
-                getattr(self, 'genMETBE_eff').overlay_with_emu(
-                    getattr(self, 'genMETBE_Emu_eff'))
-                getattr(self, 'genMETHF_eff').overlay_with_emu(
-                    getattr(self, 'genMETHF_Emu_eff'))
-                getattr(self, 'genJetET_BE_eff').overlay_with_emu(
-                    getattr(self, 'genJetET_BE_Emu_eff'))
-                getattr(self, 'genJetET_HF_eff').overlay_with_emu(
-                    getattr(self, 'genJetET_HF_Emu_eff'))
-
-                getattr(self, 'genHT_res').overlay_with_emu(
-                    getattr(self, 'genHT_Emu_res'))
-                getattr(self, 'genMETBE_res').overlay_with_emu(
-                    getattr(self, 'genMETBE_Emu_res'))
-                getattr(self, 'genMETHF_res').overlay_with_emu(
-                    getattr(self, 'genMETHF_Emu_res'))
-                getattr(self, 'genJetET_BE_Emu_res').overlay_with_emu(
-                    getattr(self, 'genJetET_BE_Emu_res'))
-                getattr(self, 'genJetET_HF_Emu_res').overlay_with_emu(
-                    getattr(self, 'genJetET_HF_Emu_res'))
+            tasks += self._plot_tasks([
+                'genHT', 'genMETBE', 'genMETHF', 'genJetET_BE', 'genJetET_HF',
+            ])
 
-        return True
+        return render(tasks, self.plot_workers, self.plot_cache)
+
+    def _plot_tasks(self, names):
+        tasks = [PlotTask(getattr(self, name + suffix))
+                 for suffix in ['_eff', '_eff_HR', '_res'] for name in names]
+        if self._doEmu:
+            tasks += [PlotTask(getattr(self, name + suffix), 'overlay_with_emu',
+                               getattr(self, name + '_Emu' + suffix))
+                      for suffix in ['_eff', '_res'] for name in names]
+        return tasks
@@ -0,0 +1,164 @@
+"""
+Columnar version of cmsl1t.analyzers.jetMet_analyzer.
+Produces the same histograms, but fills them from chunks of events.
+Only the reco and emulator trees are supported so far, configs that load the
+genTree for it are rejected (see cmsl1t.registry.UNSUPPORTED_TREES).
+"""
+import numpy as np
+from cmsl1t.analyzers.ColumnarAnalyzer import ColumnarAnalyzer
+from cmsl1t.analyzers.jetMet_analyzer import Analyzer as EventAnalyzer
+from cmsl1t.producers.l1sums import batch_sums
+from cmsl1t.filters.pfMetFilter import pfMetFilterMask, PF_MET_FILTERS
+from cmsl1t.filters.jets import pfJetIDMask
+from cmsl1t.jet import match_batch
+import logging
+logger = logging.getLogger(__name__)
+
+SUM_INPUTS = ['L1Upgrade_sumBx', 'L1Upgrade_sumType',
+              'L1Upgrade_sumEt', 'L1Upgrade_sumPhi']
+L1_JET_INPUTS = ['L1Upgrade_jetEt', 'L1Upgrade_jetEta',
+                 'L1Upgrade_jetPhi', 'L1Upgrade_jetBx']
+PF_JET_INPUTS = dict(
+    et='Jet_et', eta='Jet_eta', phi='Jet_phi', etCorr='Jet_etCorr',
+    cemef='Jet_cemef', chef='Jet_chef', cMult='Jet_cMult', mef='Jet_mef',
+    muMult='Jet_muMult', nemef='Jet_nemef', nhef='Jet_nhef',
+    nMult='Jet_nMult',
+)
+CALO_JET_INPUTS = dict(
+    et='Jet_caloEt', eta='Jet_caloEta', phi='Jet_caloPhi',
+    etCorr='Jet_caloEtCorr',
+)
+# name: (offline et, offline phi, L1 sum)
+RECO_SUMS = dict(
+    caloHT=('Sums_caloHt', None, 'Htt'),
+    pfHT=('Sums_Ht', None, 'Htt'),
+    caloMETBE=('Sums_caloMetBE', 'Sums_caloMetPhiBE', 'Met'),
+    caloMETHF=('Sums_caloMet', 'Sums_caloMetPhi', 'MetHF'),
+    pfMET_NoMu=('Sums_pfMetNoMu', 'Sums_pfMetNoMuPhi', 'MetHF'),
+)
+
+
+def _l1_jets(batch, prefix=''):
+    et, eta, phi, bx = [batch[prefix + i] for i in L1_JET_INPUTS]
+    in_bx = bx.content == 0
+    return dict(et=et.select(in_bx), eta=eta.select(in_bx),
+                phi=phi.select(in_bx))
+
+
+def _reco_jets(batch, inputs, with_id=False):
+    jets = {name: batch[alias] for name, alias in inputs.items()}
+    if with_id:
+        good = pfJetIDMask({name: jagged.content for name, jagged in jets.items()})
+        jets = {name: jagged.select(good) for name, jagged in jets.items()}
+    return jets
+
+
+def _leading_jet(jets):
+    '''
+        Index into content of the leading jet of each event (-1 if none),
+        ordered the same way as in cmsl1t.producers.jets
+    '''
+    etCorr, et = jets['etCorr'].content, jets['et'].content
+    key = np.where(etCorr != 0, etCorr, et)
+    return jets['etCorr'].apply(key).argmax()
+
+
+def _matched_et(ref_event, ref_eta, ref_phi, l1Jets):
+    matched = match_batch(ref_event, ref_eta, ref_phi,
+                          l1Jets['eta'], l1Jets['phi'])
+    l1Et = np.zeros(len(matched))
+    l1Et[matched >= 0] = l1Jets['et'].content[matched[matched >= 0]]
+    return l1Et
+
+
+class Analyzer(ColumnarAnalyzer, EventAnalyzer):
+
+    @property
+    def inputs(self):
+        inputs = ['run', 'lumi'] + SUM_INPUTS + L1_JET_INPUTS
+        if self._doEmu:
+            inputs += ['emu_' + i for i in SUM_INPUTS + L1_JET_INPUTS]
+        if self._doReco:
+            inputs += ['Vertex_nVtx'] + PF_MET_FILTERS
+            inputs += list(PF_JET_INPUTS.values())
+            inputs += list(CALO_JET_INPUTS.values())
+            for offline_et, offline_phi, _ in RECO_SUMS.values():
+                inputs += [offline_et] + ([offline_phi] if offline_phi else [])
+        return inputs
+
+    def fill_histograms_batch(self, entries, batch):
+        if self._lumiFilter is not None:
+            selected = self._lumiFilter.mask(batch['run'], batch['lumi'])
+            batch = {alias: values[selected] for alias, values in batch.items()}
+
+        if not self._doReco:
+            return True
+
+        recoNVtx = batch['Vertex_nVtx'].astype(float)
+        l1Sums = {'': batch_sums(*[batch[i] for i in SUM_INPUTS])}
+        l1Jets = {'': _l1_jets(batch)}
+        if self._doEmu:
+            l1Sums['_Emu'] = batch_sums(*[batch['emu_' + i] for i in SUM_INPUTS])
+            l1Jets['_Emu'] = _l1_jets(batch, 'emu_')
+
+        passesMetFilter = pfMetFilterMask(batch)
+        for name in self._sumTypes:
+            base_name = name.replace('_Emu', '')
+            offline_et, offline_phi, online_sum = RECO_SUMS[base_name]
+            on_et, on_phi = l1Sums[name[len(base_name):]][online_sum]
+            off_et = batch[offline_et]
+            selected = passesMetFilter if 'pfMET' in name else slice(None)
+            self._fill_turn_on(
+                name, recoNVtx[selected], off_et[selected], on_et[selected],
+                (on_et >= 0.01)[selected] & (off_et >= 30)[selected])
+            if hasattr(self, name + "_phi_res"):
+                off_phi = batch[offline_phi][selected]
+                for suffix in ['_phi_res', '_phi_2D']:
+                    getattr(self, name + suffix).fill_batch(
+                        recoNVtx[selected], off_phi, on_phi[selected])
+
+        goodPFJets = _reco_jets(batch, PF_JET_INPUTS, with_id=True)
+        caloJets = _reco_jets(batch, CALO_JET_INPUTS)
+
+        if self._doEmu:
+            self._fill_res_vs_eta(
+                self.res_vs_eta_CentralJets, recoNVtx, goodPFJets,
+                l1Jets['_Emu'])
+
+        for jetType, jets in [('pf', goodPFJets), ('calo', caloJets)]:
+            leading = _leading_jet(jets)
+            events = np.flatnonzero(leading >= 0)
+            index = leading[events]
+            etCorr = jets['etCorr'].content[index]
+            above = etCorr > 20
+            events, index, etCorr = events[above], index[above], etCorr[above]
+            eta = jets['eta'].content[index]
+            phi = jets['phi'].content[index]
+            is_central = np.abs(eta) < 3.0
+            for suffix, l1 in l1Jets.items():
+                l1Et = _matched_et(events, eta, phi, l1)
+                passes_res = (l1Et != 0) & (etCorr >= 30)
+                for region, in_region in [('BE', is_central), ('HF', ~is_central)]:
+                    name = '{0}JetET_{1}{2}'.format(jetType, region, suffix)
+                    self._fill_turn_on(
+                        name, recoNVtx[events][in_region], etCorr[in_region],
+                        l1Et[in_region], passes_res[in_region])
+
+        return True
+
+    def _fill_turn_on(self, name, pileup, offline, online, passes_res):
+        for suffix in ['_eff', '_2D', '_eff_HR', '_2D_HR']:
+            getattr(self, name + suffix).fill_batch(pileup, offline, online)
+        getattr(self, name + '_res').fill_batch(
+            pileup[passes_res], offline[passes_res], online[passes_res])
+
+    def _fill_res_vs_eta(self, plotter, pileup, refJets, l1Jets):
+        ref_event = refJets['etCorr'].parents
+        eta = refJets['eta'].content
+        etCorr = refJets['etCorr'].content
+        matched = match_batch(ref_event, eta, refJets['phi'].content,
+                              l1Jets['eta'], l1Jets['phi'])
+        selected = (matched >= 0) & (etCorr > 30.)
+        plotter.fill_batch(
+            pileup[ref_event[selected]], eta[selected], etCorr[selected],
+            l1Jets['et'].content[matched[selected]])
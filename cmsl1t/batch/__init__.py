@@ -2,13 +2,17 @@ import os
 from textwrap import dedent
 
 from .common import Batch, create_run_script, create_info_file, \
-    get_config_name_template, prepare_jobs, prepare_output_folders, Status
+    get_config_name_template, prepare_jobs, prepare_job_items, \
+    prepare_output_folders, read_info_file, relative_paths, Status
 
 from .condor import submit as condor_submit
 from .condor import get_status as condor_status
 from .condor import resubmit as condor_resubmit
 from .lsf import submit as lsf_submit
 from .lsf import get_status as lsf_status
+from .local import submit as local_submit
+from .local import get_status as local_status
+from .local import resubmit as local_resubmit
 
 
 __all__ = [
@@ -20,7 +24,13 @@ __all__ = [
     'create_run_script',
     'get_config_name_template',
     'prepare_jobs',
+    'prepare_job_items',
     'prepare_output_folders',
+    'read_info_file',
+    'relative_paths',
+    'local_resubmit',
+    'local_status',
+    'local_submit',
     'Status',
     'lsf_status',
     'lsf_submit',
@@ -21,6 +21,7 @@ class Status:
 class Batch:
     lsf = 'LSF'
     condor = 'HTCondor'
+    local = 'local'
 
 
 class PATHS:
@@ -54,20 +55,34 @@ def create_run_script(setup_script, project_root, batch_dir):
     return run_script
 
 
+# Columns of info.csv with paths inside the batch directory, which are kept
+# relative to it
+PATH_COLUMNS = ['config_file', 'job_log', 'output_folder', 'stderr_log',
+                'stdout_log']
+
+
+def relative_paths(df, batch_dir):
+    for column in PATH_COLUMNS:
+        if column in df:
+            df[column] = df[column].str.replace(batch_dir, '')
+    return df
+
+
 def create_info_file(info, batch_dir):
     info_file = os.path.join(batch_dir, PATHS.INFO_FILE)
     df = pd.DataFrame(info)
     df['run_script'] = PATHS.RUN_SCRIPT
     df['batch_dir'] = batch_dir
-    df['config_file'] = df['config_file'].str.replace(batch_dir, '')
-    df['job_log'] = df['job_log'].str.replace(batch_dir, '')
-    df['output_folder'] = df['output_folder'].str.replace(batch_dir, '')
-    df['stderr_log'] = df['stderr_log'].str.replace(batch_dir, '')
-    df['stdout_log'] = df['stdout_log'].str.replace(batch_dir, '')
+    df = relative_paths(df, batch_dir)
     df.to_csv(info_file, index=False)
     return info_file
 
 
+def read_info_file(info_file):
+    ''' The IDs are read as they were written, e.g. local_id 007 stays 007 '''
+    return pd.read_csv(info_file, dtype={'local_id': str, 'batch_id': str})
+
+
 def _get_run_script(setup_script, project_root, shared_fs=True):
     run_script_contents = [
         '#!/usr/bin/env bash',
@@ -77,7 +92,7 @@ def _get_run_script(setup_script, project_root, shared_fs=True):
         'echo == start ENV ==',
         'env',
         'echo == END ENV ==',
-        'cmsl1t -c "$1"',
+        'cmsl1t -c "$@"',
         '',
     ]
     if not shared_fs:
@@ -123,27 +138,79 @@ def prepare_output_folders(output_folder):
     return batch_dir, batch_config_dir, batch_log_dir
 
 
-def prepare_jobs(config, batch_filename_template, outdir, files_per_job):
+def prepare_jobs(config, batch_filename_template, outdir, files_per_job,
+                 plan=None):
+    '''
+        plan -- function(input files) returning the cmsl1t.batch.planner.Jobs,
+                instead of files_per_job files per job
+    '''
     job_generator = _prepare_jobs(
-        config, batch_filename_template, outdir, files_per_job)
+        config, batch_filename_template, outdir, files_per_job, plan)
     job_configs, job_ids, output_folders = six.moves.zip(*job_generator)
     return job_configs, job_ids, output_folders
 
 
-def _prepare_jobs(config, batch_filename_template, outdir, files_per_job):
-    # Get the list of input files
+def _split_input_files(config, files_per_job, plan=None):
+    '''
+        The input files of each job and the range of entries, None for all
+    '''
     input_ntuples = config.get('input', 'files')
-    input_ntuples = _prepare_input_file_groups(input_ntuples, files_per_job)
+    if plan is None:
+        groups = _prepare_input_file_groups(input_ntuples, files_per_job)
+        return [(in_files, None) for in_files in groups]
+    input_ntuples = [f if f.startswith("root:") else os.path.realpath(f)
+                     for f in input_ntuples]
+    return [(job.files, None if job.nevents < 0 else
+             [job.first_event, job.nevents])
+            for job in plan(input_ntuples)]
+
 
-    n_jobs = len(input_ntuples)
+def _padded_indices(n_jobs):
     n_jobs_pad_width = int(math.log10(n_jobs)) + 1
     padding = "{{:0{}}}".format(n_jobs_pad_width)
+    return [padding.format(i) for i in range(n_jobs)]
+
+
+def prepare_job_items(config, base_config_file, outdir, files_per_job,
+                      plan=None):
+    '''
+        Writes a single config for all jobs, and returns what differs between
+        the jobs as one dict per job (the itemdata of a condor cluster):
+        local_id, output_folder, files (separated by spaces) and entries
+        ('<first>:<stop>', '0:-1' for all), see the options of cmsl1t
+    '''
+    jobs = _split_input_files(config, files_per_job, plan)
+    config.config['input']['resolve_files'] = False
+    config.dump(base_config_file)
+
+    items = []
+    for padded_index, (in_files, entries) in zip(
+            _padded_indices(len(jobs)), jobs):
+        output_folder = outdir.format(index=padded_index)
+        os.makedirs(output_folder)
+        items.append(dict(
+            local_id=padded_index,
+            output_folder=output_folder,
+            files=' '.join(in_files),
+            entries='{0}:{1}'.format(*(entries or [0, -1])),
+        ))
+    return items
+
 
-    for i, in_files in enumerate(input_ntuples):
-        padded_index = padding.format(i)
+def _prepare_jobs(config, batch_filename_template, outdir, files_per_job,
+                  plan=None):
+    # Get the list of input files
+    jobs = _split_input_files(config, files_per_job, plan)
 
-        # Reset the input file list
+    for padded_index, (in_files, entries) in zip(
+            _padded_indices(len(jobs)), jobs):
+        # Reset the input file list, which the job does not need to resolve
         config.config['input']['files'] = in_files
+        config.config['input']['resolve_files'] = False
+        # and the range of entries, for jobs that read part of a file
+        config.config['input'].pop('entries', None)
+        if entries is not None:
+            config.config['input']['entries'] = entries
 
         # Reset the output directory
         # TODO: assumes shared_fs
@@ -3,8 +3,11 @@ import os
 import socket
 import re
 
-import htcondor
-from plumbum import local
+try:
+    import htcondor
+except ImportError:
+    # Only needed to submit to HTCondor, not e.g. for local jobs
+    htcondor = None
 
 from .common import Status, Batch
 
@@ -19,78 +22,91 @@ CONDOR_STATUS = [
 ]
 
 
-def submit(config_files, batch_directory, batch_log_dir, run_script):
-    logger.info("Will submit {0} jobs".format(len(config_files)))
-    schedd = htcondor.Schedd()
-    results = []
+# Variables of the jobs in a cluster, see cmsl1t.batch.prepare_job_items;
+# files comes last, as it takes the rest of a line of itemdata
+ITEM_KEYS = ['local_id', 'output_folder', 'entries', 'files']
+
 
-    job_cfgs = []
-    for i, cfg in enumerate(config_files):
-        job_cfgs.append(__create_job_cfg(i, cfg, batch_directory, batch_log_dir, run_script))
+def submit(job_items, config_file, batch_directory, batch_log_dir, run_script,
+           schedd=None):
+    '''
+        Submits all jobs as a single cluster that runs config_file, with one
+        job per item of cmsl1t.batch.prepare_job_items
+    '''
+    logger.info("Will submit {0} jobs".format(len(job_items)))
+    job_cfg = __create_job_cfg(config_file, batch_log_dir, run_script)
 
-    if 'cern.ch' in socket.gethostname():
-        results = list(_submit_via_command_line(job_cfgs, config_files, batch_directory))
+    if schedd is None and 'cern.ch' in socket.gethostname():
+        batch_ids = _submit_via_command_line(job_cfg, job_items,
+                                             batch_directory)
     else:
-        with schedd.transaction() as txn:
-            for job_cfg, cfg in zip(job_cfgs, config_files):
-                result = __submit_one(txn, job_cfgs, cfg)
-                results.append(result)
+        batch_ids = _submit_to_schedd(schedd or htcondor.Schedd(), job_cfg,
+                                      job_items)
 
-    return results
+    return [__job_info(job_cfg, config_file, item, batch_id)
+            for item, batch_id in zip(job_items, batch_ids)]
 
 
-def __create_job_cfg(index, config_file, batch_directory, batch_log_dir, run_script):
-    cfg = os.path.realpath(config_file)
-    stderr_log = os.path.join(batch_log_dir, 'job_{0}.out'.format(index))
-    stdout_log = os.path.join(batch_log_dir, 'job_{0}.out'.format(index))
-    job_log = os.path.join(batch_log_dir, 'job_{0}.log'.format(index))
+def __create_job_cfg(config_file, batch_log_dir, run_script):
+    arguments = [os.path.realpath(config_file),
+                 '--output-folder', '$(output_folder)',
+                 '--entries', '$(entries)',
+                 '--input-files', "'$(files)'"]
     environment = 'HOME={}'.format(os.environ["HOME"])
     return dict(
         executable=run_script,
-        arguments=cfg,
-        output=stdout_log,
-        error=stderr_log,
-        log=job_log,
+        arguments='"{0}"'.format(' '.join(arguments)),
+        output=os.path.join(batch_log_dir, 'job_$(local_id).out'),
+        error=os.path.join(batch_log_dir, 'job_$(local_id).err'),
+        log=os.path.join(batch_log_dir, 'jobs.log'),
         environment=environment,
     )
 
 
-def __submit_one(txn, job_cfg, cfg):
-    sub = htcondor.Submit(job_cfg)
-    out = sub.queue(txn)
+def __job_info(job_cfg, config_file, item, batch_id):
+    def expand(value):
+        return value.replace('$(local_id)', str(item['local_id']))
     return dict(
-        batch_id=int(out),
+        batch_id=batch_id,
         batch=Batch.condor,
-        config_file=cfg,
-        stderr_log=job_cfg['error'],
-        stdout_log=job_cfg['output'],
+        config_file=config_file,
+        stderr_log=expand(job_cfg['error']),
+        stdout_log=expand(job_cfg['output']),
         job_log=job_cfg['log'],
         status=Status.CREATED,
+        input_files=item['files'],
+        entries=item['entries'],
     )
 
 
-def _submit_via_command_line(job_cfgs, config_files, batch_directory):
+def _submit_to_schedd(schedd, job_cfg, job_items):
+    sub = htcondor.Submit(job_cfg)
+    itemdata = [dict((key, str(item[key])) for key in ITEM_KEYS)
+                for item in job_items]
+    if hasattr(sub, 'queue_with_itemdata'):
+        with schedd.transaction() as txn:
+            result = sub.queue_with_itemdata(txn, 1, iter(itemdata))
+    else:
+        result = schedd.submit(sub, itemdata=iter(itemdata))
+    cluster = result.cluster()
+    return ['{0}.{1}'.format(cluster, i) for i in range(len(job_items))]
+
+
+def _submit_via_command_line(job_cfg, job_items, batch_directory):
+    items_file = os.path.join(batch_directory, 'jobs.txt')
+    with open(items_file, 'w') as f:
+        for item in job_items:
+            f.write(', '.join(str(item[key]) for key in ITEM_KEYS) + '\n')
     condor_submit_file = os.path.join(batch_directory, 'job.submit')
     with open(condor_submit_file, 'w+') as f:
-        content = '\n'
-        for job_cfg in job_cfgs:
-            content += '\n'.join([k + ' = ' + v for k, v in job_cfg.items()])
-            content += '\n' + 'queue' + '\n'
+        content = '\n'.join([k + ' = ' + v for k, v in job_cfg.items()])
+        queue = '\nqueue {0} from {1}\n'
+        content += queue.format(', '.join(ITEM_KEYS), items_file)
         f.write(content)
+    from plumbum import local
     condor_submit = local['condor_submit']
     out = condor_submit(condor_submit_file)
-    batch_ids = list(_parse_condor_submit_output(out))
-    for i, job_cfg in enumerate(job_cfgs):
-        yield dict(
-            # batch_id=int(out),
-            batch_id=batch_ids[i],
-            batch=Batch.condor,
-            config_file=config_files[i],
-            stderr_log=job_cfg['error'],
-            stdout_log=job_cfg['output'],
-            job_log=job_cfg['log'],
-            status=Status.CREATED,
-        )
+    return list(_parse_condor_submit_output(out))
 
 
 def _parse_condor_submit_output(out):
@@ -141,15 +157,9 @@ def __status_from_history(batch_id, schedd):
         return status, exit_code
 
 
-def resubmit(config_files, local_ids, batch_directory, batch_log_dir, run_script):
-    logger.info("Will resubmit {0} jobs".format(len(config_files)))
-    schedd = htcondor.Schedd()
-    results = []
-    with schedd.transaction() as txn:
-        for i, cfg in zip(local_ids, config_files):
-            result = __submit_one(
-                txn, i, cfg, batch_directory, batch_log_dir, run_script
-            )
-            results.append(result)
-
-    return results
+def resubmit(job_items, config_file, batch_directory, batch_log_dir,
+             run_script, schedd=None):
+    ''' Submits the jobs again, as a new cluster '''
+    logger.info("Will resubmit {0} jobs".format(len(job_items)))
+    return submit(job_items, config_file, batch_directory, batch_log_dir,
+                  run_script, schedd)
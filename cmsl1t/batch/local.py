@@ -0,0 +1,158 @@
+'''
+    Runs the jobs of cmsl1t_batch on this machine, without a scheduler.
+
+    The jobs are run by a separate process (python -m cmsl1t.batch.local), so
+    that cmsl1t_batch returns once they are started, at most `workers` of them
+    at a time.  Every job keeps its state in a small file, which also serves
+    as its batch id: "PENDING", "RUNNING <pid>" and then its exit code.
+'''
+from multiprocessing.pool import ThreadPool
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+
+from .common import Status, Batch
+import logging
+logger = logging.getLogger(__name__)
+
+JOBS_FILE = 'local_jobs.json'
+
+
+def _arguments(config_file, item):
+    ''' The arguments of run.sh, as for condor jobs '''
+    return [os.path.realpath(config_file),
+            '--output-folder', item['output_folder'],
+            '--entries', item['entries'],
+            '--input-files', item['files']]
+
+
+def _write_state(status_file, state):
+    tmp_name = status_file + '.tmp'
+    with open(tmp_name, 'w') as f:
+        f.write(state)
+    os.rename(tmp_name, status_file)
+
+
+def submit(job_items, config_file, batch_directory, batch_log_dir, run_script,
+           workers=None, wait=False):
+    '''
+        Runs the jobs of cmsl1t.batch.prepare_job_items in the background,
+        at most `workers` (by default one per CPU) at the same time
+
+        wait -- run the jobs before returning, e.g. in CI
+    '''
+    workers = workers or multiprocessing.cpu_count()
+    logger.info("Will run {0} jobs, {1} at a time".format(
+        len(job_items), workers))
+    status_dir = os.path.join(batch_directory, 'local')
+    if not os.path.exists(status_dir):
+        os.makedirs(status_dir)
+
+    jobs = []
+    results = []
+    for item in job_items:
+        local_id = str(item['local_id'])
+        status_file = os.path.join(status_dir,
+                                   'job_{0}.status'.format(local_id))
+        _write_state(status_file, Status.PENDING)
+        job = dict(
+            command=[run_script] + _arguments(config_file, item),
+            status_file=status_file,
+            output=os.path.join(batch_log_dir, 'job_{0}.out'.format(local_id)),
+            error=os.path.join(batch_log_dir, 'job_{0}.err'.format(local_id)),
+        )
+        jobs.append(job)
+        results.append(dict(
+            batch_id=status_file,
+            batch=Batch.local,
+            config_file=config_file,
+            stderr_log=job['error'],
+            stdout_log=job['output'],
+            job_log=job['output'],
+            status=Status.CREATED,
+            input_files=item['files'],
+            entries=item['entries'],
+        ))
+
+    jobs_file = os.path.join(status_dir, JOBS_FILE)
+    n = 1
+    while os.path.exists(jobs_file):
+        # resubmissions keep the earlier jobs files
+        n += 1
+        jobs_file = os.path.join(status_dir, 'local_jobs_{0}.json'.format(n))
+    with open(jobs_file, 'w') as f:
+        json.dump(dict(workers=workers, jobs=jobs), f)
+
+    command = [sys.executable, '-m', __name__, jobs_file]
+    if wait:
+        # failed jobs show in their status, like for the other batch systems
+        subprocess.call(command)
+    else:
+        with open(os.path.join(batch_log_dir, 'local_runner.log'), 'a') as log:
+            subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT,
+                             close_fds=True, preexec_fn=os.setsid)
+    return results
+
+
+def _run_job(job):
+    with open(job['output'], 'w') as output, open(job['error'], 'w') as error:
+        process = subprocess.Popen(job['command'], stdout=output, stderr=error)
+        _write_state(job['status_file'], '{0} {1}'.format(Status.RUNNING,
+                                                          process.pid))
+        exit_code = process.wait()
+    _write_state(job['status_file'], str(exit_code))
+    return exit_code
+
+
+def run_jobs(jobs_file):
+    with open(jobs_file) as f:
+        jobs = json.load(f)
+    pool = ThreadPool(jobs['workers'])
+    try:
+        exit_codes = pool.map(_run_job, jobs['jobs'], chunksize=1)
+    finally:
+        pool.close()
+    failed = sum(1 for code in exit_codes if code != 0)
+    logger.info("{0} jobs done, {1} failed".format(len(exit_codes), failed))
+    return failed
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def get_status(batch_id):
+    ''' The status of a job, from its status file (the batch id) '''
+    try:
+        with open(batch_id) as f:
+            state = f.read().split()
+    except (IOError, OSError):
+        return Status.UNKNOWN
+    if not state:
+        return Status.UNKNOWN
+    if state[0] == Status.PENDING:
+        return Status.PENDING
+    if state[0] == Status.RUNNING:
+        if len(state) > 1 and _is_alive(int(state[1])):
+            return Status.RUNNING
+        # the job was stopped before it could write its exit code
+        return Status.FAILED
+    return Status.FINISHED if state[0] == '0' else Status.FAILED
+
+
+def resubmit(job_items, config_file, batch_directory, batch_log_dir,
+             run_script, workers=None, wait=False):
+    ''' Runs the jobs again '''
+    logger.info("Will rerun {0} jobs".format(len(job_items)))
+    return submit(job_items, config_file, batch_directory, batch_log_dir,
+                  run_script, workers, wait)
+
+
+if __name__ == '__main__':
+    sys.exit(1 if run_jobs(sys.argv[1]) else 0)
@@ -0,0 +1,216 @@
+'''
+    Splits the input files of a config into batch jobs of similar cost.
+
+    Grouping a fixed number of files per job gives jobs that run for very
+    different times, as input files differ a lot in size.  The planner instead
+    balances the jobs by the number of entries (or bytes) of their files, taken
+    from a FileIndex, a JSON file of the size and number of entries of each
+    input file that is only measured once per file.  The cost of a job can be
+    given directly, or derived from a wall time and the events per second of
+    a previous run (the profile.json of cmsl1t --profile).  A file that costs
+    more than a job is split into ranges of entries, one job each.
+'''
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+import json
+import math
+import os
+import tempfile
+from cmsl1t.utils.root_glob import enable_thread_safety, is_remote
+import logging
+logger = logging.getLogger(__name__)
+
+TREE = 'l1EventTree/L1EventTree'
+
+# A job reads `files` from event first_event up to nevents (counted from the
+# start of the files, -1 for all), as EventReader does
+Job = namedtuple('Job', ['files', 'first_event', 'nevents', 'cost'])
+
+
+def measure_file(input_file, tree=TREE):
+    ''' Size in bytes and number of entries of the tree of an input file '''
+    from cmsl1t.io.branchcache import _tree_entries
+    if is_remote(input_file):
+        import ROOT
+        root_file = ROOT.TFile.Open(input_file)
+        if not root_file or root_file.IsZombie():
+            raise IOError("Could not open {0}".format(input_file))
+        size = root_file.GetSize()
+        root_file.Close()
+    else:
+        size = os.path.getsize(input_file)
+    return dict(bytes=size, entries=_tree_entries(input_file, tree) or 0)
+
+
+class FileIndex(object):
+    '''
+        Sizes and numbers of entries of input files
+
+        params:
+        - filename -- JSON file to keep the index in, None to not keep it
+        - tree -- the tree whose entries are counted
+        - measure -- function(input_file, tree), by default measure_file
+        - workers -- number of threads measuring files at a time
+    '''
+
+    def __init__(self, filename=None, tree=TREE, measure=measure_file,
+                 workers=1):
+        self.filename = filename
+        self.tree = tree
+        self.measure = measure
+        self.workers = workers
+        self._files = {}
+        if filename and os.path.exists(filename):
+            with open(filename) as index:
+                self._files = json.load(index)
+
+    def _stamp(self, input_file):
+        ''' Modification time of local files, which changes if they do '''
+        if is_remote(input_file) or not os.path.exists(input_file):
+            return None
+        return os.path.getmtime(input_file)
+
+    def _is_known(self, input_file):
+        info = self._files.get(input_file)
+        return info is not None and info.get('tree') == self.tree and \
+            info.get('mtime') == self._stamp(input_file)
+
+    def _measure(self, input_file):
+        try:
+            info = self.measure(input_file, self.tree)
+        except Exception as e:
+            logger.warn("Could not measure {0} ({1}), counting it as "
+                        "average".format(input_file, e))
+            return None
+        info.update(tree=self.tree, mtime=self._stamp(input_file))
+        return info
+
+    def update(self, input_files):
+        ''' Measure the files that are not in the index yet '''
+        missing = [f for f in input_files if not self._is_known(f)]
+        if not missing:
+            return
+        logger.info("Measuring {0} input files".format(len(missing)))
+        workers = min(self.workers, len(missing))
+        # Remote files are opened with ROOT
+        if workers > 1 and any(is_remote(f) for f in missing):
+            workers = workers if enable_thread_safety() else 1
+        if workers < 2:
+            infos = [self._measure(f) for f in missing]
+        else:
+            pool = ThreadPool(workers)
+            try:
+                infos = pool.map(self._measure, missing)
+            finally:
+                pool.close()
+        for input_file, info in zip(missing, infos):
+            if info is not None:
+                self._files[input_file] = info
+        self.save()
+
+    def get(self, input_file):
+        ''' dict(bytes=, entries=) of a file, None if it is not measured '''
+        if not self._is_known(input_file):
+            return None
+        return self._files[input_file]
+
+    def save(self):
+        if not self.filename:
+            return
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        handle, tmp_name = tempfile.mkstemp(dir=directory)
+        with os.fdopen(handle, 'w') as index:
+            json.dump(self._files, index)
+        os.rename(tmp_name, self.filename)
+
+
+def events_per_second(profile_file):
+    ''' The processing rate of a previous run, from its profile.json '''
+    with open(profile_file) as profile:
+        stages = json.load(profile)['stages']
+    seconds = sum(stage['seconds_per_event'] for stage in stages.values())
+    if seconds <= 0:
+        raise ValueError("No events were timed in " + profile_file)
+    return 1. / seconds
+
+
+def _split(input_file, entries, n_parts, cost):
+    ''' One job per range of entries of a file '''
+    jobs = []
+    for i in range(n_parts):
+        start = entries * i // n_parts
+        stop = entries * (i + 1) // n_parts
+        jobs.append(Job([input_file], start, stop,
+                        cost * (stop - start) / float(entries)))
+    return jobs
+
+
+def plan_jobs(input_files, index, split_by='entries', per_job=None,
+              wall_seconds=None, rate=None, files_per_job=1):
+    '''
+        Jobs of similar cost for the input files
+
+        params:
+        - index -- a FileIndex
+        - split_by -- 'entries' or 'bytes'
+        - per_job -- the cost of a job, in entries or bytes; or else
+        - wall_seconds and rate -- the wall time of a job and the events per
+          second (split_by 'entries'); or else
+        - files_per_job -- as many jobs as groups of this many files
+
+        returns: a list of Jobs, whole files in the order they were given; no
+    job costs more than per_job, unless one of its files does
+    '''
+    index.update(input_files)
+    infos = [index.get(f) for f in input_files]
+    costs = [info[split_by] for info in infos if info]
+    mean = sum(costs) / float(len(costs)) if costs else 1.
+    # Files that could not be measured count as average
+    costs = [float(info[split_by]) if info else mean for info in infos]
+    total = sum(costs)
+
+    if per_job is None and wall_seconds is not None:
+        if split_by != 'entries' or not rate:
+            raise ValueError("A wall time needs split_by='entries' and a rate")
+        per_job = wall_seconds * rate
+    if per_job is None:
+        n_jobs = int(math.ceil(len(input_files) / float(files_per_job)))
+        per_job = total / float(max(n_jobs, 1))
+    per_job = max(per_job, 1.)
+
+    # (index of the first file, job), to keep the jobs in the input order
+    jobs = []
+    whole = []
+    for i, (input_file, info) in enumerate(zip(input_files, infos)):
+        n_parts = int(math.ceil(costs[i] / per_job))
+        if n_parts > 1 and info and info['entries'] >= n_parts:
+            parts = _split(input_file, info['entries'], n_parts, costs[i])
+            jobs += [(i, job) for job in parts]
+        else:
+            whole.append(i)
+
+    # First fit decreasing: longest first, each into the first job it fits in
+    # (within rounding), a new job if it fits in none
+    capacity = per_job * (1 + 1e-9)
+    bins = []
+    for i in sorted(whole, key=lambda i: -costs[i]):
+        for job in bins:
+            if job[0] + costs[i] <= capacity:
+                job[0] += costs[i]
+                job[1].append(i)
+                break
+        else:
+            bins.append([costs[i], [i]])
+    for cost, files in bins:
+        files = sorted(files)
+        jobs.append((files[0], Job([input_files[i] for i in files], 0, -1,
+                                   cost)))
+    jobs = [job for _, job in sorted(jobs, key=lambda job: job[0])]
+
+    if jobs:
+        costs = [job.cost for job in jobs]
+        logger.info("Planned {0} jobs of {1:.3g} to {2:.3g} {3} each".format(
+            len(jobs), min(costs), max(costs), split_by))
+    return jobs
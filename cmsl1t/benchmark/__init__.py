@@ -0,0 +1,4 @@
+"""
+Benchmarks of the new-style framework, see cmsl1t.benchmark.suite and
+bin/run_benchmark.
+"""
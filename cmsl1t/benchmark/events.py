@@ -0,0 +1,76 @@
+"""
+In-memory events with random content, for the aliases read by the producers
+and analyzers of the benchmark.  The same seed always gives the same events.
+"""
+import numpy as np
+
+# The aliases of config/all2017.yaml
+L1_SUMS = ['L1Upgrade_sumBx', 'L1Upgrade_sumType', 'L1Upgrade_sumEt',
+           'L1Upgrade_sumPhi']
+PF_JETS = ['Jet_et', 'Jet_eta', 'Jet_phi', 'Jet_etCorr', 'Jet_cemef',
+           'Jet_chef', 'Jet_cMult', 'Jet_mef', 'Jet_muMult', 'Jet_nemef',
+           'Jet_nhef', 'Jet_nMult']
+CALO_JETS = ['Jet_caloEt', 'Jet_caloEta', 'Jet_caloPhi', 'Jet_caloEtCorr']
+L1_JETS = ['L1Upgrade_jetEt', 'L1Upgrade_jetEta', 'L1Upgrade_jetPhi',
+           'L1Upgrade_jetBx']
+BUNCH_CROSSINGS = range(-2, 3)
+
+
+class SyntheticEvent(object):
+    """
+    Stands in for cmsl1t.io.eventreader.Event: the aliases are attributes,
+    producers add their outputs as attributes
+    """
+
+    def __init__(self, **content):
+        self.__dict__.update(content)
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+def _jets(rng, n_jets):
+    et = 10 + rng.exponential(30., n_jets)
+    return et, rng.uniform(-4.7, 4.7, n_jets), rng.uniform(-np.pi, np.pi, n_jets)
+
+
+def synthetic_event(rng, n_jets, sum_types, pileup=30):
+    """
+    One event with on average n_jets offline and L1 jets (per bunch crossing
+    for the latter), and one L1 energy sum of every sum type per bunch crossing
+    """
+    content = dict(Vertex_nVtx=rng.poisson(pileup))
+
+    n_pf = rng.poisson(n_jets)
+    et, eta, phi = _jets(rng, n_pf)
+    fractions = rng.dirichlet(np.ones(5), n_pf).T if n_pf else np.zeros((5, 0))
+    multiplicities = rng.poisson([[15], [10], [0.05]], (3, n_pf))
+    pf_values = [et, eta, phi, et * rng.normal(1.1, 0.1, n_pf),
+                 fractions[0], fractions[1], multiplicities[0], fractions[2],
+                 multiplicities[2], fractions[3], fractions[4],
+                 multiplicities[1]]
+    content.update(zip(PF_JETS, [v.tolist() for v in pf_values]))
+
+    n_calo = rng.poisson(n_jets)
+    et, eta, phi = _jets(rng, n_calo)
+    calo_values = [et, eta, phi, et * rng.normal(1.1, 0.1, n_calo)]
+    content.update(zip(CALO_JETS, [v.tolist() for v in calo_values]))
+
+    n_l1 = rng.poisson(n_jets * len(BUNCH_CROSSINGS))
+    et, eta, phi = _jets(rng, n_l1)
+    l1_values = [et, eta, phi, rng.choice(BUNCH_CROSSINGS, n_l1)]
+    content.update(zip(L1_JETS, [v.tolist() for v in l1_values]))
+
+    n_sums = len(sum_types) * len(BUNCH_CROSSINGS)
+    sum_values = [np.repeat(BUNCH_CROSSINGS, len(sum_types)),
+                  np.tile(sum_types, len(BUNCH_CROSSINGS)),
+                  rng.exponential(50., n_sums), rng.uniform(-np.pi, np.pi, n_sums)]
+    content.update(zip(L1_SUMS, [v.tolist() for v in sum_values]))
+
+    content['Sums_caloMetBE'] = float(rng.exponential(40.))
+    return SyntheticEvent(**content)
+
+
+def synthetic_events(n_events, n_jets, sum_types, seed=1):
+    rng = np.random.RandomState(seed)
+    return [synthetic_event(rng, n_jets, sum_types) for _ in range(n_events)]
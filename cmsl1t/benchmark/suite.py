@@ -0,0 +1,381 @@
+"""
+Benchmark suite of the new-style framework.
+
+Every case times one path of the framework (reading events, a producer,
+filling histograms, writing them, fitting efficiencies) for a number of events
+and jets per event.  The events are synthetic (cmsl1t.benchmark.events), except
+for the EventReader case, which reads ntuples: real ones, or synthetic ones
+written by cmsl1t.io.synthetic (see synthetic_inputs).  Each measurement runs
+in its own process, so that its peak memory is not hidden by an earlier one,
+and the fastest of `repeat` runs is kept.
+
+Results are written as JSON and can be compared against an earlier result (the
+baseline) to flag regressions of the event rate or the peak memory.
+"""
+from __future__ import print_function
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from cmsl1t.benchmark.events import synthetic_events, L1_SUMS, PF_JETS, \
+    CALO_JETS, L1_JETS
+from cmsl1t.utils.timers import perf_counter
+import logging
+logger = logging.getLogger(__name__)
+
+# name: (setup, whether it depends on the number of jets)
+CASES = OrderedDict()
+# Read by the EventReader case
+READ_ALIASES = L1_SUMS + CALO_JETS + L1_JETS
+PILEUP_BINS = [0, 13, 20, 999]
+THRESHOLDS = [30, 50, 70, 90, 120]
+
+
+def case(name, jets=True):
+    """
+    Register a benchmark case.  The decorated function is called with a
+    Context and returns the function to time, or None if the case cannot run.
+    """
+    def register(setup):
+        CASES[name] = (setup, jets)
+        return setup
+    return register
+
+
+class Context(object):
+    """ What a case needs to set itself up """
+
+    def __init__(self, n_events, n_jets, work_dir, input_files=(),
+                 ntuple_map=None):
+        self.n_events = n_events
+        self.n_jets = n_jets
+        self.work_dir = work_dir
+        self.input_files = list(input_files)
+        self.ntuple_map = ntuple_map
+        self._events = None
+
+    @property
+    def events(self):
+        if self._events is None:
+            from cmsl1t.producers.l1sums import energySumTypes
+            sum_types = sorted(energySumTypes())
+            self._events = synthetic_events(self.n_events, self.n_jets,
+                                            sum_types)
+        return self._events
+
+
+def _producers():
+    from cmsl1t.producers import jets, l1sums
+    return OrderedDict([
+        ('l1Sums', l1sums.Producer(L1_SUMS, ['l1Sums'])),
+        ('goodPFJets', jets.Producer(PF_JETS, ['goodPFJets'], jetType='PF',
+                                     filter='cmsl1t.filters.jets.pfJetFilter')),
+        ('caloJets', jets.Producer(CALO_JETS, ['caloJets'], jetType='Calo')),
+        ('l1Jets', jets.Producer(L1_JETS, ['l1Jets'], jetType='L1')),
+    ])
+
+
+def _produce_all(events):
+    producers = _producers().values()
+    for event in events:
+        for producer in producers:
+            producer.produce(event)
+    return events
+
+
+@case('EventReader', jets=False)
+def read_events(context):
+    if not context.input_files or context.ntuple_map is None:
+        return None
+    import yaml
+    from cmsl1t.io.eventreader import EventReader
+    with open(context.ntuple_map) as ntuple_map:
+        ntuple_map = yaml.load(ntuple_map)
+
+    def run():
+        reader = EventReader(context.input_files, ntuple_map,
+                             nevents=context.n_events)
+        for event in reader:
+            for alias in READ_ALIASES:
+                event[alias]
+    return run
+
+
+def _produce(name):
+    def setup(context):
+        producer = _producers()[name]
+        events = context.events
+
+        def run():
+            for event in events:
+                producer.produce(event)
+        return run
+    return setup
+
+
+for _name in ('l1Sums', 'goodPFJets', 'caloJets', 'l1Jets'):
+    case('produce ' + _name)(_produce(_name))
+
+
+@case('HistogramCollection.fill')
+def fill_collection(context):
+    import cmsl1t.hist.binning as bn
+    from cmsl1t.hist.factory import HistFactory
+    from cmsl1t.hist.hist_collection import HistogramCollection
+    events = _produce_all(context.events)
+    collection = HistogramCollection(
+        [bn.Sorted(PILEUP_BINS, "pileup"), bn.EtaRegions()],
+        HistFactory("Hist1D", 100, 0, 500))
+
+    def run():
+        for event in events:
+            for jet in event.caloJets:
+                collection[event.Vertex_nVtx, abs(jet.eta)].fill(jet.et)
+    return run
+
+
+def _efficiency_plot():
+    from cmsl1t.plotting.efficiency import EfficiencyPlot
+    plot = EfficiencyPlot("l1Met", "caloMetBE")
+    plot.create_histograms("L1 MET", "Offline MET", PILEUP_BINS, THRESHOLDS,
+                           50, 0, 400)
+    return plot
+
+
+def _fill_efficiency(plot, events):
+    for event in events:
+        plot.fill(event.Vertex_nVtx, event.Sums_caloMetBE,
+                  event.l1Sums_Met.et)
+
+
+@case('EfficiencyPlot.fill', jets=False)
+def fill_efficiency(context):
+    events = _produce_all(context.events)
+    plot = _efficiency_plot()
+    return lambda: _fill_efficiency(plot, events)
+
+
+def _analyzer(context, hist_format):
+    from cmsl1t.analyzers.BaseAnalyzer import BaseAnalyzer
+    analyzer = BaseAnalyzer(
+        name="benchmark", output_folder=context.work_dir,
+        plots_folder=os.path.join(context.work_dir, "plots"),
+        file_format="pdf", hist_format=hist_format)
+    events = _produce_all(context.events)
+    for _ in range(4):
+        plot = _efficiency_plot()
+        _fill_efficiency(plot, events)
+        analyzer.register_plotter(plot)
+    return analyzer
+
+
+def _remove_histograms(analyzer):
+    filename = analyzer.get_histogram_filename()
+    if os.path.exists(filename):
+        os.remove(filename)
+
+
+def _write(hist_format):
+    def setup(context):
+        analyzer = _analyzer(context, hist_format)
+
+        def run():
+            # write_histograms never overwrites a file
+            _remove_histograms(analyzer)
+            analyzer.write_histograms()
+        return run
+    return setup
+
+
+def _reload(hist_format):
+    def setup(context):
+        analyzer = _analyzer(context, hist_format)
+        _remove_histograms(analyzer)
+        analyzer.write_histograms()
+        filename = analyzer.get_histogram_filename()
+        fresh = _analyzer(context, hist_format)
+        return lambda: fresh.reload_histogram_files([filename])
+    return setup
+
+
+for _format in ('root', 'npz'):
+    case('write_histograms ' + _format, jets=False)(_write(_format))
+    case('reload histograms ' + _format, jets=False)(_reload(_format))
+
+
+def _fit(backend):
+    def setup(context):
+        import cmsl1t.hist.binning as bn
+        from cmsl1t.utils import fit_efficiency, fit_efficiency_numpy
+        fit = dict(root=fit_efficiency.fit_efficiency,
+                   numpy=fit_efficiency_numpy.fit_efficiency)[backend]
+        events = _produce_all(context.events)
+        plot = _efficiency_plot()
+        _fill_efficiency(plot, events)
+        efficiencies = plot.efficiencies.get_bin_contents([bn.Base.everything])
+        curves = [(plot.thresholds.get_bin_center(threshold),
+                   efficiencies.get_bin_contents(threshold))
+                  for threshold in efficiencies.iter_all()
+                  if isinstance(threshold, int)]
+
+        def run():
+            for threshold, efficiency in curves:
+                fit(efficiency, threshold)
+        return run
+    return setup
+
+
+for _backend in ('root', 'numpy'):
+    case('fit_efficiency ' + _backend, jets=False)(_fit(_backend))
+
+
+def synthetic_inputs(ntuple_map, n_events, directory):
+    """
+    Write synthetic ntuples with the branches read by the EventReader case,
+    for machines without real ntuples.
+
+    returns: the input files and the file name of their ntuple map
+    """
+    import yaml
+    from cmsl1t.io.mapfile import prune_ntuple_map
+    from cmsl1t.io.synthetic import generate_files
+    with open(ntuple_map) as map_file:
+        ntuple_map = prune_ntuple_map(yaml.load(map_file), READ_ALIASES)
+    map_filename = os.path.join(directory, 'ntuple_content.yaml')
+    with open(map_filename, 'w') as map_file:
+        yaml.dump(ntuple_map, map_file)
+    input_files = generate_files(ntuple_map, directory, 1, n_events)
+    return input_files, map_filename
+
+
+def peak_rss():
+    """ Peak resident memory of this process, in MB """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return peak / (1024. ** 2 if sys.platform == 'darwin' else 1024.)
+
+
+def measure(name, n_events, n_jets, repeat=3, input_files=(), ntuple_map=None):
+    """
+    Time one case, the fastest of repeat runs.
+
+    returns: a dict with the time, events per second and peak memory, None if
+             the case cannot run
+    """
+    setup = CASES[name][0]
+    seconds = []
+    work_dir = tempfile.mkdtemp(prefix="cmsl1t_benchmark_")
+    try:
+        context = Context(n_events, n_jets, work_dir, input_files, ntuple_map)
+        for _ in range(repeat):
+            run = setup(context)
+            if run is None:
+                return None
+            start = perf_counter()
+            run()
+            seconds.append(perf_counter() - start)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    best = min(seconds)
+    return OrderedDict([
+        ('case', name), ('events', n_events),
+        ('jets', n_jets if CASES[name][1] else None),
+        ('seconds', best),
+        ('events_per_second', n_events / best if best else float('inf')),
+        ('peak_rss_mb', peak_rss()),
+    ])
+
+
+def _measure(args):
+    return measure(*args)
+
+
+def run_suite(event_counts, jet_multiplicities, cases=None, repeat=3,
+              input_files=(), ntuple_map=None):
+    """
+    Run the cases (all by default) for every number of events and, for the
+    cases that depend on it, every number of jets.
+
+    returns: the results, see measure()
+    """
+    from cmsl1t.plotting.render import _create_pool
+    measurements = []
+    for name in cases or CASES:
+        if name not in CASES:
+            raise ValueError("Unknown benchmark case '{0}', use one of "
+                             "{1}".format(name, list(CASES)))
+        jets = jet_multiplicities if CASES[name][1] else jet_multiplicities[:1]
+        measurements += [(name, n_events, n_jets, repeat, input_files,
+                          ntuple_map)
+                         for n_events in event_counts for n_jets in jets]
+
+    results = []
+    for args in measurements:
+        # A fresh process per measurement, for its own peak memory
+        pool = _create_pool(1, maxtasksperchild=1)
+        try:
+            result = pool.apply(_measure, (args,))
+        finally:
+            pool.close()
+            pool.join()
+        if result is None:
+            logger.info("Skipping '{0}', it needs input files".format(args[0]))
+            continue
+        logger.info("{case} ({events} events, {jets} jets): {seconds:.3f} s, "
+                    "{events_per_second:.0f} events/s, {peak_rss_mb:.0f} "
+                    "MB".format(**result))
+        results.append(result)
+    return results
+
+
+def write_results(results, filename):
+    output = OrderedDict([
+        ('time', time.strftime("%Y-%m-%d %H:%M:%S")),
+        ('host', platform.node()),
+        ('python', platform.python_version()),
+        ('results', results),
+    ])
+    directory = os.path.dirname(filename)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(filename, 'w') as output_file:
+        json.dump(output, output_file, indent=1)
+
+
+def read_results(filename):
+    with open(filename) as input_file:
+        return json.load(input_file)['results']
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compare results against a baseline, both as returned by run_suite.  A
+    measurement regressed if it processes events more than tolerance (a
+    fraction) slower than the baseline, or needs that much more memory.
+
+    returns: a list of messages, one per regression
+    """
+    def key(result):
+        return result['case'], result['events'], result['jets']
+    reference = dict((key(result), result) for result in baseline)
+    regressions = []
+    for result in results:
+        before = reference.get(key(result))
+        if before is None:
+            continue
+        label = "{0} ({1} events, {2} jets)".format(*key(result))
+        rate, rate_before = result['events_per_second'], \
+            before['events_per_second']
+        if rate < rate_before * (1 - tolerance):
+            regressions.append("{0}: {1:.0f} events/s, was {2:.0f}".format(
+                label, rate, rate_before))
+        memory, memory_before = result['peak_rss_mb'], before['peak_rss_mb']
+        if memory > memory_before * (1 + tolerance):
+            regressions.append("{0}: {1:.0f} MB peak memory, was {2:.0f}".format(
+                label, memory, memory_before))
+    return regressions
@@ -8,6 +8,7 @@ import os
 from datetime import datetime
 import logging
 from cmsl1t.utils import module
+from cmsl1t import registry
 from copy import deepcopy
 import re
 
@@ -38,32 +39,60 @@ def get_last_version_of(outdir):
     return last_version_path
 
 
-def resolve_file_paths(paths):
-    from cmsl1t.utils.root_glob import glob
-    all_files = []
-    for p in paths:
-        all_files.extend(glob(p))
-    return all_files
+def resolve_file_paths(paths, workers=1, cache=None):
+    '''
+        All files matching the paths, see cmsl1t.utils.root_glob.glob_many
+    '''
+    from cmsl1t.utils.root_glob import glob_many
+    return glob_many(paths, workers, cache)
+
+
+def _glob_options(input_cfg):
+    '''
+        Options of resolve_file_paths for the input files, from 'input: glob'
+    '''
+    from cmsl1t.utils.root_glob import ListingCache
+    settings = input_cfg.get('glob', {})
+    cache = None
+    if settings.get('cache_dir'):
+        cache = ListingCache(settings['cache_dir'],
+                             settings.get('cache_minutes', 60) * 60)
+    return dict(workers=settings.get('workers', 1), cache=cache)
 
 
 class ConfigParser(object):
     SECTIONS = ['general', 'input', 'analysis', 'output']
 
-    def __init__(self):
+    def __init__(self, static=False):
         self.config = {}
         self.config_errors = []
+        # check analyzers and producers without importing them (see
+        # cmsl1t.registry), e.g. to plan batch jobs
+        self.static = static
 
-    def read(self, input_file, reload_histograms=False, hist_files=None):
+    def read(self, input_file, reload_histograms=False, hist_files=None,
+             resume=False, overrides=None):
+        '''
+            overrides -- settings that replace those of the file, by section,
+                         e.g. {'output': {'folder': ...}}
+        '''
         cfg = yaml.load(input_file)
-        self._read_config(cfg, reload_histograms, hist_files)
+        self._read_config(cfg, reload_histograms, hist_files, resume,
+                          overrides)
 
-    def _read_config(self, cfg, reload_histograms=False, hist_files=None):
+    def _read_config(self, cfg, reload_histograms=False, hist_files=None,
+                     resume=False, overrides=None):
         cfg['general'] = dict(version=cfg['version'], name=cfg['name'])
         del cfg['version'], cfg['name']
+        for section, settings in (overrides or {}).items():
+            cfg.setdefault(section, {}).update(settings)
 
         input_files = cfg['input']['files']
         try:
-            input_files = resolve_file_paths(input_files)
+            # Batch jobs get the files that were found at submission
+            if cfg['input'].get('resolve_files', True):
+                input_files = resolve_file_paths(input_files,
+                                                 **_glob_options(cfg['input']))
         except Exception as e:
             msg = 'Could not resolve file paths:' + str(e)
             logger.exception(msg)
@@ -81,7 +110,8 @@ class ConfigParser(object):
             raise IOError(msg)
 
         try:
-            self.__fill_outdir_and_reload_files(reload_histograms, hist_files)
+            self.__fill_outdir_and_reload_files(reload_histograms, hist_files,
+                                                resume)
         except Exception as e:
             msg = 'Could not fill out output template: ' + str(e)
             logger.exception(msg)
@@ -115,6 +145,7 @@ class ConfigParser(object):
         results += [self.validate_input_files()]
         results += [self.validate_analyzers()]
         results += [self.validate_producers()]
+        results += [self.validate_trees()]
         return all(results)
 
     def validate_sections(self):
@@ -158,12 +189,39 @@ class ConfigParser(object):
         return input_files != []
 
     def validate_analyzers(self):
-        return self.__validate_module_imports(['analysis', 'analyzers'])
+        return self.__validate_module_imports(['analysis', 'analyzers'],
+                                              registry.ANALYZERS)
 
     def validate_producers(self):
-        return self.__validate_module_imports(['analysis', 'producers'])
-
-    def __validate_module_imports(self, config_keys):
+        return self.__validate_module_imports(['analysis', 'producers'],
+                                              registry.PRODUCERS)
+
+    def validate_trees(self):
+        analysis = self.config.get('analysis', {})
+        analyzers = analysis.get('analyzers', [])
+        if isinstance(analyzers, dict):
+            analyzers = analyzers.values()
+        msg = []
+        for analyzer in analyzers:
+            settings = analyzer if isinstance(analyzer, dict) else {}
+            m = settings.get('module', analyzer)
+            if isinstance(m, dict):
+                m = list(m.keys())[0]
+            trees = settings.get('load_trees', analysis.get('load_trees', []))
+            unsupported = set(trees or []).intersection(
+                registry.UNSUPPORTED_TREES.get(m, []))
+            if unsupported:
+                msg += ['Module {0} does not support {1}'.format(
+                    m, ', '.join(sorted(unsupported)))]
+        self.config_errors += msg
+        return not msg
+
+    def __module_exists(self, name, declared):
+        if not self.static:
+            return module.exists(name)
+        return name in declared or module.find(name)
+
+    def __validate_module_imports(self, config_keys, declared):
         modules = deepcopy(self.config)
         for key in config_keys:
             if key in modules:
@@ -174,34 +232,34 @@ class ConfigParser(object):
                 self.config_errors.append(msg)
                 return False
         if isinstance(modules, dict):
-            msg, results = self.__validate_module_setup_dict(modules)
+            msg, results = self.__validate_module_setup_dict(modules, declared)
         elif isinstance(modules, list):
-            msg, results = self.__validate_module_setup_list(modules)
+            msg, results = self.__validate_module_setup_list(modules, declared)
         if msg:
             self.config_errors.append('\n'.join(msg))
         return all(results)
 
-    def __validate_module_setup_dict(self, modules):
+    def __validate_module_setup_dict(self, modules, declared):
         msg = []
         results = []
         for name in modules.keys():
             m = modules[name]['module']
             if isinstance(m, dict):
                 m = m.keys()[0]
-            if not module.exists(m):
+            if not self.__module_exists(m, declared):
                 msg += ['Module {0} does not exist!'.format(m)]
                 results += [False]
             else:
                 results += [True]
         return msg, results
 
-    def __validate_module_setup_list(self, modules):
+    def __validate_module_setup_list(self, modules, declared):
         msg = []
         results = []
         for m in modules:
             if isinstance(m, dict):
                 m = m['module']
-            if not module.exists(m):
+            if not self.__module_exists(m, declared):
                 msg += ['Module {0} does not exist!'.format(m)]
                 results += [False]
             else:
@@ -211,7 +269,8 @@ class ConfigParser(object):
     def __repr__(self):
         return self.config.__repr__()
 
-    def __fill_outdir_and_reload_files(self, reload_histograms, hist_files):
+    def __fill_outdir_and_reload_files(self, reload_histograms, hist_files,
+                                       resume=False):
         cfg = self.config
 
         # Deduce what sort of reload we want:
@@ -252,8 +311,12 @@ class ConfigParser(object):
                         msg += " Looking for: " + output_folder
                         logger.error(msg)
                         raise IOError(msg)
-                    search_path = os.path.join(latest_version, "*.root")
-                    self.config['input']['hist_files'] = resolve_file_paths([search_path])
+                    search_paths = [os.path.join(latest_version, pattern)
+                                    for pattern in ["*.root", "*.npz"]]
+                    self.config['input']['hist_files'] = resolve_file_paths(search_paths)
+                elif resume and get_last_version_of(output_folder):
+                    # Continue in the output of the run that is resumed
+                    output_folder = get_last_version_of(output_folder)
                 else:
                     # Either merging multiple hists, or we're reading trees
                     # Essentially, this is a new analysis output
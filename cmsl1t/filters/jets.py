@@ -1,3 +1,5 @@
+import numpy as np
+
 
 def _pfJetID(jet):
     abs_eta = abs(jet.eta)
@@ -27,3 +29,31 @@ def _pfJetID(jet):
 
 def pfJetFilter(jets):
     return [jet for jet in jets if _pfJetID(jet)]
+
+
+def pfJetIDMask(jets):
+    '''
+        Columnar version of _pfJetID: jets is a dict of the jet attributes
+        (et, eta, cMult, ...) as flat numpy arrays, one entry per jet
+    '''
+    abs_eta = np.abs(jets['eta'])
+    isInnerJet = abs_eta <= 2.4
+    isCentralJet = abs_eta <= 2.7
+    isForwardCentralJet = (abs_eta > 2.7) & (abs_eta <= 3.0)
+    isForwardJet = abs_eta > 3.0
+    reject_if = [
+        jets['muMult'] != 0,
+        isCentralJet & (jets['nhef'] >= 0.9),
+        isCentralJet & (jets['nemef'] >= 0.9),
+        isCentralJet & ((jets['cMult'] + jets['nMult']) <= 1),
+        isCentralJet & (jets['mef'] >= 0.8),
+        isInnerJet & (jets['chef'] <= 0),
+        isInnerJet & (jets['cMult'] <= 0),
+        isInnerJet & (jets['cemef'] >= 0.9),
+        isForwardCentralJet & (jets['nhef'] >= 0.98),
+        isForwardCentralJet & (jets['nemef'] <= 0.01),
+        isForwardCentralJet & (jets['nMult'] <= 2),
+        isForwardJet & (jets['nemef'] >= 0.9),
+        isForwardJet & (jets['nMult'] <= 10),
+    ]
+    return ~np.logical_or.reduce(reject_if)
@@ -43,3 +43,15 @@ class LuminosityFilter(object):
 
     def __call__(self, run, lumi):
         return (run, lumi) in self.valid_lumi_sections
+
+    def mask(self, runs, lumis):
+        '''
+            Vectorised __call__: returns a boolean array, one entry per event.
+            Each (run, lumi) pair is only looked up once.
+        '''
+        keys = np.asarray(runs, dtype=np.int64) << 32
+        keys |= np.asarray(lumis, dtype=np.int64)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        passed = [(int(key >> 32), int(key & 0xffffffff)) in self.valid_lumi_sections
+                  for key in unique_keys]
+        return np.array(passed, dtype=bool)[inverse]
@@ -1,3 +1,4 @@
+import numpy as np
 
 
 def pfMetFilter(event):
@@ -14,3 +15,23 @@ def pfMetFilter(event):
     if any(reject_if):
         return False
     return True
+
+
+PF_MET_FILTERS = [
+    'MetFilters_badChCandFilter',
+    'MetFilters_badPFMuonFilter',
+    'MetFilters_ecalDeadCellTPFilter',
+    'MetFilters_eeBadScFilter',
+    'MetFilters_goodVerticesFilter',
+    'MetFilters_globalSuperTightHalo2016Filter',
+    'MetFilters_hbheNoiseFilter',
+    'MetFilters_hbheNoiseIsoFilter',
+]
+
+
+def pfMetFilterMask(batch):
+    '''
+        Columnar version of pfMetFilter: batch is a dict of alias -> array
+    '''
+    return np.logical_and.reduce(
+        [np.asarray(batch[name], dtype=bool) for name in PF_MET_FILTERS])
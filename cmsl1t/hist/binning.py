@@ -2,6 +2,7 @@ import bisect
 from exceptions import KeyError, IndexError
 from copy import deepcopy
 import logging
+import numpy as np
 
 
 logger = logging.getLogger(__name__)
@@ -81,6 +82,23 @@ class Base():
             bins.append(self.everything)
         return bins
 
+    def bin_masks(self, keys):
+        """
+        Vectorised version of find_all_bins.
+        Yields (bin index, mask) for every bin containing at least one of the
+        keys, where mask is a boolean array over the keys.
+        Derived classes should overload this with something faster.
+        """
+        found = [self.find_all_bins(key) for key in keys]
+        for index in self.iter_all():
+            mask = np.array([index in bins for bins in found], dtype=bool)
+            if mask.any():
+                yield index, mask
+
+    def _everything_mask(self, keys):
+        if self.use_everything_bin and len(keys):
+            yield self.everything, np.ones(len(keys), dtype=bool)
+
     def __getitem__(self, key):
         """
         Returns a list of the values whose bin contains this key
@@ -130,6 +148,20 @@ class Sorted(Base):
             found_bin = bisect.bisect(self.bins, key) - 1
         return [found_bin]
 
+    def bin_masks(self, keys):
+        keys = np.asarray(keys)
+        indices = np.searchsorted(self.bins, keys, side='right') - 1
+        for index in range(self.n_bins):
+            mask = indices == index
+            if mask.any():
+                yield index, mask
+        for index, mask in [(self.underflow, keys < self.bins[0]),
+                            (self.overflow, keys >= self.bins[-1])]:
+            if mask.any():
+                yield index, mask
+        for item in self._everything_mask(keys):
+            yield item
+
     def _bin_center(self, bin_index):
         try:
             return (self.bins[bin_index + 1] + self.bins[bin_index]) * 0.5
@@ -176,6 +208,19 @@ class GreaterThan(Base):
             contained_in = [self.overflow]
         return contained_in
 
+    def bin_masks(self, keys):
+        keys = np.asarray(keys)
+        passed_any = np.zeros(len(keys), dtype=bool)
+        for index, threshold in enumerate(self.bins):
+            mask = keys >= threshold
+            passed_any |= mask
+            if mask.any():
+                yield index, mask
+        if not passed_any.all():
+            yield self.overflow, ~passed_any
+        for item in self._everything_mask(keys):
+            yield item
+
     def _bin_center(self, bin_index):
         return self.bins[bin_index]
 
@@ -1,14 +1,13 @@
-from rootpy.io.pickler import dump, load
-from rootpy.plotting.hist import Hist, _HistBase
-from cmsl1t.hist.hist_collection import HistogramCollection
-# no pickles without dill
-import dill
+# rootpy is only imported when it is needed, as importing it starts ROOT
 
 
 def to_root(obj, output_file):
     '''
         Saves the obj into a ROOT file
     '''
+    from rootpy.io.pickler import dump
+    # no pickles without dill
+    import dill  # noqa: F401
     if isinstance(output_file, str) and not output_file.endswith('.root'):
         output_file += '.root'
     dump(obj, output_file)
@@ -18,6 +17,10 @@ def from_root(input_file):
     '''
         Loads the obj from a ROOT file
     '''
+    from rootpy.io.pickler import load
+    from rootpy.plotting.hist import Hist, _HistBase
+    from cmsl1t.hist.hist_collection import HistogramCollection
+    import dill  # noqa: F401
     reloaded = load(input_file, use_proxy=False)
 
     # Histogram objects are "owned" by the current TDirectory.  Need to unhook
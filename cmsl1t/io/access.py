@@ -0,0 +1,146 @@
+'''
+    Accounting of which aliases of the ntuple map are read during a job, and
+    what the underlying branches cost.  The report (a JSON file) can be used
+    to prune the ntuple maps, see cmsl1t.io.mapfile.prune_ntuple_map and
+    bin/create-map-file --used-aliases.
+
+    ROOT reads whole baskets of all active branches, so the bytes read cannot
+    be told apart per alias.  The report gives the bytes ROOT actually read
+    from the input files in total, and per alias an estimate: the events in
+    which it was read times the compressed size per entry of its branch (in
+    the first input file).
+'''
+import json
+from collections import Counter, OrderedDict
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _find_branch(tree, branchName):
+    branch = tree.GetBranch(branchName)
+    if not branch:
+        branch = tree.FindBranch(branchName)
+    return branch
+
+
+def branch_sizes(input_file, branches):
+    '''
+        Compressed and uncompressed bytes per entry of the branches, a list of
+        (<tree path>, <branchname>.<leafname>), in one input file
+    '''
+    import ROOT
+    sizes = {}
+    root_file = ROOT.TFile.Open(input_file)
+    if not root_file:
+        return sizes
+    for treeName, branchName in branches:
+        tree = root_file.Get(treeName)
+        branch = _find_branch(tree, branchName) if tree else None
+        if not branch or not branch.GetEntries():
+            continue
+        entries = float(branch.GetEntries())
+        sizes[(treeName, branchName)] = dict(
+            zip_bytes_per_event=branch.GetZipBytes('*') / entries,
+            tot_bytes_per_event=branch.GetTotBytes('*') / entries,
+        )
+    root_file.Close()
+    return sizes
+
+
+def _file_bytes_read():
+    ''' Bytes read from all files by ROOT so far, None without ROOT '''
+    try:
+        import ROOT
+        return ROOT.TFile.GetFileBytesRead()
+    except (ImportError, AttributeError):
+        return None
+
+
+class AliasAccess(object):
+    '''
+        Counts, per alias, the number of events in which it was read, and the
+        number of events each reader went through.  Between start_reading and
+        stop_reading, the bytes read by ROOT are counted in bytes_read.
+    '''
+
+    def __init__(self):
+        self.counts = Counter()
+        self.events = Counter()
+        self.bytes_read = None
+        self._bytes_at_start = None
+
+    def start_reading(self):
+        self._bytes_at_start = _file_bytes_read()
+
+    def stop_reading(self):
+        end = _file_bytes_read()
+        if self._bytes_at_start is None or end is None:
+            return
+        self.bytes_read = (self.bytes_read or 0) + end - self._bytes_at_start
+        self._bytes_at_start = None
+
+    def record(self, alias, n_events=1):
+        self.counts[alias] += n_events
+
+    def add_events(self, reader, n_events=1):
+        self.events[reader] += n_events
+
+    @property
+    def n_events(self):
+        return max(self.events.values()) if self.events else 0
+
+    def report(self, alias_map, input_files=()):
+        '''
+            returns: a dict with the number of events, the bytes read by ROOT
+            (None if not counted), and for each alias in the map: its tree and
+            branch, the number of events in which it was read, the size of its
+            branch (from the first input file) and an estimate of the
+            compressed bytes read for it
+        '''
+        sizes = {}
+        if input_files:
+            sizes = branch_sizes(input_files[0], sorted(set(alias_map.values())))
+        aliases = OrderedDict()
+        zip_bytes = dict(used=0., unused=0.)
+        estimated = 0.
+        for alias in sorted(alias_map):
+            treeName, branchName = alias_map[alias]
+            info = OrderedDict(tree=treeName, branch=branchName,
+                               events=self.counts.get(alias, 0))
+            info.update(sizes.get((treeName, branchName), {}))
+            if 'zip_bytes_per_event' in info:
+                info['estimated_zip_bytes_read'] = \
+                    info['events'] * info['zip_bytes_per_event']
+                estimated += info['estimated_zip_bytes_read']
+            aliases[alias] = info
+            used = 'used' if info['events'] else 'unused'
+            zip_bytes[used] += info.get('zip_bytes_per_event', 0.)
+        return OrderedDict([
+            ('events', self.n_events),
+            ('used', sorted(alias for alias in aliases
+                            if aliases[alias]['events'])),
+            ('bytes_read', self.bytes_read),
+            ('estimated_zip_bytes_read', estimated),
+            ('zip_bytes_per_event', zip_bytes),
+            ('aliases', aliases),
+        ])
+
+    def write(self, filename, alias_map, input_files=()):
+        report = self.report(alias_map, input_files)
+        with open(filename, 'w') as output:
+            json.dump(report, output, indent=1)
+        logger.info("{0} of {1} aliases were read, report written to {2}".format(
+            len(report['used']), len(report['aliases']), filename))
+        return report
+
+
+def read_used_aliases(filenames):
+    '''
+        The aliases that were read in any of the reports
+    '''
+    used = set()
+    for filename in filenames:
+        with open(filename) as report:
+            used.update(json.load(report)['used'])
+    return sorted(used)
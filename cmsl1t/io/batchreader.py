@@ -0,0 +1,184 @@
+'''
+    Reads chunks of events from the input ntuples as arrays (one per alias)
+    instead of one event at a time. Used to drive columnar analyzers, see
+    cmsl1t.analyzers.ColumnarAnalyzer
+'''
+import logging
+import numpy as np
+
+from cmsl1t.io.eventreader import _get_input_files, _create_alias_map
+from cmsl1t.jagged import JaggedArray
+
+logger = logging.getLogger(__name__)
+
+
+def _num_entries(tree):
+    if hasattr(tree, 'num_entries'):
+        return tree.num_entries
+    return tree.numentries
+
+
+def _read(branch, start, stop):
+    if hasattr(branch, 'num_entries'):
+        return branch.array(entry_start=start, entry_stop=stop)
+    # uproot 3.x
+    return branch.array(entrystart=start, entrystop=stop)
+
+
+def _find_branch(tree, path):
+    '''
+        The ntuple maps use <branchname>.<leafname>, which for split objects
+        is a sub-branch of <branchname>
+    '''
+    try:
+        return tree[path]
+    except KeyError:
+        branch = tree
+        for name in path.split('.'):
+            branch = branch[name]
+        return branch
+
+
+def _to_column(array):
+    '''
+        Converts whatever uproot returns into a numpy array (flat branches) or
+        a cmsl1t.jagged.JaggedArray (variable length branches)
+    '''
+    if isinstance(array, np.ndarray):
+        return array
+    if hasattr(array, 'content') and hasattr(array, 'offsets'):
+        # awkward 0.x JaggedArray
+        return JaggedArray(np.asarray(array.content), np.asarray(array.offsets))
+    # awkward >= 1.0
+    import awkward
+    if array.ndim == 1:
+        return awkward.to_numpy(array)
+    counts = awkward.to_numpy(awkward.num(array, axis=1))
+    content = awkward.to_numpy(awkward.flatten(array, axis=1))
+    return JaggedArray.from_counts(content, counts)
+
+
+class BatchReader(object):
+
+    def __init__(self, input_files, ntuple_map, nevents=-1, batch_size=10000,
+                 first_event=0, access=None, cache=None, prefetch=None):
+        '''
+            Reads ntuple_info as defined by bin/create-map-file.
+            Only the aliases passed to request() are read.  The first
+            first_event events are skipped (e.g. when resuming from a
+            checkpoint), nevents counts from the start of the inputs.
+            If given, the aliases read are counted in access (a
+            cmsl1t.io.access.AliasAccess).  With a cache (a
+            cmsl1t.io.branchcache.BranchCache) the branches are read from, or
+            saved to, its uncompressed copies instead.  Without a cache, the
+            input files can be copied ahead by prefetch, see EventReader.
+        '''
+        self._aliasMap = _create_alias_map(ntuple_map)
+        self.input_files = _get_input_files(input_files)
+        self.nevents = nevents
+        self.batch_size = batch_size
+        self.first_event = first_event
+        self.access = access
+        self.cache = cache
+        self.prefetch = prefetch if cache is None else None
+        self._aliases = set()
+
+    def __contains__(self, name):
+        return name in self._aliasMap
+
+    def request(self, aliases):
+        for alias in aliases:
+            if alias not in self:
+                logger.warn('Alias {0} is not in the ntuple map'.format(alias))
+                continue
+            self._aliases.add(alias)
+
+    @property
+    def aliases(self):
+        return sorted(self._aliases)
+
+    def _trees_for(self, aliases):
+        trees = {}
+        for alias in aliases:
+            treeName, branchName = self._aliasMap[alias]
+            trees.setdefault(treeName, []).append((alias, branchName))
+        return trees
+
+    def _open(self, input_file, trees_and_branches):
+        '''
+            returns: the aliases found in the input file, a function reading
+                     the entries [start, stop) of one of them, and the number
+                     of entries of the file
+        '''
+        if self.cache is not None:
+            return self._open_cached(input_file, trees_and_branches)
+        import uproot
+        root_file = uproot.open(input_file)
+        branches = {}
+        n_entries = None
+        for treeName, aliases in trees_and_branches.items():
+            try:
+                tree = root_file[treeName]
+            except KeyError:
+                logger.warn("Cannot find tree: {0} in {1}".format(
+                    treeName, input_file))
+                continue
+            for alias, branchName in aliases:
+                branches[alias] = _find_branch(tree, branchName)
+            entries = _num_entries(tree)
+            n_entries = entries if n_entries is None else min(n_entries, entries)
+
+        def read(alias, start, stop):
+            return _to_column(_read(branches[alias], start, stop))
+        return branches.keys(), read, n_entries
+
+    def _open_cached(self, input_file, trees_and_branches):
+        from cmsl1t.io.branchcache import slice_column
+        branches = {}
+        n_entries = None
+        for treeName, aliases in trees_and_branches.items():
+            entries = self.cache.num_entries(input_file, treeName)
+            if entries is None:
+                logger.warn("Cannot find tree: {0} in {1}".format(
+                    treeName, input_file))
+                continue
+            for alias, branchName in aliases:
+                branches[alias] = (treeName, branchName)
+            n_entries = entries if n_entries is None else min(n_entries, entries)
+        columns = {}
+
+        def read(alias, start, stop):
+            if alias not in columns:
+                columns[alias] = self.cache.column(input_file, *branches[alias])
+            return slice_column(columns[alias], start, stop)
+        return branches.keys(), read, n_entries
+
+    def __iter__(self):
+        trees_and_branches = self._trees_for(self._aliases)
+        n_read = 0
+        first_entry = 0
+        input_files = self.input_files
+        if self.prefetch is not None:
+            input_files = self.prefetch(input_files)
+        for input_file in input_files:
+            if self.nevents >= 0 and n_read >= self.nevents:
+                break
+            aliases, read, n_entries = self._open(input_file,
+                                                  trees_and_branches)
+            if not n_entries:
+                continue
+
+            if self.nevents >= 0:
+                n_entries = min(n_entries, self.nevents - n_read)
+            # Events before first_event are only counted
+            skip = min(max(self.first_event - first_entry, 0), n_entries)
+            for start in range(skip, n_entries, self.batch_size):
+                stop = min(start + self.batch_size, n_entries)
+                batch = {alias: read(alias, start, stop) for alias in aliases}
+                if self.access is not None:
+                    self.access.add_events('batches', stop - start)
+                    for alias in batch:
+                        self.access.record(alias, stop - start)
+                yield np.arange(first_entry + start, first_entry + stop), batch
+            n_read += n_entries
+            first_entry += n_entries
@@ -0,0 +1,265 @@
+'''
+    Local cache of ntuple branches as uncompressed arrays.
+
+    The first time a branch of an input file is read, all its entries are
+    decompressed once (with uproot) and saved as .npy files: the values, and
+    for variable length branches the offset of each entry in them (see
+    cmsl1t.jagged.JaggedArray).  Later runs map these files into memory
+    instead of reading the ROOT baskets again, so only the pages that are
+    used are loaded, without copies.
+
+    Entries are keyed by the identity of the input file (its path, size and
+    modification time), so a file that changes is read again.  The cache is
+    kept within a size budget by removing the least recently used branches.
+    Several processes can share the same directory: files are written under a
+    temporary name and renamed.
+'''
+import hashlib
+import json
+import os
+import re
+import tempfile
+import numpy as np
+from cmsl1t.jagged import JaggedArray
+import logging
+logger = logging.getLogger(__name__)
+
+_UNSAFE = re.compile(r'[^\w.-]')
+VALUES = '.values.npy'
+OFFSETS = '.offsets.npy'
+# Upper bound of the header of an .npy file
+_HEADER = 128
+
+
+def file_key(input_file):
+    '''
+        Identity of an input file: its path, size and modification time, or
+        only its URL for remote files
+    '''
+    identity = [input_file]
+    if os.path.exists(input_file):
+        stat = os.stat(input_file)
+        identity = [os.path.realpath(input_file), stat.st_size, stat.st_mtime]
+    return hashlib.sha1(repr(identity).encode('utf-8')).hexdigest()[:16]
+
+
+def slice_column(column, start, stop):
+    ''' Entries [start, stop) of a column, without copying its values '''
+    if isinstance(column, JaggedArray):
+        offsets = column.offsets[start:stop + 1]
+        return JaggedArray(column.content[offsets[0]:offsets[-1]],
+                           offsets - offsets[0])
+    return column[start:stop]
+
+
+def _read_branch(input_file, treeName, branchName):
+    import uproot
+    from cmsl1t.io.batchreader import _find_branch, _read, _to_column, \
+        _num_entries
+    tree = uproot.open(input_file)[treeName]
+    branch = _find_branch(tree, branchName)
+    return _to_column(_read(branch, 0, _num_entries(tree)))
+
+
+def _tree_entries(input_file, treeName):
+    import uproot
+    from cmsl1t.io.batchreader import _num_entries
+    try:
+        return _num_entries(uproot.open(input_file)[treeName])
+    except KeyError:
+        return None
+
+
+class BranchCache(object):
+    '''
+        Directory of cached branches, one sub-directory per input file
+
+        params:
+        - directory -- where to keep the arrays, e.g. on a scratch disk
+        - max_bytes -- size budget of the directory, None for no limit
+    '''
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._keys = {}
+
+    def _file_directory(self, input_file):
+        if input_file not in self._keys:
+            self._keys[input_file] = file_key(input_file)
+        return os.path.join(self.directory, self._keys[input_file])
+
+    def _path(self, input_file, treeName, branchName):
+        name = _UNSAFE.sub('_', '{0}:{1}'.format(treeName, branchName))
+        return os.path.join(self._file_directory(input_file), name)
+
+    def _write(self, directory, filename, write):
+        if not os.path.exists(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # Made by another process in the meantime
+                pass
+        # Write then rename, so other processes never see half a file
+        handle, tmp_name = tempfile.mkstemp(dir=directory)
+        with os.fdopen(handle, 'wb') as output:
+            write(output)
+        os.rename(tmp_name, filename)
+
+    def get(self, input_file, treeName, branchName):
+        ''' The cached column, memory-mapped, or None '''
+        path = self._path(input_file, treeName, branchName)
+        try:
+            values = np.load(path + VALUES, mmap_mode='r')
+        except (IOError, OSError, ValueError):
+            return None
+        try:
+            # marks the entry as recently used
+            os.utime(path + VALUES, None)
+        except OSError:
+            pass
+        if not os.path.exists(path + OFFSETS):
+            return values
+        return JaggedArray(values, np.load(path + OFFSETS, mmap_mode='r'))
+
+    def put(self, input_file, treeName, branchName, column):
+        '''
+            Save a column (numpy array or JaggedArray) of all entries of a
+            branch; columns larger than the budget, or of Python objects, are
+            not cached.
+
+            returns: whether the column was saved
+        '''
+        if isinstance(column, JaggedArray):
+            values, offsets = column.content, column.offsets
+        else:
+            values, offsets = column, None
+        size = values.nbytes + _HEADER
+        if offsets is not None:
+            size += offsets.nbytes + _HEADER
+        if values.dtype.hasobject or \
+                (self.max_bytes is not None and size > self.max_bytes):
+            return False
+        self.evict(self.max_bytes - size if self.max_bytes is not None
+                   else None)
+        path = self._path(input_file, treeName, branchName)
+        directory = os.path.dirname(path)
+        # The values come last: they mark a complete entry
+        if offsets is not None:
+            self._write(directory, path + OFFSETS,
+                        lambda output: np.save(output, offsets))
+        self._write(directory, path + VALUES,
+                    lambda output: np.save(output, np.ascontiguousarray(values)))
+        return True
+
+    def column(self, input_file, treeName, branchName):
+        ''' All entries of a branch, from the cache or read and cached '''
+        column = self.get(input_file, treeName, branchName)
+        if column is not None:
+            self.hits += 1
+            return column
+        self.misses += 1
+        column = _read_branch(input_file, treeName, branchName)
+        if self.put(input_file, treeName, branchName, column):
+            cached = self.get(input_file, treeName, branchName)
+            if cached is not None:
+                return cached
+        return column
+
+    def num_entries(self, input_file, treeName):
+        ''' Number of entries of a tree, None if the file does not have it '''
+        directory = self._file_directory(input_file)
+        filename = os.path.join(directory, 'entries.json')
+        entries = {}
+        if os.path.exists(filename):
+            with open(filename) as cached:
+                entries = json.load(cached)
+        if treeName not in entries:
+            entries[treeName] = _tree_entries(input_file, treeName)
+            self._write(directory, filename,
+                        lambda output: output.write(
+                            json.dumps(entries).encode('utf-8')))
+        return entries[treeName]
+
+    def entries(self):
+        '''
+            The cached branches as (last used, bytes, [files]), least recently
+            used first
+        '''
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for key in os.listdir(self.directory):
+            directory = os.path.join(self.directory, key)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.endswith(VALUES):
+                    continue
+                path = os.path.join(directory, name[:-len(VALUES)])
+                files = [path + VALUES]
+                if os.path.exists(path + OFFSETS):
+                    files.append(path + OFFSETS)
+                try:
+                    stats = [os.stat(f) for f in files]
+                except OSError:
+                    # Evicted by another process in the meantime
+                    continue
+                entries.append((stats[0].st_mtime,
+                                sum(s.st_size for s in stats), files))
+        return sorted(entries)
+
+    @property
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes=None):
+        '''
+            Remove the least recently used branches until the cache takes at
+            most max_bytes (by default the budget)
+
+            returns: the number of bytes freed
+        '''
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        if max_bytes is None:
+            return 0
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _, size, files in entries:
+            if total - freed <= max_bytes:
+                break
+            for filename in files:
+                try:
+                    os.remove(filename)
+                except OSError:
+                    pass
+            freed += size
+        if freed:
+            logger.info("Removed {0:.1f} MB of cached branches from {1}".format(
+                freed / 1024. ** 2, self.directory))
+        return freed
+
+
+class CachedTree(object):
+    '''
+        Stands in for the tree of one input file in events of the EventReader:
+        values come from the columns of a BranchCache, at the current entry
+    '''
+
+    def __init__(self, cache, input_file, name):
+        self.cache = cache
+        self.input_file = input_file
+        self.name = name
+        self.entry = 0
+        self._columns = {}
+
+    def value(self, branchName):
+        column = self._columns.get(branchName)
+        if column is None:
+            column = self.cache.column(self.input_file, self.name, branchName)
+            self._columns[branchName] = column
+        return column[self.entry]
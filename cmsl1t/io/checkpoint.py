@@ -0,0 +1,136 @@
+"""
+Checkpoints of the event loop.
+
+Every `every` events, or every `minutes` minutes, the plotters of the analyzers
+that are processing events are written as npz files (cmsl1t.io.npz), together
+with the number of events each reader has processed.  cmsl1t --resume reloads
+the last checkpoint into the analyzers, and the readers skip the events that
+were already processed.
+
+Each checkpoint is written into its own directory and only becomes the current
+one once the state file pointing to it was replaced, so a job that dies while
+writing a checkpoint still has the previous one.  Only the plotters registered
+with an analyzer (all_plots) are saved, not other attributes of the analyzer.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+from cmsl1t.io.npz import to_npz
+import logging
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "checkpoint.json"
+
+
+class Checkpoint(object):
+    """
+    params:
+    - directory -- where the checkpoints are kept
+    - input_files -- the input files of the analysis, a checkpoint of other
+                     files is never resumed
+    - every -- number of events between checkpoints (None: no limit)
+    - minutes -- time between checkpoints (None: no limit)
+    - resume -- whether to continue from the last checkpoint in directory
+    """
+
+    def __init__(self, directory, input_files, every=None, minutes=None,
+                 resume=False):
+        self.directory = directory
+        self.input_files = list(input_files)
+        self.every = every
+        self.minutes = minutes
+        self.analyzers = []
+        self.positions = {}
+        self._events_since_save = 0
+        self._last_save = time.time()
+        self._state = self._load_state() if resume else None
+        if self._state is not None:
+            self.positions = dict(self._state['positions'])
+            logger.info("Resuming from checkpoint {0} ({1})".format(
+                self._state['generation'], self.positions))
+
+    def _load_state(self):
+        filename = os.path.join(self.directory, STATE_FILE)
+        if not os.path.exists(filename):
+            logger.warning("No checkpoint to resume from in " + self.directory)
+            return None
+        with open(filename) as state_file:
+            state = json.load(state_file)
+        if state['input_files'] != self.input_files:
+            logger.warning("Not resuming {0}, it was made for other input "
+                           "files".format(filename))
+            return None
+        return state
+
+    def _generation_dir(self, generation):
+        return os.path.join(self.directory, "{0:06d}".format(generation))
+
+    def first_event(self, reader_name):
+        """ Number of events the reader had processed at the checkpoint """
+        return self.positions.get(reader_name, 0)
+
+    def restore(self, analyzers):
+        """
+        Reload the checkpointed histograms into the analyzers (once they have
+        built their plotters), and include them in the next checkpoints.
+
+        returns:
+          True if all histograms were reloaded without problem.
+        """
+        results = []
+        for analyzer in analyzers:
+            self.analyzers.append(analyzer)
+            if self._state is None or \
+                    analyzer.name not in self._state['analyzers']:
+                continue
+            filename = os.path.join(
+                self._generation_dir(self._state['generation']),
+                analyzer.name + ".npz")
+            results.append(analyzer.reload_histogram_files([filename]))
+        return all(results)
+
+    def update(self, reader_name, n_events, n_new=1):
+        """
+        Record that the reader has processed n_events events (n_new since the
+        last call), and write a checkpoint if one is due.
+        """
+        self.positions[reader_name] = n_events
+        self._events_since_save += n_new
+        due = self.every and self._events_since_save >= self.every
+        due |= bool(self.minutes) and \
+            time.time() - self._last_save >= self.minutes * 60
+        if due:
+            self.save()
+
+    def save(self):
+        previous = self._state['generation'] if self._state else 0
+        generation = previous + 1
+        directory = self._generation_dir(generation)
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+        for analyzer in self.analyzers:
+            to_npz(analyzer.all_plots,
+                   os.path.join(directory, analyzer.name + ".npz"))
+
+        state = dict(generation=generation, input_files=self.input_files,
+                     positions=self.positions,
+                     analyzers=[analyzer.name for analyzer in self.analyzers])
+        handle, tmp_name = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(handle, 'w') as output:
+            json.dump(state, output)
+        os.rename(tmp_name, os.path.join(self.directory, STATE_FILE))
+        if previous:
+            shutil.rmtree(self._generation_dir(previous), ignore_errors=True)
+
+        self._state = state
+        self._events_since_save = 0
+        self._last_save = time.time()
+        logger.info("Wrote checkpoint {0} ({1})".format(
+            generation, self.positions))
+
+    def clear(self):
+        """ Remove all checkpoints, once the analysis finished """
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -1,15 +1,13 @@
 import logging
+import itertools
 import six
 
-import ROOT
-from rootpy.tree import TreeChain
-
+from cmsl1t.io.branchcache import CachedTree
+from cmsl1t.io.skim import rebuild_product
 from cmsl1t.utils.root_glob import glob
 from cmsl1t.utils.module import load_L1TNTupleLibrary
 
-load_L1TNTupleLibrary()
 logger = logging.getLogger(__name__)
-sumTypes = ROOT.l1t.EtSum
 
 
 def _get_input_files(paths):
@@ -48,61 +46,203 @@ def _create_alias_map(ntuple_map):
     return aliasMap
 
 
+def _count_entries(input_file, treeNames):
+    ''' Number of events in a file, as read by EventReader '''
+    import ROOT
+    root_file = ROOT.TFile.Open(input_file)
+    entries = [root_file.Get(treeName) for treeName in treeNames]
+    entries = [tree.GetEntries() for tree in entries if tree]
+    root_file.Close()
+    return min(entries) if entries else 0
+
+
 class EventReader(object):
 
-    def __init__(self, input_files, ntuple_map, nevents=-1):
+    def __init__(self, input_files, ntuple_map, nevents=-1, first_event=0,
+                 access=None, cache=None, prefetch=None):
         '''
-            Reads ntuple_info as defined by bin/create-map-file
+            Reads ntuple_info as defined by bin/create-map-file.
+            The first first_event events are skipped (e.g. when resuming
+            from a checkpoint), nevents counts from the start of the inputs.
+            If given, the aliases read by the events are counted in access
+            (a cmsl1t.io.access.AliasAccess).
+            Maps of skims (cmsl1t.io.skim) also describe producer outputs,
+            which the events rebuild when they are read.
+            With a cache (a cmsl1t.io.branchcache.BranchCache) the branches
+            are read from, or saved to, its uncompressed copies instead.
+            prefetch is a function that, given the input files, returns an
+            iterable of local copies (a cmsl1t.io.prefetch.Prefetcher); the
+            files are then opened one by one.  It is not used with a cache.
+            files_opened counts the input files (or trees) opened so far.
         '''
         self._treeNames = ntuple_map['content'].keys()
         self._aliasMap = _create_alias_map(ntuple_map)
+        self._products = ntuple_map.get('products') or {}
         self.input_files = _get_input_files(input_files)
         self.nevents = nevents
+        self.first_event = first_event
+        self.access = access
+        self.cache = cache
+        self.prefetch = prefetch if cache is None else None
         self._trees = {}
-
-        self._load_trees()
-
-    def _load_trees(self):
+        self._skip = 0
+        self._files = []
+        self.files_opened = 0
+        if cache is not None:
+            return
+        # ROOT and the data formats are only loaded for readers of ntuples
+        load_L1TNTupleLibrary()
+
+        files, nevents = self.input_files, self.nevents
+        if first_event:
+            files, self._skip, n_skipped = self._files_after(first_event)
+            if nevents >= 0:
+                nevents = max(nevents - n_skipped, 0)
+        if prefetch is not None:
+            self._files, self._nevents = files, nevents
+        elif files:
+            self._trees = self._open_trees(files, nevents)
+
+    def _files_after(self, first_event):
+        '''
+            The input files that still have to be read after first_event
+            events, the number of events to skip in the first of them, and the
+            number of events in the skipped files
+        '''
+        n_skipped = 0
+        for i, input_file in enumerate(self.input_files):
+            n_entries = _count_entries(input_file, self._treeNames)
+            if n_skipped + n_entries > first_event:
+                return self.input_files[i:], first_event - n_skipped, n_skipped
+            n_skipped += n_entries
+        return [], 0, n_skipped
+
+    def _open_trees(self, input_files, nevents):
+        from rootpy.tree import TreeChain
+        trees = {}
         for treeName in self._treeNames:
             try:
-                self._trees[treeName] = TreeChain(
+                trees[treeName] = TreeChain(
                     treeName,
-                    self.input_files,
+                    input_files,
                     cache=True,
-                    events=self.nevents,
+                    events=nevents,
+                    onfilechange=[(self._file_opened, ())],
                 )
             except RuntimeError:
                 logger.warn(
                     "Cannot find tree: {0} in input file".format(treeName))
                 continue
+        return trees
+
+    def _file_opened(self, **kwargs):
+        self.files_opened += 1
 
     def __contains__(self, name):
         return name in self._aliasMap.keys()
 
+    def _iter_cached(self):
+        n_read = 0
+        for input_file in self.input_files:
+            if self.nevents >= 0 and n_read >= self.nevents:
+                break
+            trees = {}
+            n_entries = None
+            for treeName in self._treeNames:
+                entries = self.cache.num_entries(input_file, treeName)
+                if entries is None:
+                    logger.warn("Cannot find tree: {0} in {1}".format(
+                        treeName, input_file))
+                    continue
+                trees[treeName] = CachedTree(self.cache, input_file, treeName)
+                n_entries = entries if n_entries is None else \
+                    min(n_entries, entries)
+            if not n_entries:
+                continue
+            self.files_opened += 1
+            if self.nevents >= 0:
+                n_entries = min(n_entries, self.nevents - n_read)
+            skip = min(max(self.first_event - n_read, 0), n_entries)
+            for entry in range(skip, n_entries):
+                for tree in trees.values():
+                    tree.entry = entry
+                if self.access is not None:
+                    self.access.add_events('events')
+                yield Event(trees, self._aliasMap, self.access,
+                            self._products)
+            n_read += n_entries
+
+    def _iter_prefetched(self):
+        n_read, skip = 0, self._skip
+        for input_file in self.prefetch(self._files):
+            if self._nevents >= 0 and n_read >= self._nevents:
+                break
+            trees = self._open_trees([input_file], -1)
+            if not trees:
+                continue
+            for _ in six.moves.zip(*trees.itervalues()):
+                if self._nevents >= 0 and n_read >= self._nevents:
+                    break
+                n_read += 1
+                if skip:
+                    skip -= 1
+                    continue
+                if self.access is not None:
+                    self.access.add_events('events')
+                yield Event(trees, self._aliasMap, self.access,
+                            self._products)
+
     def __iter__(self):
         # event loop
-        for trees in six.moves.zip(*self._trees.itervalues()):
-            yield Event(self._trees, self._aliasMap)
+        if self.cache is not None:
+            for event in self._iter_cached():
+                yield event
+            return
+        if self.prefetch is not None:
+            for event in self._iter_prefetched():
+                yield event
+            return
+        if not self._trees:
+            return
+        entries = six.moves.zip(*self._trees.itervalues())
+        for trees in itertools.islice(entries, self._skip, None):
+            if self.access is not None:
+                self.access.add_events('events')
+            yield Event(self._trees, self._aliasMap, self.access,
+                        self._products)
 
 
 class Event(object):
 
-    def __init__(self, trees, mapping):
+    def __init__(self, trees, mapping, access=None, products=None):
         self._map = mapping
         self._trees = trees
         self._cache = {}
+        self._access = access
+        self._products = products or {}
 
     def __getattr__(self, name):
         if name in object.__getattribute__(self, '_cache'):
             return object.__getattribute__(self, '_cache')[name]
 
+        products = object.__getattribute__(self, '_products')
+        if name in products:
+            obj = rebuild_product(self, name, products[name])
+            object.__getattribute__(self, '_cache')[name] = obj
+            return obj
         if name not in object.__getattribute__(self, '_map'):
             return object.__getattribute__(self, name)
         treeName, treeAttr = object.__getattribute__(self, '_map')[name]
+        access = object.__getattribute__(self, '_access')
+        if access is not None:
+            access.record(name)
         tree = object.__getattribute__(self, '_trees')[treeName]
-        obj = tree
-        for attr in treeAttr.split('.'):
-            obj = getattr(obj, attr)
+        if isinstance(tree, CachedTree):
+            obj = tree.value(treeAttr)
+        else:
+            obj = tree
+            for attr in treeAttr.split('.'):
+                obj = getattr(obj, attr)
         object.__getattribute__(self, '_cache')[name] = obj
         return obj
 
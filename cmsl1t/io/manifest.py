@@ -0,0 +1,86 @@
+"""
+Manifests of histogram files.
+
+Every {analyzer}_histograms.root (or .npz) file gets a small JSON file next to
+it, listing the analyzer that wrote it and a checksum of each of its plotter
+directories.  When reloading, the manifests are used to send each file only to
+the analyzer that wrote it, and to only read the directories that are actually
+in the file.  Files without a manifest (written by older versions) are routed
+by their name, with BaseAnalyzer.might_contain_histograms.
+"""
+import json
+import os
+from collections import OrderedDict
+from cmsl1t.plotting.cache import content_hash
+import logging
+logger = logging.getLogger(__name__)
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def manifest_filename(hist_file):
+    return os.path.splitext(hist_file)[0] + MANIFEST_SUFFIX
+
+
+def write_manifest(hist_file, analyzer_name, plotters):
+    '''
+        Writes the manifest of a histogram file holding the plotters
+    '''
+    directories = OrderedDict((plotter.directory_name, content_hash(plotter))
+                              for plotter in plotters)
+    manifest = dict(analyzer=analyzer_name, file=os.path.basename(hist_file),
+                    directories=directories)
+    with open(manifest_filename(hist_file), 'w') as output:
+        json.dump(manifest, output, indent=1)
+
+
+def read_manifest(hist_file):
+    '''
+        Reads the manifest of a histogram file, None if it has none
+    '''
+    filename = manifest_filename(hist_file)
+    if not os.path.exists(filename):
+        return None
+    try:
+        with open(filename) as manifest:
+            manifest = json.load(manifest)
+    except ValueError:
+        logger.warning("Ignoring invalid manifest " + filename)
+        return None
+    if manifest.get('file') != os.path.basename(hist_file):
+        return None
+    return manifest
+
+
+def route_histogram_files(filenames, analyzers):
+    '''
+        Decides which analyzer reads which histogram files, reading every
+        manifest once.
+
+        returns: an OrderedDict of {analyzer: [filenames]}
+    '''
+    by_name = dict((analyzer.name, analyzer) for analyzer in analyzers)
+    routes = OrderedDict((analyzer, []) for analyzer in analyzers)
+    checksums = {}
+    for filename in filenames:
+        manifest = read_manifest(filename)
+        if manifest is None:
+            for analyzer in analyzers:
+                if analyzer.might_contain_histograms(filename):
+                    routes[analyzer].append(filename)
+            continue
+
+        analyzer = by_name.get(manifest['analyzer'])
+        if analyzer is None:
+            logger.warning("Skipping {0}, written by analyzer '{1}'".format(
+                filename, manifest['analyzer']))
+            continue
+        routes[analyzer].append(filename)
+
+        checksum = json.dumps(sorted(manifest['directories'].items()))
+        if checksum in checksums:
+            logger.warning("{0} holds the same histograms as {1}, "
+                           "are they outputs of the same job?".format(
+                               filename, checksums[checksum]))
+        checksums.setdefault(checksum, filename)
+    return routes
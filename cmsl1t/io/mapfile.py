@@ -1,3 +1,4 @@
+from copy import deepcopy
 
 
 def full_path_alias(path, objName):
@@ -32,3 +33,24 @@ def shorthand_alias(path, treeName, objName):
         tokens += objName.split('.')[-2:]
 
     return 'event.' + '_'.join(tokens)
+
+
+def prune_ntuple_map(ntuple_map, used_aliases):
+    '''
+        Copy of an ntuple map (see bin/create-map-file) with only the given
+        aliases, e.g. the 'used' lists of cmsl1t.io.access reports.  Branches
+        and trees that are left without aliases are dropped.
+    '''
+    used = set(alias.replace('event.', '') for alias in used_aliases)
+    pruned = deepcopy(ntuple_map)
+    trees = pruned['content']
+    for treeName, content in list(trees.items()):
+        branches = content['branches']
+        for branchName, branch in list(branches.items()):
+            branch['aliases'] = [alias for alias in branch['aliases']
+                                 if alias.replace('event.', '') in used]
+            if not branch['aliases']:
+                del branches[branchName]
+        if not branches:
+            del trees[treeName]
+    return pruned
@@ -0,0 +1,267 @@
+"""
+Merge the histogram files of an analyzer in parallel.
+
+The files are the leaves of a tree, where every node sums (at most) FAN_IN
+children.  Each node is merged in a fresh worker process, forked from the
+analysis process before anything was reloaded into it: the worker reloads
+the node's inputs into its copy of the analyzer, with reload_histogram_files,
+and writes the sum as an npz file (cmsl1t.io.npz).  Nodes are started as soon
+as all of their children are done, so the partial sums stream up the tree
+while other branches are still being read.  Only the sum at the root of the
+tree is finally reloaded into the analyzer itself.
+
+If a node fails, or its worker dies, each of its inputs is checked on its own.
+Inputs that cannot be read are reported and left out, and the node is merged
+again without them.  If all of them can be read but still not be summed (e.g.
+files of different configs), the files of the node are all left out.
+
+Partial sums are kept in a work directory, keyed by the input files they
+cover (names, sizes and modification times).  An interrupted merge can
+therefore be restarted, and will skip every part of the tree that was already
+summed.  The work directory is removed once the merge succeeded.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import traceback
+from cmsl1t.io.npz import to_npz
+from cmsl1t.utils.workers import Workers
+import logging
+logger = logging.getLogger(__name__)
+
+# Number of children summed by each node of the tree
+FAN_IN = 2
+# The analyzer of the current merge, inherited by the forked workers
+_ANALYZER = None
+
+
+def _file_key(filename):
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        # e.g. remote files
+        return [filename]
+    return [os.path.abspath(filename), stat.st_size, int(stat.st_mtime)]
+
+
+class _Node(object):
+    """
+    Sum of the input files of all leaves below this node.
+    output -- file holding the sum once the node is done, None if none of
+              its inputs could be read
+    failed -- {filename: error} of the inputs that were left out
+    """
+
+    def __init__(self, children=(), filename=None):
+        self.children = list(children)
+        if filename is not None:
+            self.files = [filename]
+        else:
+            self.files = sum([child.files for child in self.children], [])
+        self.output = filename
+        self.done = filename is not None
+        self.failed = {}
+        self.inputs = []
+        self.n_checks = 0
+        self.error = None
+        self._key = None
+
+    @property
+    def key(self):
+        if self._key is None:
+            keys = json.dumps([_file_key(name) for name in self.files])
+            self._key = hashlib.sha1(keys.encode('utf-8')).hexdigest()
+        return self._key
+
+    def __repr__(self):
+        return "merge of {0} files ({1}...)".format(len(self.files),
+                                                    self.files[0])
+
+
+def _build_tree(filenames, fan_in=FAN_IN):
+    level = [_Node(filename=filename) for filename in filenames]
+    nodes = []
+    while len(level) > 1:
+        level = [_Node(level[i:i + fan_in])
+                 for i in range(0, len(level), fan_in)]
+        nodes += level
+    return level[0], nodes
+
+
+def _run_merge(inputs, output):
+    """
+    Sum the inputs into the output file, or only check they can be reloaded if
+    output is None.  Runs in a new worker process for every call.
+    """
+    try:
+        if not _ANALYZER.reload_histogram_files(inputs):
+            return "Could not reload histograms from {0}".format(inputs)
+        if output is not None:
+            handle, tmp_name = tempfile.mkstemp(
+                dir=os.path.dirname(output), suffix=".npz")
+            os.close(handle)
+            to_npz(_ANALYZER.all_plots, tmp_name)
+            os.rename(tmp_name, output)
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+
+class TreeMerge(object):
+    """
+    Merges the histogram files of an analyzer with n_workers processes at a
+    time, keeping partial sums in work_dir
+    """
+
+    def __init__(self, analyzer, filenames, work_dir, n_workers=2,
+                 fan_in=FAN_IN):
+        self.analyzer = analyzer
+        self.work_dir = work_dir
+        self.n_workers = n_workers
+        self.root, self.nodes = _build_tree(filenames, fan_in)
+        self._workers = None
+
+    def _partial(self, node):
+        return os.path.join(self.work_dir, node.key + ".npz")
+
+    def _summary(self, node):
+        return os.path.join(self.work_dir, node.key + ".json")
+
+    def _load_finished(self, node):
+        """ Reuse the partial sum of a previous, interrupted merge """
+        if not all(os.path.exists(name) for name in
+                   [self._summary(node), self._partial(node)]):
+            return False
+        with open(self._summary(node)) as summary:
+            node.failed = json.load(summary)["failed"]
+        node.output = self._partial(node)
+        node.done = True
+        return True
+
+    def _reuse_finished(self, node):
+        """ returns: the number of partial sums that can be reused """
+        if node.done:
+            return 0
+        if self._load_finished(node):
+            return 1
+        return sum(self._reuse_finished(child) for child in node.children)
+
+    def _next_finished(self):
+        (node, inputs, output), result, error = self._workers.next_finished()
+        return node, inputs, output, error or result
+
+    def _submit(self, node, inputs, output):
+        self._workers.submit((node, inputs, output), _run_merge, inputs,
+                             output)
+
+    def _start(self, node):
+        node.inputs = [child.output for child in node.children
+                       if child.output is not None]
+        for child in node.children:
+            node.failed.update(child.failed)
+        if len(node.inputs) > 1:
+            self._submit(node, node.inputs, self._partial(node))
+            return
+        # Nothing to sum
+        node.output = node.inputs[0] if node.inputs else None
+        node.done = True
+
+    def _finish(self, node, inputs, output, error):
+        if output is None:
+            # One input of a failed node, checked on its own
+            node.n_checks -= 1
+            if error:
+                node.failed[inputs[0]] = error
+            if node.n_checks:
+                return
+            good = [name for name in node.inputs if name not in node.failed]
+            if len(good) == len(node.inputs):
+                logger.error("Failed {0}, although all of its inputs can be "
+                             "reloaded, leaving out all of its files".format(
+                                 node))
+                for name in node.files:
+                    node.failed.setdefault(name, node.error)
+                node.output = None
+                node.done = True
+                return
+            node.inputs = good
+            if len(good) > 1:
+                self._submit(node, good, self._partial(node))
+            else:
+                node.output = good[0] if good else None
+                node.done = True
+            return
+
+        if not error:
+            with open(self._summary(node), 'w') as summary:
+                json.dump(dict(files=node.files, failed=node.failed), summary)
+            node.output = output
+            node.done = True
+            return
+
+        logger.warning("Failed {0}, checking each of its inputs".format(node))
+        node.error = error
+        node.n_checks = len(inputs)
+        for name in inputs:
+            self._submit(node, [name], None)
+
+    def run(self):
+        """
+        returns:
+          The file with the sum of all inputs (None if there are none) and a
+          dict {filename: error} of the inputs that could not be merged
+        """
+        if not os.path.exists(self.work_dir):
+            os.makedirs(self.work_dir)
+        n_reused = self._reuse_finished(self.root)
+        if n_reused:
+            logger.info("Reusing {0} partial sums from {1}".format(
+                n_reused, self.work_dir))
+
+        global _ANALYZER
+        _ANALYZER = self.analyzer
+        # One process per merge, so every merge starts from an empty analyzer
+        self._workers = Workers(self.n_workers)
+        try:
+            started = set()
+            while not self.root.done:
+                for node in self.nodes:
+                    if id(node) in started or node.done:
+                        continue
+                    if all(child.done for child in node.children):
+                        started.add(id(node))
+                        self._start(node)
+                if self.root.done:
+                    break
+                self._finish(*self._next_finished())
+        finally:
+            self._workers.terminate()
+            _ANALYZER = None
+        return self.root.output, self.root.failed
+
+    def clean_up(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def merge_histogram_files(analyzer, filenames, work_dir, n_workers=2):
+    """
+    Merge all filenames into the analyzer with a TreeMerge.
+
+    returns:
+      True if all files were merged, files that could not be read are logged
+      and left out
+    """
+    merge = TreeMerge(analyzer, filenames, work_dir, n_workers)
+    logger.info("Merging {0} histogram files with {1} workers".format(
+        len(filenames), n_workers))
+    output, failed = merge.run()
+    for filename, error in sorted(failed.items()):
+        logger.error("Left out {0}:\n{1}".format(filename, error))
+    if output is None:
+        return False
+    ok = analyzer.reload_histogram_files([output])
+    if ok and not failed:
+        merge.clean_up()
+    return ok and not failed
@@ -0,0 +1,341 @@
+"""
+Columnar storage of plotters, as an alternative to pickling them into ROOT
+files (cmsl1t.io.to_root).
+
+All histograms of a list of plotters are written into one numpy .npz file as a
+few flat arrays (bin contents, sum of squared weights, statistics and number
+of entries), together with a JSON schema describing the plotters: their
+attributes, and the class, binning, titles and style of every histogram.
+
+Reloading creates the histograms directly from the arrays.  Files that were
+written by the same configuration (same histograms and same plotter
+attributes) are summed as arrays before any histogram is created, so merging
+the outputs of many jobs is mostly array I/O and additions.  Attributes listed
+in a plotter's summed_attributes (e.g. event counters) are added up as well.
+"""
+import json
+import sys
+import types
+from array import array
+from collections import OrderedDict
+from importlib import import_module
+import numpy as np
+from cmsl1t.utils.hist import bin_contents, bin_sumw2, bin_edges
+import logging
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+# Large enough for TH1::GetStats of 1D to 3D histograms
+N_STATS = 13
+STYLE = ['LineColor', 'LineStyle', 'LineWidth', 'MarkerColor', 'MarkerStyle',
+         'MarkerSize', 'FillColor', 'FillStyle']
+AXES = 'xyz'
+HIST_ARRAYS = ['contents', 'sumw2', 'stats', 'entries']
+
+_SCALARS = (type(None), bool, int, float, str)
+if sys.version_info[0] < 3:
+    _SCALARS += (long, unicode)  # noqa: F821
+
+
+def _new_instance(cls):
+    """ An instance of cls, without calling __init__ """
+    if isinstance(cls, type):
+        return cls.__new__(cls)
+    # Old-style python 2 classes
+    return types.InstanceType(cls)
+
+
+def _native_string(value):
+    if sys.version_info[0] < 3 and isinstance(value, unicode):  # noqa: F821
+        return value.encode('utf-8')
+    return value
+
+
+class _Writer(object):
+
+    def __init__(self):
+        self.hists = []
+        self.arrays = {name: [] for name in HIST_ARRAYS}
+        self.state_arrays = OrderedDict()
+        self.objects = {}
+
+    def encode(self, obj):
+        if isinstance(obj, _SCALARS):
+            return obj
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            key = "state_{0}".format(len(self.state_arrays))
+            self.state_arrays[key] = obj
+            return {"__array__": key}
+        if isinstance(obj, list):
+            return [self.encode(item) for item in obj]
+        if isinstance(obj, tuple):
+            return {"__tuple__": [self.encode(item) for item in obj]}
+        if isinstance(obj, dict):
+            items = sorted(obj.items(), key=lambda item: repr(item[0]))
+            return {"__dict__": [[self.encode(k), self.encode(v)]
+                                 for k, v in items]}
+        if isinstance(obj, (types.FunctionType, types.BuiltinFunctionType)):
+            return {"__function__": [obj.__module__, obj.__name__]}
+        if hasattr(obj, 'GetPassedHistogram'):
+            return {"__efficiency__": self._efficiency(obj)}
+        if hasattr(obj, 'GetNbinsX'):
+            return {"__hist__": self._hist(obj)}
+        if hasattr(obj, '__dict__') and not hasattr(obj, 'IsA'):
+            if id(obj) in self.objects:
+                return {"__ref__": self.objects[id(obj)]}
+            self.objects[id(obj)] = len(self.objects)
+            cls = obj.__class__
+            return {"__object__": [cls.__module__, cls.__name__],
+                    "state": self.encode(vars(obj))}
+        raise TypeError("Cannot store {0} in a histogram file".format(type(obj)))
+
+    def _hist(self, hist):
+        if hist.InheritsFrom("TProfile"):
+            raise TypeError("Cannot store profile {0}".format(hist.GetName()))
+        contents = bin_contents(hist)
+        sumw2 = bin_sumw2(hist)
+        stats = array('d', [0.] * N_STATS)
+        hist.GetStats(stats)
+        axes = AXES[:hist.GetDimension()]
+
+        self.arrays['contents'].append(contents.astype(np.float64))
+        self.arrays['sumw2'].append(np.zeros(len(contents)) if sumw2 is None
+                                    else sumw2.astype(np.float64))
+        self.arrays['stats'].append(np.array(stats))
+        self.arrays['entries'].append(np.array([hist.GetEntries()]))
+        self.hists.append(dict(
+            cls=hist.ClassName(), name=hist.GetName(), title=hist.GetTitle(),
+            edges=[bin_edges(hist, axis).tolist() for axis in axes],
+            axis_titles=[hist.GetXaxis().GetTitle(), hist.GetYaxis().GetTitle(),
+                         hist.GetZaxis().GetTitle()],
+            size=len(contents), sumw2=sumw2 is not None,
+            style=_get_style(hist),
+        ))
+        return len(self.hists) - 1
+
+    def _efficiency(self, efficiency):
+        return dict(
+            name=efficiency.GetName(), title=efficiency.GetTitle(),
+            passed=self._hist(efficiency.GetPassedHistogram()),
+            total=self._hist(efficiency.GetTotalHistogram()),
+            statistic=efficiency.GetStatisticOption(),
+            confidence=efficiency.GetConfidenceLevel(),
+            weight=efficiency.GetWeight(),
+            style=_get_style(efficiency),
+        )
+
+    def flat_arrays(self):
+        arrays = {}
+        for name, values in self.arrays.items():
+            arrays[name] = np.concatenate(values) if values else np.zeros(0)
+        arrays.update(self.state_arrays)
+        return arrays
+
+
+def _get_style(obj):
+    style = {name: getattr(obj, 'Get' + name)() for name in STYLE
+             if hasattr(obj, 'Get' + name)}
+    drawstyle = getattr(obj, 'drawstyle', None)
+    if isinstance(drawstyle, str):
+        style['drawstyle'] = drawstyle
+    return style
+
+
+def _set_style(obj, style):
+    for name, value in style.items():
+        if name == 'drawstyle':
+            obj.drawstyle = _native_string(value)
+        else:
+            getattr(obj, 'Set' + name)(value)
+
+
+class _Reader(object):
+
+    def __init__(self, schema, arrays):
+        self.hists = schema['hists']
+        self.arrays = arrays
+        sizes = [hist['size'] for hist in self.hists]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(int)
+        self.objects = []
+
+    def decode(self, obj):
+        if isinstance(obj, list):
+            return [self.decode(item) for item in obj]
+        if not isinstance(obj, dict):
+            return _native_string(obj)
+        if "__array__" in obj:
+            return np.array(self.arrays[obj["__array__"]])
+        if "__tuple__" in obj:
+            return tuple(self.decode(obj["__tuple__"]))
+        if "__dict__" in obj:
+            return {self.decode(k): self.decode(v) for k, v in obj["__dict__"]}
+        if "__function__" in obj:
+            module, name = obj["__function__"]
+            return getattr(import_module(module), name)
+        if "__hist__" in obj:
+            return self._hist(obj["__hist__"])
+        if "__efficiency__" in obj:
+            return self._efficiency(obj["__efficiency__"])
+        if "__ref__" in obj:
+            return self.objects[obj["__ref__"]]
+        if "__object__" in obj:
+            module, name = obj["__object__"]
+            instance = _new_instance(getattr(import_module(module), name))
+            self.objects.append(instance)
+            instance.__dict__.update(self.decode(obj["state"]))
+            return instance
+        raise ValueError("Unknown entry in histogram file: {0}".format(obj))
+
+    def _hist(self, index):
+        from rootpy import asrootpy, ROOT
+        meta = self.hists[index]
+        args = [_native_string(meta['name']), _native_string(meta['title'])]
+        for edges in meta['edges']:
+            args += [len(edges) - 1, array('d', edges)]
+        hist = getattr(ROOT, meta['cls'])(*args)
+        hist.SetDirectory(None)
+        self._fill(hist, index)
+        return asrootpy(hist)
+
+    def _efficiency(self, meta):
+        from rootpy import asrootpy, ROOT
+        passed = self.hists[meta['passed']]
+        args = [_native_string(meta['name']), _native_string(meta['title'])]
+        for edges in passed['edges']:
+            args += [len(edges) - 1, array('d', edges)]
+        efficiency = ROOT.TEfficiency(*args)
+        efficiency.SetDirectory(None)
+        efficiency.SetStatisticOption(meta['statistic'])
+        efficiency.SetConfidenceLevel(meta['confidence'])
+        efficiency.SetWeight(meta['weight'])
+        self._fill(efficiency.GetPassedHistogram(), meta['passed'])
+        self._fill(efficiency.GetTotalHistogram(), meta['total'])
+        efficiency = asrootpy(efficiency)
+        _set_style(efficiency, meta['style'])
+        return efficiency
+
+    def _fill(self, hist, index):
+        meta = self.hists[index]
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        contents = self.arrays['contents'][start:stop]
+        if meta['sumw2'] and hist.GetSumw2N() == 0:
+            hist.Sumw2()
+        bin_contents(hist)[:] = contents
+        sumw2 = bin_sumw2(hist)
+        if sumw2 is not None:
+            sumw2[:] = self.arrays['sumw2'][start:stop] if meta['sumw2'] \
+                else contents
+        stats = self.arrays['stats'][index * N_STATS:(index + 1) * N_STATS]
+        hist.PutStats(array('d', stats))
+        hist.SetEntries(float(self.arrays['entries'][index]))
+        for axis, title in zip(AXES, meta['axis_titles']):
+            getattr(hist, 'Get{0}axis'.format(axis.upper()))().SetTitle(
+                _native_string(title))
+        _set_style(hist, meta['style'])
+
+
+def to_npz(plotters, output_file):
+    '''
+        Saves the plotters (keyed by their directory_name) into an npz file
+    '''
+    writer = _Writer()
+    encoded = [[plotter.directory_name, writer.encode(plotter)]
+               for plotter in plotters]
+    schema = dict(version=FORMAT_VERSION, plotters=encoded, hists=writer.hists)
+    schema = json.dumps(schema, sort_keys=True).encode('utf-8')
+    arrays = writer.flat_arrays()
+    arrays['schema'] = np.frombuffer(schema, dtype=np.uint8)
+    with open(output_file, 'wb') as output:
+        np.savez(output, **arrays)
+
+
+def _load(input_file):
+    with np.load(input_file) as data:
+        arrays = {name: data[name] for name in data.files}
+    schema = json.loads(arrays.pop('schema').tobytes().decode('utf-8'))
+    if schema['version'] != FORMAT_VERSION:
+        raise ValueError("{0} has version {1} of the histogram format, "
+                         "expected {2}".format(input_file, schema['version'],
+                                               FORMAT_VERSION))
+    return schema, arrays
+
+
+def _summed_attributes(encoded_plotter):
+    module, name = encoded_plotter["__object__"]
+    plotter_class = getattr(import_module(module), name)
+    return getattr(plotter_class, 'summed_attributes', ())
+
+
+def _layout(schema):
+    """
+    Everything that has to be identical for two files to be summed as arrays
+    """
+    plotters = []
+    for name, encoded in schema['plotters']:
+        summed = _summed_attributes(encoded)
+        state = [item for item in encoded['state']['__dict__']
+                 if item[0] not in summed]
+        plotters.append([name, encoded['__object__'], state])
+    return json.dumps([plotters, schema['hists']], sort_keys=True)
+
+
+class _Group(object):
+    """ Running sum of files with the same layout """
+
+    def __init__(self, schema, arrays):
+        self.schema = schema
+        self.arrays = arrays
+        self.others = []
+
+    def add(self, schema, arrays):
+        for name in HIST_ARRAYS:
+            self.arrays[name] += arrays[name]
+        # Only keep what is needed to add up the summed_attributes
+        state_arrays = {name: values for name, values in arrays.items()
+                        if name not in HIST_ARRAYS}
+        self.others.append((schema, state_arrays))
+
+    def plotters(self):
+        reader = _Reader(self.schema, self.arrays)
+        plotters = OrderedDict()
+        for name, encoded in self.schema['plotters']:
+            plotters[name] = reader.decode(encoded)
+
+        for schema, arrays in self.others:
+            other = _Reader(schema, arrays)
+            for name, encoded in schema['plotters']:
+                state = dict(encoded['state']['__dict__'])
+                for attribute in _summed_attributes(encoded):
+                    if attribute not in state:
+                        continue
+                    value = other.decode(state[attribute])
+                    plotter = plotters[name]
+                    setattr(plotter, attribute,
+                            getattr(plotter, attribute) + value)
+        return plotters
+
+
+def from_npz(input_files):
+    '''
+        Loads and sums the plotters from one or more npz files.
+        Returns a list with one {directory_name: plotter} dict per group of
+        files that could be summed as arrays; these still have to be merged
+        with the plotters' own _merge methods.
+    '''
+    if not isinstance(input_files, (list, tuple)):
+        input_files = [input_files]
+    groups = OrderedDict()
+    for input_file in input_files:
+        schema, arrays = _load(input_file)
+        layout = _layout(schema)
+        if layout in groups:
+            groups[layout].add(schema, arrays)
+        else:
+            groups[layout] = _Group(schema, arrays)
+    if len(groups) > 1:
+        logger.warning("{0} histogram files have {1} different layouts, "
+                       "merging these the slow way".format(
+                           len(input_files), len(groups)))
+    return [group.plotters() for group in groups.values()]
@@ -0,0 +1,227 @@
+'''
+    Copies the next input files to a local staging directory while the current
+    one is being read.
+
+    Remote inputs (e.g. root://eoscms.cern.ch//eos/...) are otherwise opened
+    one at a time, and every file boundary waits for the network.  A Prefetcher
+    goes through the input files in order and yields a local copy of each; the
+    copy of a file is removed as soon as the next one is asked for.  At most
+    `depth` files are copied ahead, and no new copy is started while the
+    staged files take more than max_bytes.  If a copy fails, the original is
+    read instead.
+
+    Each remote copy runs in its own process (xrdcp, or ROOT's TFile::Cp in a
+    new interpreter if there is no xrdcp), so that neither the GIL nor ROOT is
+    shared with the event loop; the background threads only wait for them.
+
+    Local files are passed through as they are, unless remote_only is False
+    (which also lets the prefetcher be tried without a network).
+'''
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+try:
+    from shutil import which
+except ImportError:
+    from distutils.spawn import find_executable as which
+import logging
+logger = logging.getLogger(__name__)
+
+
+def is_remote(path):
+    return '://' in path and not path.startswith('file://')
+
+
+COPY_WITH_ROOT = '''
+import sys
+import ROOT
+sys.exit(0 if ROOT.TFile.Cp(sys.argv[1], sys.argv[2], False) else 1)
+'''
+
+
+def _copy_command(source, destination):
+    if which('xrdcp'):
+        return ['xrdcp', '--force', '--silent', source, destination]
+    return [sys.executable, '-c', COPY_WITH_ROOT, source, destination]
+
+
+def copy_file(source, destination):
+    '''
+        Copies remote files in a separate process (see the module docstring),
+        local ones with shutil
+    '''
+    if not is_remote(source):
+        shutil.copyfile(source.replace('file://', '', 1), destination)
+        return
+    process = subprocess.Popen(_copy_command(source, destination),
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT)
+    output, _ = process.communicate()
+    if process.returncode != 0:
+        raise IOError("Could not copy {0} to {1}: {2}".format(
+            source, destination, output.decode('utf-8', 'replace').strip()))
+
+
+class Prefetcher(object):
+    '''
+        Iterates over local copies of the input files, see the module docstring
+
+        params:
+        - input_files -- the files, in the order they are read
+        - directory -- where to stage the copies, by default a new temporary
+          directory, which is removed at the end
+        - depth -- number of files copied ahead of the one that is read
+        - max_bytes -- no new copies while the staged files take this much
+        - workers -- number of copies made at the same time
+        - copy -- function(source, destination), by default copy_file
+    '''
+
+    def __init__(self, input_files, directory=None, depth=2, max_bytes=None,
+                 workers=2, remote_only=True, copy=copy_file):
+        self.input_files = list(input_files)
+        self.directory = directory
+        self.depth = depth
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.remote_only = remote_only
+        self.copy = copy
+        self._condition = threading.Condition()
+        self._threads = []
+        self._staging = None
+        self._next = 0
+        self._current = 0
+        self._staged = {}
+        self._sizes = {}
+        self._errors = {}
+        self._copying = 0
+        self._stopped = False
+
+    def _needs_copy(self, input_file):
+        return is_remote(input_file) or not self.remote_only
+
+    @property
+    def staged_bytes(self):
+        with self._condition:
+            return sum(self._sizes.values())
+
+    def start(self):
+        if self._threads:
+            return
+        if self.directory is None:
+            self._staging = tempfile.mkdtemp(prefix='cmsl1t_prefetch_')
+        else:
+            if not os.path.exists(self.directory):
+                os.makedirs(self.directory)
+            self._staging = tempfile.mkdtemp(prefix='cmsl1t_prefetch_',
+                                             dir=self.directory)
+        for _ in range(max(1, self.workers)):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _room(self):
+        '''
+            Whether another copy fits in max_bytes, assuming that the copies
+            under way are as large as the staged files on average
+        '''
+        if self.max_bytes is None:
+            return True
+        if not self._sizes:
+            return not self._copying
+        staged = sum(self._sizes.values())
+        mean = staged / float(len(self._sizes))
+        return staged + self._copying * mean < self.max_bytes
+
+    def _claim(self):
+        ''' The index of the next file to copy, None once there are none '''
+        with self._condition:
+            while not self._stopped and self._next < len(self.input_files):
+                ahead = self._next <= self._current + self.depth
+                if ahead and self._room():
+                    self._next += 1
+                    if self._needs_copy(self.input_files[self._next - 1]):
+                        self._copying += 1
+                    return self._next - 1
+                self._condition.wait()
+            return None
+
+    def _work(self):
+        while True:
+            index = self._claim()
+            if index is None:
+                return
+            source = self.input_files[index]
+            if not self._needs_copy(source):
+                with self._condition:
+                    self._staged[index] = source
+                    self._condition.notify_all()
+                continue
+            destination = os.path.join(self._staging, '{0}_{1}'.format(
+                index, os.path.basename(source)))
+            try:
+                self.copy(source, destination + '.part')
+                os.rename(destination + '.part', destination)
+                size = os.path.getsize(destination)
+            except Exception as e:
+                with self._condition:
+                    self._copying -= 1
+                    self._errors[index] = e
+                    self._condition.notify_all()
+                continue
+            with self._condition:
+                self._copying -= 1
+                if self._stopped:
+                    if os.path.exists(destination):
+                        os.remove(destination)
+                    return
+                self._staged[index] = destination
+                self._sizes[index] = size
+                self._condition.notify_all()
+
+    def _wait_for(self, index):
+        with self._condition:
+            self._current = index
+            self._condition.notify_all()
+            while index not in self._staged and index not in self._errors:
+                self._condition.wait()
+            if index in self._errors:
+                logger.warn("Could not prefetch {0} ({1}), reading it "
+                            "directly".format(self.input_files[index],
+                                              self._errors[index]))
+                return self.input_files[index]
+            return self._staged[index]
+
+    def _release(self, index):
+        with self._condition:
+            path = self._staged.pop(index, None)
+            if self._sizes.pop(index, None) is not None:
+                os.remove(path)
+            self._condition.notify_all()
+
+    def __iter__(self):
+        self.start()
+        try:
+            for index in range(len(self.input_files)):
+                yield self._wait_for(index)
+                self._release(index)
+        finally:
+            self.close()
+
+    def close(self):
+        '''
+            Stop the copies and remove the staged files.  Copies that are under
+            way are not waited for; they fail or remove their file.
+        '''
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._threads = []
+        if self._staging is not None:
+            shutil.rmtree(self._staging, ignore_errors=True)
+            self._staging = None
+        self._staged.clear()
+        self._sizes.clear()
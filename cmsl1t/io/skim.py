@@ -0,0 +1,378 @@
+"""
+Skims: reduced ntuples written during a cmsl1t run.
+
+A SkimWriter keeps the events that pass its selection (a filter function and/or
+a luminosity JSON) and writes, for each of them, a set of aliases and the
+outputs of producers into one flat tree: numbers become double branches,
+vectors std::vector<double> branches, named after their alias.  Producer
+outputs are split into one branch per field, e.g. l1Jets into l1Jets_et,
+l1Jets_eta, ... and l1Sums_Met into l1Sums_Met_et and l1Sums_Met_phi.
+
+Next to the ROOT file the writer puts an ntuple map (see bin/create-map-file),
+so that the skim can be the input of another run.  Its `products` section tells
+the EventReader how to put the producer outputs back together, so analyzers
+can read event.l1Jets without running the producer again.
+
+Without a list of aliases, the skim keeps those that were read during the
+first chunk of events (see cmsl1t.io.access.AliasAccess): those an analysis
+needs.
+"""
+import os
+from collections import OrderedDict
+from importlib import import_module
+from numbers import Number
+import numpy as np
+import six
+import logging
+logger = logging.getLogger(__name__)
+
+TREE = 'Events'
+# Kept in every skim if the input has them
+EVENT_ALIASES = ['Event_run', 'Event_lumi', 'Event_event']
+
+_FILL_SOURCE = '''
+namespace cmsl1t_skim {
+void fill(TTree* tree, Long64_t n_events, Long64_t n_scalars,
+          Long64_t n_vectors, ULong64_t addresses) {
+    // per scalar: its branch buffer and its column; per vector: its branch
+    // object, the values of all events and the offset of each event in them
+    const ULong64_t* columns = reinterpret_cast<const ULong64_t*>(addresses);
+    const ULong64_t* vectors = columns + 2 * n_scalars;
+    for (Long64_t i = 0; i < n_events; ++i) {
+        for (Long64_t s = 0; s < n_scalars; ++s) {
+            *reinterpret_cast<double*>(columns[2 * s]) =
+                reinterpret_cast<const double*>(columns[2 * s + 1])[i];
+        }
+        for (Long64_t v = 0; v < n_vectors; ++v) {
+            const double* values =
+                reinterpret_cast<const double*>(vectors[3 * v + 1]);
+            const Long64_t* offsets =
+                reinterpret_cast<const Long64_t*>(vectors[3 * v + 2]);
+            reinterpret_cast<std::vector<double>*>(vectors[3 * v])->assign(
+                values + offsets[i], values + offsets[i + 1]);
+        }
+        tree->Fill();
+    }
+}
+}
+'''
+
+
+def _load_function(path):
+    tokens = path.split('.')
+    return getattr(import_module('.'.join(tokens[:-1])), tokens[-1])
+
+
+def _class_path(cls):
+    '''
+        Importable path of a class, also for namedtuples whose name differs
+        from the one they are bound to (EnergySum = namedtuple('Sum', ...))
+    '''
+    module = import_module(cls.__module__)
+    if getattr(module, cls.__name__, None) is not cls:
+        for name, value in vars(module).items():
+            if value is cls:
+                return cls.__module__ + '.' + name
+    return cls.__module__ + '.' + cls.__name__
+
+
+def _fields(obj):
+    ''' The fields of a producer output: namedtuple fields, slots or attributes '''
+    if hasattr(obj, '_fields'):
+        return list(obj._fields)
+    fields = []
+    for cls in reversed(type(obj).__mro__):
+        for name in getattr(cls, '__slots__', ()):
+            if name not in fields and hasattr(obj, name):
+                fields.append(name)
+    if hasattr(obj, '__dict__'):
+        fields += sorted(name for name in vars(obj) if name not in fields)
+    return fields
+
+
+def product_layout(name, value):
+    '''
+        How a producer output is written, as stored in the `products` section
+        of the skim map, or None if it cannot be written (yet): an empty
+        collection says nothing about its content.
+    '''
+    if isinstance(value, (list, tuple)) and not hasattr(value, '_fields'):
+        if not value:
+            return None
+        return {'class': _class_path(type(value[0])),
+                'fields': _fields(value[0]), 'collection': True}
+    if isinstance(value, Number):
+        return None
+    return {'class': _class_path(type(value)), 'fields': _fields(value),
+            'collection': False}
+
+
+def flatten_product(name, layout, value):
+    ''' The columns of one producer output in one event, {column: value} '''
+    if layout['collection']:
+        return dict(('{0}_{1}'.format(name, field),
+                     [getattr(item, field) for item in value])
+                    for field in layout['fields'])
+    return dict(('{0}_{1}'.format(name, field), getattr(value, field))
+                for field in layout['fields'])
+
+
+def _build(cls, fields, values):
+    if hasattr(cls, '_fields'):
+        return cls(*values)
+    obj = cls.__new__(cls)
+    for field, value in zip(fields, values):
+        setattr(obj, field, value)
+    return obj
+
+
+def rebuild_product(event, name, layout):
+    '''
+        A producer output of an event read from a skim, see flatten_product
+    '''
+    cls = _load_function(layout['class'])
+    fields = layout['fields']
+    columns = [event['{0}_{1}'.format(name, field)] for field in fields]
+    if layout['collection']:
+        return [_build(cls, fields, values) for values in zip(*columns)]
+    return _build(cls, fields, columns)
+
+
+def skim_map(columns, products):
+    '''
+        The ntuple map of a skim with the given columns (in the tree TREE) and
+        producer outputs ({name: layout})
+    '''
+    import cmsl1t
+    branches = dict((column, {'aliases': ['event.' + column]})
+                    for column in columns)
+    return {
+        'version': cmsl1t.__version__,
+        'content': {TREE: {'name': TREE, 'optional': False,
+                           'branches': branches}},
+        'products': dict(products),
+    }
+
+
+def _is_vector(value):
+    return not isinstance(value, Number) and hasattr(value, '__len__')
+
+
+class SkimWriter(object):
+    '''
+        Writes the selected events of a run into a flat tree, see the module
+        docstring
+
+        params:
+        - filename -- the ROOT file; the map is written next to it (.yaml)
+        - aliases -- aliases to keep, by default those read in the first chunk
+        - products -- producer outputs to keep, e.g. l1Jets or l1Sums for all
+          l1Sums_<sum> outputs
+        - select -- a function(event) returning whether to keep the event, or
+          the import path of one, e.g. cmsl1t.filters.pfMetFilter.pfMetFilter
+        - lumi_json -- keep only the luminosity sections of this JSON
+        - access -- the AliasAccess of the readers, needed without aliases
+    '''
+
+    def __init__(self, filename, aliases=None, products=(), select=None,
+                 lumi_json=None, access=None, chunk_size=1000):
+        if aliases is None and access is None:
+            raise ValueError("A skim without aliases needs an AliasAccess")
+        self.filename = filename
+        self.map_filename = os.path.splitext(filename)[0] + '.yaml'
+        self.aliases = aliases
+        self._read_aliases = aliases is None
+        self.products = list(products)
+        if isinstance(select, six.string_types):
+            select = _load_function(select)
+        self.select = select
+        self.lumi_filter = None
+        if lumi_json:
+            from cmsl1t.filters.luminosity import LuminosityFilter
+            self.lumi_filter = LuminosityFilter(lumi_json)
+        self.access = access
+        self.chunk_size = chunk_size
+        self.n_seen = 0
+        self.n_written = 0
+        self._events = []
+        self._alias_columns = None
+        self._columns = None
+        self._layouts = None
+        self._file = None
+
+    def _selected(self, event):
+        if self.lumi_filter and not self.lumi_filter(event.Event_run,
+                                                     event.Event_lumi):
+            return False
+        return self.select is None or bool(self.select(event))
+
+    def _outputs(self, event):
+        ''' The producer outputs of the event that belong to self.products '''
+        outputs = {}
+        for name, value in vars(event).items():
+            if name.startswith('_'):
+                continue
+            for product in self.products:
+                if name == product or name.startswith(product + '_'):
+                    outputs[name] = value
+        return outputs
+
+    def _aliases(self, event):
+        if self._alias_columns is None:
+            # fixed by the first kept event, after the analyzers have read it
+            if self.aliases is None:
+                self.aliases = sorted(self.access.counts)
+            self._alias_columns = list(self.aliases)
+            for alias in EVENT_ALIASES:
+                if alias in self._alias_columns:
+                    continue
+                try:
+                    event[alias]
+                except AttributeError:
+                    continue
+                self._alias_columns.append(alias)
+        return self._alias_columns
+
+    def _read(self, event):
+        ''' Copy of the content of an event; the readers reuse their buffers '''
+        content = {}
+        for alias in self._aliases(event):
+            value = event[alias]
+            content[alias] = list(value) if _is_vector(value) else value
+        return content, self._outputs(event)
+
+    def add(self, event):
+        '''
+            Keep the event if it is selected.  Call after the producers and
+            analyzers.
+
+            returns: whether the event was kept
+        '''
+        self.n_seen += 1
+        if not self._selected(event):
+            return False
+        self._events.append(self._read(event))
+        if len(self._events) >= self.chunk_size:
+            self._flush()
+        return True
+
+    def _define(self):
+        '''
+            Decide on the columns from the first chunk of events: the aliases,
+            and the producer outputs as far as they are known.  Outputs that
+            are numbers are written as they are.
+        '''
+        self._layouts = OrderedDict()
+        numbers = set()
+        for _, outputs in self._events:
+            for name, value in sorted(outputs.items()):
+                if isinstance(value, Number):
+                    numbers.add(name)
+                elif name not in self._layouts:
+                    layout = product_layout(name, value)
+                    if layout is not None:
+                        self._layouts[name] = layout
+        missing = set(name for _, outputs in self._events for name in outputs)
+        missing -= numbers | set(self._layouts)
+        if missing:
+            logger.warn("Cannot skim {0}, they are empty in the first {1} "
+                        "events".format(sorted(missing), len(self._events)))
+
+        first = self._events[0][0] if self._events else {}
+        self._columns = OrderedDict()
+        for alias in self._alias_columns or ():
+            self._columns[alias] = _is_vector(first.get(alias, ()))
+        for name in sorted(numbers):
+            self._columns[name] = False
+        for name, layout in self._layouts.items():
+            for field in layout['fields']:
+                self._columns['{0}_{1}'.format(name, field)] = \
+                    layout['collection']
+        self._open()
+
+    def _open(self):
+        import ROOT
+        directory = os.path.dirname(self.filename)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        if not hasattr(ROOT, 'cmsl1t_skim'):
+            if not ROOT.gInterpreter.Declare(_FILL_SOURCE):
+                raise RuntimeError("Could not compile the filling of skims")
+        self._file = ROOT.TFile.Open(self.filename, 'RECREATE')
+        self._tree = ROOT.TTree(TREE, TREE)
+        self._buffers = OrderedDict()
+        for column, is_vector in self._columns.items():
+            if is_vector:
+                buffer = ROOT.std.vector('double')()
+                self._tree.Branch(column, buffer)
+            else:
+                buffer = np.zeros(1, dtype=np.float64)
+                self._tree.Branch(column, buffer, column + '/D')
+            self._buffers[column] = buffer
+
+    def _table(self):
+        ''' The chunk as {column: values}, one row per event '''
+        table = dict((column, []) for column in self._columns)
+        for content, outputs in self._events:
+            row = dict(content)
+            row.update((name, value) for name, value in outputs.items()
+                       if isinstance(value, Number))
+            for name, layout in self._layouts.items():
+                if name in outputs:
+                    row.update(flatten_product(name, layout, outputs[name]))
+            for column, is_vector in self._columns.items():
+                table[column].append(row.get(column, [] if is_vector else 0.))
+        return table
+
+    def _flush(self):
+        import ROOT
+        from cmsl1t.io.synthetic import _address
+        if self._columns is None:
+            self._define()
+        table = self._table()
+        scalars, vectors, arrays = [], [], []
+        for column, is_vector in self._columns.items():
+            if is_vector:
+                lengths = [len(values) for values in table[column]]
+                offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+                np.cumsum(lengths, out=offsets[1:])
+                values = np.fromiter(
+                    (value for values in table[column] for value in values),
+                    dtype=np.float64, count=offsets[-1])
+                arrays += [values, offsets]
+                vectors += [_address(self._buffers[column]),
+                            values.ctypes.data, offsets.ctypes.data]
+            else:
+                values = np.asarray(table[column], dtype=np.float64)
+                arrays.append(values)
+                scalars += [self._buffers[column].ctypes.data,
+                            values.ctypes.data]
+        addresses = np.array(scalars + vectors, dtype=np.uint64)
+        ROOT.cmsl1t_skim.fill(self._tree, len(self._events), len(scalars) // 2,
+                              len(vectors) // 3, addresses.ctypes.data)
+        self.n_written += len(self._events)
+        self._events = []
+
+    def close(self):
+        '''
+            Write the remaining events, the tree and its map
+
+            returns: the file name of the map
+        '''
+        import yaml
+        if self._events or self._columns is None:
+            self._flush()
+        self._file.cd()
+        self._tree.Write()
+        self._file.Close()
+        if self._read_aliases:
+            late = sorted(set(self.access.counts) - set(self._columns))
+            if late:
+                logger.warn("Aliases first read after the first kept event are "
+                            "not in the skim: {0}".format(late))
+        with open(self.map_filename, 'w') as map_file:
+            yaml.dump(skim_map(self._columns, self._layouts), map_file,
+                      default_flow_style=False)
+        logger.info("Skimmed {0} of {1} events into {2} (map: {3})".format(
+            self.n_written, self.n_seen, self.filename, self.map_filename))
+        return self.map_filename
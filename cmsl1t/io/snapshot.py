@@ -0,0 +1,127 @@
+"""
+Live snapshots of the histograms of a running analysis.
+
+A background thread writes the plotters of the analyzers as npz files
+(cmsl1t.io.npz) every few minutes, together with a small status file with the
+number of events processed so far.  The event loop only updates a counter, so
+it is never stalled by a snapshot.  Snapshots are taken while the histograms
+are being filled, so they are not exactly consistent with the event count, but
+good enough to check rates early and abort bad runs.
+
+The snapshots are written as <analyzer>_histograms.npz in a 'live' directory,
+so they can be plotted with cmsl1t -r --hist-files.  Optionally, the directory
+is also served over HTTP (e.g. http://localhost:<port>/status.json).
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+try:
+    from BaseHTTPServer import HTTPServer
+    from SimpleHTTPServer import SimpleHTTPRequestHandler
+except ImportError:
+    from http.server import HTTPServer, SimpleHTTPRequestHandler
+from cmsl1t.io.npz import to_npz
+import logging
+logger = logging.getLogger(__name__)
+
+STATUS_FILE = "status.json"
+
+
+def _replace(filename, write):
+    """ Write a file through a temporary one, so readers never see half of it """
+    handle, tmp_name = tempfile.mkstemp(dir=os.path.dirname(filename))
+    os.close(handle)
+    write(tmp_name)
+    os.rename(tmp_name, filename)
+
+
+def _serve(directory, port):
+    class Handler(SimpleHTTPRequestHandler):
+
+        def translate_path(self, path):
+            name = os.path.basename(path.split('?')[0]) or STATUS_FILE
+            return os.path.join(directory, name)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('localhost', port), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    logger.info("Serving live histograms on http://localhost:{0}/".format(
+        server.server_address[1]))
+    return server
+
+
+class Snapshots(object):
+    """
+    params:
+    - directory -- where the snapshots are written
+    - minutes -- time between two snapshots
+    - port -- if given, serve the directory over HTTP on this port
+    """
+
+    def __init__(self, directory, minutes=5, port=None):
+        self.directory = directory
+        self.interval = minutes * 60.
+        self.port = port
+        self.analyzers = []
+        self.n_events = 0
+        self._start_time = time.time()
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def add(self, analyzers):
+        """ Include the analyzers (once they have built their plotters) """
+        self.analyzers.extend(analyzers)
+        if self._thread is None:
+            self.start()
+
+    def start(self):
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        if self.port is not None:
+            self._server = _serve(self.directory, self.port)
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.save()
+            except Exception:
+                # Most likely a plotter that was changed while being written
+                logger.warning("Could not write a snapshot", exc_info=True)
+
+    def save(self):
+        n_events = self.n_events
+        for analyzer in list(self.analyzers):
+            filename = os.path.join(self.directory,
+                                    analyzer.name + "_histograms.npz")
+            _replace(filename, lambda name: to_npz(analyzer.all_plots, name))
+
+        elapsed = time.time() - self._start_time
+        status = dict(events=n_events, seconds=elapsed,
+                      events_per_second=n_events / elapsed if elapsed else 0,
+                      time=time.strftime("%Y-%m-%d %H:%M:%S"),
+                      analyzers=[analyzer.name for analyzer in self.analyzers])
+
+        def write(name):
+            with open(name, 'w') as output:
+                json.dump(status, output, indent=1)
+        _replace(os.path.join(self.directory, STATUS_FILE), write)
+        logger.info("Wrote live histograms after {0} events to {1}".format(
+            n_events, self.directory))
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
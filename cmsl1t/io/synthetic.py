@@ -0,0 +1,472 @@
+"""
+Synthetic L1TNtuples.
+
+Writes ROOT files with the trees and branches of an ntuple map (see
+bin/create-map-file), filled with random values, so that the EventReader,
+producers and analyzers can be run and load-tested without access to real
+ntuples.
+
+Every top-level branch (e.g. L1Upgrade) is written as an object of its
+L1Analysis data format (DATA_FORMATS), from the library loaded by
+cmsl1t.utils.module.load_L1TNTupleLibrary, so the files have the same layout
+as real ntuples.  Only the members that are in the ntuple map are filled.
+Integer members named like a counter (nJets) give the length of the vector
+members they count (jetEt, jetEta, ...).
+
+The values of a member are drawn from the first distribution of the config
+whose `match` (a shell-style pattern) matches "<branch>.<member>", see
+DEFAULT_DISTRIBUTIONS.  Each event gets a pileup (number of vertices) drawn
+from a Poisson distribution, which can also drive the multiplicities.  Values
+are drawn for chunks of events at once with numpy, and copied into the trees
+by a loop compiled with ROOT's interpreter, so millions of events take
+minutes rather than hours.  Several files can be written in parallel.
+"""
+import fnmatch
+import hashlib
+import os
+import re
+from collections import namedtuple, OrderedDict
+import numpy as np
+import logging
+logger = logging.getLogger(__name__)
+
+DATA_FORMATS = {
+    'Event': 'L1Analysis::L1AnalysisEventDataFormat',
+    'CaloTP': 'L1Analysis::L1AnalysisCaloTPDataFormat',
+    'L1CaloTower': 'L1Analysis::L1AnalysisL1CaloTowerDataFormat',
+    'L1CaloCluster': 'L1Analysis::L1AnalysisL1CaloClusterDataFormat',
+    'L1HO': 'L1Analysis::L1AnalysisL1HODataFormat',
+    'L1Upgrade': 'L1Analysis::L1AnalysisL1UpgradeDataFormat',
+    'L1UpgradeBmtfMuon': 'L1Analysis::L1AnalysisL1UpgradeTfMuonDataFormat',
+    'L1UpgradeOmtfMuon': 'L1Analysis::L1AnalysisL1UpgradeTfMuonDataFormat',
+    'L1UpgradeEmtfMuon': 'L1Analysis::L1AnalysisL1UpgradeTfMuonDataFormat',
+    'L1UpgradeBmtfInputs': 'L1Analysis::L1AnalysisBMTFInputsDataFormat',
+    'L1uGT': 'GlobalAlgBlk',
+    'Jet': 'L1Analysis::L1AnalysisRecoJetDataFormat',
+    'Sums': 'L1Analysis::L1AnalysisRecoMetDataFormat',
+    'MetFilters': 'L1Analysis::L1AnalysisRecoMetFilterDataFormat',
+    'Muon': 'L1Analysis::L1AnalysisRecoMuon2DataFormat',
+    'Electron': 'L1Analysis::L1AnalysisRecoElectronDataFormat',
+    'Tau': 'L1Analysis::L1AnalysisRecoTauDataFormat',
+    'Vertex': 'L1Analysis::L1AnalysisRecoVertexDataFormat',
+}
+
+BUNCH_CROSSINGS = [-2, -1, 0, 1, 2]
+# Most objects are in the triggering bunch crossing
+BX_WEIGHTS = [0.05, 0.1, 0.7, 0.1, 0.05]
+N_SUM_TYPES = 20
+
+# Evaluated in order, the first match is used
+DEFAULT_DISTRIBUTIONS = [
+    # event
+    dict(match='Event.run', dist='constant', value=1),
+    dict(match='Event.lumi', dist='lumi', events_per_lumi=1000),
+    dict(match='Event.event', dist='sequence'),
+    dict(match='Event.bx', dist='integers', low=1, high=3565),
+    dict(match='Event.nPV*', dist='pileup'),
+    dict(match='Event.puWeight', dist='constant', value=1.),
+    dict(match='Vertex.nVtx', dist='pileup'),
+    # multiplicities
+    dict(match='*.nSums', dist='constant',
+         value=N_SUM_TYPES * len(BUNCH_CROSSINGS)),
+    dict(match='*.nTower', dist='poisson', mean=100, per_pileup=10),
+    dict(match='CaloTP.n*TP', dist='poisson', mean=200, per_pileup=10),
+    dict(match='*.nCluster', dist='poisson', mean=20, per_pileup=1),
+    dict(match='*.n*Jets', dist='poisson', mean=3, per_pileup=0.2),
+    dict(match='*.n*', dist='poisson', mean=2, per_pileup=0.05),
+    # one L1 energy sum of each type per bunch crossing
+    dict(match='*.sumType', dist='cycle', values=list(range(N_SUM_TYPES))),
+    dict(match='*.sumBx', dist='cycle', values=BUNCH_CROSSINGS,
+         repeat=N_SUM_TYPES),
+    dict(match='*[Bb]x', dist='choice', values=BUNCH_CROSSINGS, p=BX_WEIGHTS),
+    # hardware (integer) coordinates and energies
+    dict(match='*.*I[Ee]ta*', dist='integers', low=-41, high=42),
+    dict(match='*.ieta', dist='integers', low=-41, high=42),
+    dict(match='*.*I[Pp]hi*', dist='integers', low=1, high=73),
+    dict(match='*.iphi', dist='integers', low=1, high=73),
+    dict(match='*.*IEt', dist='integers', low=0, high=512),
+    dict(match='*.i*', dist='integers', low=0, high=64),
+    # physics coordinates and energies
+    dict(match='*[Pp]hi*', dist='uniform', low=-np.pi, high=np.pi),
+    dict(match='*[Ee]ta*', dist='uniform', low=-5, high=5),
+    dict(match='Jet.*ef', dist='uniform', low=0, high=1),
+    dict(match='*Mult', dist='poisson', mean=5),
+    dict(match='*.is*', dist='choice', values=[0, 1]),
+    dict(match='*Flag*', dist='choice', values=[0, 1]),
+    dict(match='MetFilters.*', dist='choice', values=[0, 1], p=[0.02, 0.98]),
+    dict(match='Sums.*', dist='exponential', scale=50),
+    dict(match='*', dist='exponential', scale=30),
+]
+
+_COUNTER = re.compile(r'^n[A-Z]')
+_VECTOR = re.compile(r'^(?:std::)?vector<\s*([\w: ]+?)\s*>$')
+_NUMBER = re.compile(r'^((un)?signed )?(bool|char|short|int|long|long long|'
+                     r'float|double)$|^U?(Bool|Char|Short|Int|Long|Long64|'
+                     r'Float|Double|Double32)_t$')
+_FLOAT_TYPES = ('float', 'double', 'Float_t', 'Double_t', 'Double32_t')
+
+# A member of a data format: kind is 'float' or 'int', counter is the name of
+# the member with its length (None for scalars, '' for vectors without one)
+Member = namedtuple('Member', ['name', 'kind', 'counter'])
+Branch = namedtuple('Branch', ['name', 'class_name', 'members'])
+Tree = namedtuple('Tree', ['path', 'name', 'branches'])
+
+
+def _stem(counter):
+    stem = counter[1:].lower()
+    return stem[:-1] if stem.endswith('s') else stem
+
+
+def _find_counter(branch_name, member, counters):
+    if not counters:
+        return ''
+    matches = [c for c in counters if member.lower().startswith(_stem(c))]
+    if matches:
+        return max(matches, key=len)
+    matches = [c for c in counters if _stem(c) == branch_name.lower()]
+    return matches[0] if matches else sorted(counters)[0]
+
+
+def branch_layout(branch_name, class_name, member_types):
+    """
+    Members of a branch, from the C++ types of its members ({name: type})
+
+    returns: a Branch, without members that are not numbers or vectors of
+             numbers
+    """
+    def kind(type_name):
+        return 'float' if type_name in _FLOAT_TYPES else 'int'
+
+    scalars, vectors = OrderedDict(), OrderedDict()
+    for name in sorted(member_types):
+        type_name = member_types[name].strip()
+        vector = _VECTOR.match(type_name)
+        if vector and _NUMBER.match(vector.group(1).strip()):
+            vectors[name] = kind(vector.group(1).strip())
+            continue
+        elif _NUMBER.match(type_name):
+            scalars[name] = kind(type_name)
+            continue
+        logger.debug("Not filling {0}.{1} of type {2}".format(
+            branch_name, name, type_name))
+
+    counters = [name for name, k in scalars.items()
+                if k == 'int' and _COUNTER.match(name)] if vectors else []
+    members = [Member(name, k, None) for name, k in scalars.items()]
+    members += [Member(name, k, _find_counter(branch_name, name, counters))
+                for name, k in vectors.items()]
+    return Branch(branch_name, class_name, members)
+
+
+def _member_types(class_name, members):
+    import ROOT
+    cls = ROOT.TClass.GetClass(class_name)
+    if not cls or not cls.IsLoaded():
+        return None
+    types = {}
+    for name in members:
+        data_member = cls.GetDataMember(name)
+        if not data_member:
+            logger.warning("{0} has no member {1}".format(class_name, name))
+            continue
+        types[name] = data_member.GetTrueTypeName()
+    return types
+
+
+def tree_layout(ntuple_map, data_formats=None):
+    """
+    Trees and branches to write for an ntuple map, skipping branches whose
+    data format is unknown or not loaded.  data_formats adds to or overrides
+    DATA_FORMATS.
+
+    returns: a list of Tree
+    """
+    formats = dict(DATA_FORMATS, **(data_formats or {}))
+    trees = []
+    for path in sorted(ntuple_map['content']):
+        content = ntuple_map['content'][path]
+        members = OrderedDict()
+        for branch in sorted(content['branches']):
+            top, _, member = branch.partition('.')
+            members.setdefault(top, []).append(member or top)
+        branches = []
+        for name, names in members.items():
+            class_name = formats.get(name)
+            types = _member_types(class_name, names) if class_name else None
+            if not types:
+                logger.warning("Skipping branch {0} of {1}, its data format "
+                               "{2} is not loaded".format(name, path, class_name))
+                continue
+            branches.append(branch_layout(name, class_name, types))
+        if branches:
+            trees.append(Tree(path, content.get('name', path.split('/')[-1]),
+                              branches))
+    return trees
+
+
+def find_distribution(name, distributions):
+    for spec in distributions:
+        if fnmatch.fnmatchcase(name, spec['match']):
+            return spec
+    raise ValueError("No distribution for " + name)
+
+
+def draw(rng, spec, size, pileup, first_event=0, starts=None):
+    """
+    Draw size values from a distribution
+
+    params:
+    - spec -- the distribution, see DEFAULT_DISTRIBUTIONS
+    - pileup -- the pileup of the event of each value
+    - first_event -- the index of the first event (for 'sequence' and 'lumi')
+    - starts -- for vector members, the position of each value in its event
+    """
+    dist = spec['dist']
+    if dist == 'constant':
+        return np.full(size, spec['value'])
+    if dist == 'uniform':
+        return rng.uniform(spec['low'], spec['high'], size)
+    if dist == 'normal':
+        return rng.normal(spec['mean'], spec['sigma'], size)
+    if dist == 'exponential':
+        return spec.get('offset', 0) + rng.exponential(spec['scale'], size)
+    if dist == 'poisson':
+        return rng.poisson(spec['mean'] + spec.get('per_pileup', 0) * pileup,
+                           size)
+    if dist == 'integers':
+        return rng.randint(spec['low'], spec['high'], size)
+    if dist == 'choice':
+        return rng.choice(spec['values'], size, p=spec.get('p'))
+    if dist == 'cycle':
+        position = np.arange(size) if starts is None else starts
+        values = np.asarray(spec['values'])
+        return values[(position // spec.get('repeat', 1)) % len(values)]
+    if dist == 'pileup':
+        return pileup
+    if dist == 'sequence':
+        return spec.get('start', 1) + first_event + np.arange(size)
+    if dist == 'lumi':
+        events = first_event + np.arange(size)
+        return spec.get('start', 1) + events // spec['events_per_lumi']
+    raise ValueError("Unknown distribution '{0}'".format(dist))
+
+
+def draw_branch(rng, branch, n_events, pileup, distributions, first_event=0):
+    """
+    Draw the values of all members of a branch for n_events events.
+
+    returns: {member: values} and {counter: offsets}, where the values of a
+             vector member are flat, and the ones of event i are
+             values[offsets[i]:offsets[i + 1]]
+    """
+    def spec(member):
+        return find_distribution(branch.name + '.' + member, distributions)
+
+    columns, offsets = OrderedDict(), OrderedDict()
+    for member in branch.members:
+        if member.counter is None:
+            columns[member.name] = draw(rng, spec(member.name), n_events,
+                                        pileup, first_event)
+
+    for member in branch.members:
+        counter = member.counter
+        if counter is None:
+            continue
+        if counter not in offsets:
+            if counter:
+                counts = columns[counter]
+            else:
+                counts = draw(rng, spec('n'), n_events, pileup, first_event)
+            counts = np.maximum(np.asarray(counts, np.int64), 0)
+            offsets[counter] = np.concatenate([[0], np.cumsum(counts)])
+        event_offsets = offsets[counter]
+        counts = np.diff(event_offsets)
+        size = event_offsets[-1]
+        starts = np.arange(size) - np.repeat(event_offsets[:-1], counts)
+        columns[member.name] = draw(rng, spec(member.name), size,
+                                    np.repeat(pileup, counts), first_event,
+                                    starts)
+    return columns, offsets
+
+
+def _fill_source(function, tree):
+    '''
+        C++ code copying the columns of one chunk of events into the branch
+        objects of the tree, and filling it
+    '''
+    declarations, assignments = [], []
+    index = [0]
+
+    def column(c_type, const='const '):
+        name = 'c{0}'.format(index[0])
+        declarations.append(
+            '    {0}{1}* {2} = reinterpret_cast<{0}{1}*>('
+            'columns[{3}]);'.format(const, c_type, name, index[0]))
+        index[0] += 1
+        return name
+
+    for branch in tree.branches:
+        obj = column(branch.class_name, const='')
+        offsets = {}
+        for member in branch.members:
+            if member.counter is not None and member.counter not in offsets:
+                offsets[member.counter] = column('Long64_t')
+        for member in branch.members:
+            values = column('double' if member.kind == 'float' else 'Long64_t')
+            if member.counter is None:
+                assignments.append('        {0}->{1} = {2}[i];'.format(
+                    obj, member.name, values))
+            else:
+                assignments.append(
+                    '        {0}->{1}.assign({2} + {3}[i], {2} + {3}[i + 1]);'
+                    .format(obj, member.name, values, offsets[member.counter]))
+    header = ['namespace cmsl1t_synthetic {',
+              'void {0}(TTree* tree, Long64_t n_events, ULong64_t addresses) {{'
+              .format(function),
+              '    const ULong64_t* columns = '
+              'reinterpret_cast<const ULong64_t*>(addresses);']
+    loop = ['    for (Long64_t i = 0; i < n_events; ++i) {']
+    footer = ['        tree->Fill();', '    }', '}', '}']
+    return '\n'.join(header + declarations + loop + assignments + footer)
+
+
+def _compile_fill(tree):
+    import ROOT
+    digest = hashlib.sha1(repr(tree).encode('utf-8')).hexdigest()[:12]
+    function = 'fill_' + digest
+    namespace = getattr(ROOT, 'cmsl1t_synthetic', None)
+    if namespace is None or not hasattr(namespace, function):
+        if not ROOT.gInterpreter.Declare(_fill_source(function, tree)):
+            raise RuntimeError("Could not compile the filling of " + tree.path)
+    return getattr(ROOT.cmsl1t_synthetic, function)
+
+
+def _data_format(class_name):
+    import ROOT
+    cls = ROOT
+    for name in class_name.split('::'):
+        cls = getattr(cls, name)
+    return cls()
+
+
+def _address(obj):
+    import ROOT
+    if hasattr(ROOT, 'addressof'):
+        return ROOT.addressof(obj)
+    return ROOT.AddressOf(obj)[0]
+
+
+class _TreeWriter(object):
+
+    def __init__(self, root_file, tree):
+        import ROOT
+        self.layout = tree
+        directory, _, _ = tree.path.rpartition('/')
+        if directory:
+            if not root_file.GetDirectory(directory):
+                root_file.mkdir(directory)
+            root_file.cd(directory)
+        else:
+            root_file.cd()
+        self.tree = ROOT.TTree(tree.name, tree.name)
+        self.objects = []
+        for branch in tree.branches:
+            obj = _data_format(branch.class_name)
+            self.tree.Branch(branch.name, obj)
+            self.objects.append(obj)
+        self.fill = _compile_fill(tree)
+
+    def add(self, rng, n_events, pileup, distributions, first_event):
+        # In the order of _fill_source; arrays must stay alive until filled
+        arrays, addresses = [], []
+        for branch, obj in zip(self.layout.branches, self.objects):
+            columns, offsets = draw_branch(rng, branch, n_events, pileup,
+                                           distributions, first_event)
+            addresses.append(_address(obj))
+            for member in branch.members:
+                if member.counter is not None and member.counter in offsets:
+                    arrays.append(offsets.pop(member.counter))
+                    addresses.append(arrays[-1].ctypes.data)
+            for member in branch.members:
+                dtype = np.float64 if member.kind == 'float' else np.int64
+                arrays.append(np.ascontiguousarray(columns[member.name], dtype))
+                addresses.append(arrays[-1].ctypes.data)
+        addresses = np.array(addresses, dtype=np.uint64)
+        self.fill(self.tree, n_events, addresses.ctypes.data)
+
+    def write(self):
+        self.tree.GetDirectory().cd()
+        self.tree.Write()
+
+
+def generate(ntuple_map, output_file, n_events, distributions=None,
+             pileup=30, seed=1, first_event=0, chunk_size=10000,
+             data_formats=None):
+    """
+    Write n_events synthetic events into output_file.
+
+    params:
+    - ntuple_map -- the content of an ntuple map file
+    - distributions -- evaluated before DEFAULT_DISTRIBUTIONS, see there
+    - pileup -- mean number of vertices
+    - seed -- the same seed gives the same events
+    - first_event -- number of the first event (Event.event)
+    returns: the number of trees written
+    """
+    import ROOT
+    from cmsl1t.utils.module import load_L1TNTupleLibrary
+    load_L1TNTupleLibrary()
+    distributions = list(distributions or []) + DEFAULT_DISTRIBUTIONS
+    trees = tree_layout(ntuple_map, data_formats)
+    rng = np.random.RandomState(seed)
+
+    root_file = ROOT.TFile.Open(output_file, 'RECREATE')
+    try:
+        writers = [_TreeWriter(root_file, tree) for tree in trees]
+        for start in range(0, n_events, chunk_size):
+            n_chunk = min(chunk_size, n_events - start)
+            event_pileup = rng.poisson(pileup, n_chunk)
+            for writer in writers:
+                writer.add(rng, n_chunk, event_pileup, distributions,
+                           first_event + start)
+        for writer in writers:
+            writer.write()
+    finally:
+        root_file.Close()
+    logger.info("Wrote {0} events with {1} trees to {2}".format(
+        n_events, len(trees), output_file))
+    return len(trees)
+
+
+def _generate(args):
+    return generate(*args[:-1], **args[-1])
+
+
+def generate_files(ntuple_map, output_dir, n_files, events_per_file,
+                   n_workers=1, seed=1, **kwargs):
+    """
+    Write n_files files of events_per_file events into output_dir, using
+    n_workers processes.  File i is seeded with seed + i.
+
+    returns: the file names
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    filenames = [os.path.join(output_dir, 'L1Ntuple_{0}.root'.format(i))
+                 for i in range(n_files)]
+    jobs = [(ntuple_map, filename, events_per_file,
+             dict(kwargs, seed=seed + i, first_event=i * events_per_file))
+            for i, filename in enumerate(filenames)]
+    if n_workers < 2 or n_files < 2:
+        for job in jobs:
+            _generate(job)
+        return filenames
+
+    from cmsl1t.plotting.render import _create_pool
+    pool = _create_pool(min(n_workers, n_files), maxtasksperchild=1)
+    try:
+        pool.map(_generate, jobs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    return filenames
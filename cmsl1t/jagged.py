@@ -0,0 +1,135 @@
+"""
+Minimal jagged (variable length per event) arrays for columnar analysis.
+
+A jagged array is stored as one flat array of values (``content``) and an
+array of ``offsets`` of length n_events + 1, such that the values of event
+``i`` are ``content[offsets[i]:offsets[i + 1]]``.
+"""
+from __future__ import absolute_import
+import numpy as np
+
+
+class JaggedArray(object):
+    __slots__ = ['content', 'offsets']
+
+    def __init__(self, content, offsets):
+        self.content = np.asarray(content)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    @classmethod
+    def from_counts(cls, content, counts):
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(content, offsets)
+
+    @classmethod
+    def from_lists(cls, lists):
+        counts = [len(values) for values in lists]
+        content = np.concatenate([np.asarray(values, dtype=float)
+                                  for values in lists]) \
+            if lists else np.array([])
+        return cls.from_counts(content, counts)
+
+    @property
+    def counts(self):
+        return np.diff(self.offsets)
+
+    @property
+    def parents(self):
+        '''
+            The event index of every element in content, e.g.
+            counts [2, 0, 1] -> parents [0, 0, 2]
+        '''
+        return np.repeat(np.arange(len(self)), self.counts)
+
+    @property
+    def local_index(self):
+        '''
+            The position of every element inside its event, e.g.
+            counts [2, 0, 1] -> local_index [0, 1, 0]
+        '''
+        return np.arange(len(self.content)) - self.offsets[:-1][self.parents]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return self.content[self.offsets[index]:self.offsets[index + 1]]
+        # select events, via a boolean mask or an array of indices
+        index = np.arange(len(self))[index]
+        counts = self.counts[index]
+        starts = self.offsets[:-1][index]
+        element_index = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        element_index += np.arange(counts.sum())
+        return JaggedArray.from_counts(self.content[element_index], counts)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def select(self, element_mask):
+        '''
+            Keep only the elements for which element_mask (a flat, boolean
+            array of the same length as content) is True
+        '''
+        element_mask = np.asarray(element_mask, dtype=bool)
+        counts = np.bincount(self.parents[element_mask], minlength=len(self))
+        return JaggedArray.from_counts(self.content[element_mask], counts)
+
+    def apply(self, content):
+        '''
+            Create a new JaggedArray with the same structure but new content
+        '''
+        return JaggedArray(content, self.offsets)
+
+    def max(self, empty=0.):
+        '''
+            Maximum per event, events without elements get the value `empty`
+        '''
+        result = np.full(len(self), empty, dtype=float)
+        if len(self.content):
+            maxima = np.full(len(self), -np.inf)
+            np.maximum.at(maxima, self.parents, self.content)
+            has_content = self.counts > 0
+            result[has_content] = maxima[has_content]
+        return result
+
+    def sum(self):
+        return np.bincount(self.parents, weights=self.content,
+                           minlength=len(self))
+
+    def argmax(self):
+        '''
+            Index into content of the largest element of each event, -1 for
+            events without elements.  Ties resolve to the first element.
+        '''
+        result = np.full(len(self), -1, dtype=np.int64)
+        if not len(self.content):
+            return result
+        order = np.lexsort((-self.content, self.parents))
+        firsts = self.offsets[:-1][self.counts > 0]
+        result[self.counts > 0] = order[firsts]
+        return result
+
+    def last(self, default=0.):
+        '''
+            Last element of each event, `default` for events without elements
+        '''
+        result = np.full(len(self), default, dtype=float)
+        has_content = self.counts > 0
+        result[has_content] = self.content[self.offsets[1:][has_content] - 1]
+        return result
+
+    def first(self, default=0.):
+        '''
+            First element of each event, `default` for events without elements
+        '''
+        result = np.full(len(self), default, dtype=float)
+        has_content = self.counts > 0
+        result[has_content] = self.content[self.offsets[:-1][has_content]]
+        return result
+
+    def __repr__(self):
+        return 'JaggedArray({0} events, {1} elements)'.format(
+            len(self), len(self.content))
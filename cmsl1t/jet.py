@@ -55,3 +55,35 @@ def match(jet, jets, minDeltaR=0.4):
         return None
     index = dRs.argmin()
     return jets[index]
+
+
+def match_batch(ref_event, ref_eta, ref_phi, jets_eta, jets_phi, minDeltaR=0.4):
+    '''
+        Columnar version of match.
+        ref_event, ref_eta and ref_phi are flat arrays, one entry per
+        reference jet, where ref_event is the index of the event the reference
+        belongs to.  jets_eta and jets_phi are cmsl1t.jagged.JaggedArrays of
+        the jets to match to.
+
+        Returns for every reference jet the index into jets_eta.content of the
+        matched jet, or -1 if there is none.
+    '''
+    from cmsl1t.jagged import JaggedArray
+    ref_event = np.asarray(ref_event, dtype=np.int64)
+    n_jets = jets_eta.counts[ref_event]
+    pair_ref = np.repeat(np.arange(len(ref_event)), n_jets)
+    starts = jets_eta.offsets[:-1][ref_event]
+    pair_jet = np.repeat(starts - np.cumsum(n_jets) + n_jets, n_jets)
+    pair_jet += np.arange(n_jets.sum(), dtype=np.int64)
+
+    dEtas = np.asarray(ref_eta)[pair_ref] - jets_eta.content[pair_jet]
+    dPhis = np.asarray(ref_phi)[pair_ref] - jets_phi.content[pair_jet]
+    dRs = np.sqrt(dEtas**2 + dPhis**2)
+
+    closest = JaggedArray.from_counts(-dRs, n_jets).argmax()
+    result = np.full(len(ref_event), -1, dtype=np.int64)
+    has_jets = closest >= 0
+    is_match = np.zeros(len(ref_event), dtype=bool)
+    is_match[has_jets] = dRs[closest[has_jets]] <= minDeltaR
+    result[is_match] = pair_jet[closest[is_match]]
+    return result
@@ -10,10 +10,13 @@ def cumulative_sum_and_error(hist):
         histogram errors: [1, 1, 2, 2]
         Output: [10, 9, 7, 4], [3.16227766, 3, 2.82842712, 2]
     '''
-    hist_values = [b.value for b in hist]
+    from cmsl1t.utils.hist import bin_contents, bin_sumw2
+    hist_values = bin_contents(hist)
     reversed_cumsum = _reversed_cumulative_sum(hist_values)
 
-    errors_squared = np.square([b.error for b in hist])
+    errors_squared = bin_sumw2(hist)
+    if errors_squared is None:
+        errors_squared = hist_values
     reversed_cumsum_errors = np.sqrt(_reversed_cumulative_sum(errors_squared))
 
     return reversed_cumsum, reversed_cumsum_errors
@@ -24,3 +27,13 @@ def _reversed_cumulative_sum(values):
     cumsum = np.cumsum(reversed_values)
     reversed_cumsum = np.array(np.flipud(cumsum))
     return reversed_cumsum
+
+
+def reversed_cumulative_sum_inplace(values):
+    '''
+        Same as _reversed_cumulative_sum, but overwrites the values, which
+        have to be a (writeable) numpy array
+    '''
+    reversed_view = values[::-1]
+    np.cumsum(reversed_view, out=reversed_view, dtype=values.dtype)
+    return values
@@ -1,5 +1,6 @@
 from rootpy.ROOT import gPad
 from cmsl1t.io import to_root, from_root
+from cmsl1t.plotting.render import record_image
 from copy import deepcopy
 import logging
 logger = logging.getLogger(__name__)
@@ -9,6 +10,9 @@ class BasePlotter(object):
     """
     A Base class to be used by the various plotters
     """
+    # Attributes (e.g. event counters) that are added up, rather than
+    # compared, when summing histogram files (see cmsl1t.io.npz)
+    summed_attributes = ()
 
     def __init__(self, directory_name):
         self.directory_name = directory_name
@@ -31,6 +35,7 @@ class BasePlotter(object):
             name = canvas.GetName()
         out_path = "{}/{}.{}".format(self.output_dir, name, self.output_format)
         canvas.SaveAs(out_path)
+        record_image(out_path)
 
     def build(self, *vargs, **kwargs):
         """
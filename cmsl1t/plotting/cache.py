@@ -0,0 +1,166 @@
+"""
+Cache of rendered plots, so that re-running on the same histograms only redraws
+the plotters that changed.
+
+Every PlotTask is hashed from
+ - the histograms and other attributes of its plotter (and of any plotters
+   passed as arguments, e.g. the emulator plotter for overlays),
+ - the output directory and format,
+ - the source code of the plotter class and of the cmsl1t modules it uses to
+   draw (so that changing a style also redraws).
+The hashes and the images each task wrote are kept in a JSON manifest.  A task
+is skipped if its hash is unchanged and all of its images still exist.
+"""
+import hashlib
+import inspect
+import json
+import os
+import sys
+import types
+import numpy as np
+from cmsl1t.utils.hist import bin_contents, bin_sumw2, bin_edges
+import logging
+logger = logging.getLogger(__name__)
+
+_SCALARS = (type(None), bool, int, float, str)
+_SKIPPED_TYPES = (types.FunctionType, types.MethodType, types.ModuleType,
+                  types.BuiltinFunctionType, type)
+if sys.version_info[0] < 3:
+    _SCALARS += (long, unicode)  # noqa: F821
+    _SKIPPED_TYPES += (types.ClassType, )
+
+
+def _update_hist(digest, hist):
+    digest.update(repr((hist.ClassName(), hist.GetName(), hist.GetTitle(),
+                        hist.GetXaxis().GetTitle(), hist.GetYaxis().GetTitle()
+                        )).encode())
+    axes = ['x', 'y', 'z'][:hist.GetDimension()]
+    for array in [bin_edges(hist, axis) for axis in axes] + \
+            [bin_contents(hist), bin_sumw2(hist)]:
+        if array is not None:
+            digest.update(np.ascontiguousarray(array).tobytes())
+
+
+def _update(digest, obj, seen):
+    if isinstance(obj, _SCALARS):
+        digest.update(repr(obj).encode())
+        return
+    if isinstance(obj, _SKIPPED_TYPES):
+        digest.update(getattr(obj, '__name__', '').encode())
+        return
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+
+    digest.update(type(obj).__name__.encode())
+    if isinstance(obj, np.ndarray):
+        digest.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            _update(digest, item, seen)
+    elif isinstance(obj, (set, frozenset)):
+        for item in sorted(obj, key=repr):
+            _update(digest, item, seen)
+    elif isinstance(obj, dict):
+        for key in sorted(obj, key=repr):
+            digest.update(repr(key).encode())
+            _update(digest, obj[key], seen)
+    elif hasattr(obj, 'GetPassedHistogram'):
+        # TEfficiency
+        digest.update(repr((obj.GetName(), obj.GetTitle())).encode())
+        _update_hist(digest, obj.GetPassedHistogram())
+        _update_hist(digest, obj.GetTotalHistogram())
+    elif hasattr(obj, 'GetNbinsX'):
+        _update_hist(digest, obj)
+    elif hasattr(obj, 'IsA'):
+        # Any other ROOT object: fits, graphs, ...
+        digest.update(repr((obj.GetName(), obj.GetTitle())).encode())
+    elif hasattr(obj, '__dict__'):
+        _update(digest, vars(obj), seen)
+    else:
+        digest.update(repr(obj).encode())
+
+
+def _source_files(plotter_class):
+    """
+    Source files of the plotter class, its bases, and the cmsl1t modules they
+    import to draw
+    """
+    modules = set()
+    for cls in inspect.getmro(plotter_class):
+        module = sys.modules.get(cls.__module__)
+        if module is None or not cls.__module__.startswith('cmsl1t'):
+            continue
+        modules.add(module)
+        for value in vars(module).values():
+            name = value.__name__ if isinstance(value, types.ModuleType) \
+                else getattr(value, '__module__', None)
+            if name and name.startswith('cmsl1t') and name in sys.modules:
+                modules.add(sys.modules[name])
+    files = set()
+    for module in modules:
+        try:
+            files.add(inspect.getsourcefile(module))
+        except TypeError:
+            continue
+    return sorted(f for f in files if f)
+
+
+def content_hash(*objects):
+    """ Hash of the contents of any histograms, plotters and plain values """
+    digest = hashlib.sha1()
+    _update(digest, list(objects), set())
+    return digest.hexdigest()
+
+
+def task_hash(task):
+    """ Content hash of everything that determines the output of a PlotTask """
+    digest = hashlib.sha1()
+    digest.update(task.key.encode())
+    for plotter in [task.plotter] + list(task.args):
+        if not hasattr(plotter, 'directory_name'):
+            continue
+        for filename in _source_files(type(plotter)):
+            with open(filename, 'rb') as source:
+                digest.update(source.read())
+    _update(digest, [task.plotter, task.args, task.kwargs], set())
+    return digest.hexdigest()
+
+
+class PlotCache(object):
+    """
+    JSON manifest of task key -> {hash, images}
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.entries = {}
+        self._hashes = {}
+        if os.path.exists(filename):
+            try:
+                with open(filename) as manifest:
+                    self.entries = json.load(manifest)
+            except ValueError:
+                logger.warning(
+                    "Ignoring unreadable plot cache " + filename)
+
+    def is_fresh(self, task):
+        """
+        True if the task would produce the same images that are already on
+        disk
+        """
+        self._hashes[task.key] = task_hash(task)
+        entry = self.entries.get(task.key)
+        if not entry or entry['hash'] != self._hashes[task.key]:
+            return False
+        return all(os.path.exists(image) for image in entry['images'])
+
+    def update(self, task, images):
+        key = task.key
+        if key not in self._hashes:
+            self._hashes[key] = task_hash(task)
+        self.entries[key] = dict(hash=self._hashes[key], images=sorted(images))
+
+    def save(self):
+        with open(self.filename, 'w') as manifest:
+            json.dump(self.entries, manifest, indent=1, sort_keys=True)
@@ -4,8 +4,10 @@ from cmsl1t.hist.hist_collection import HistogramCollection
 from cmsl1t.hist.factory import HistFactory
 import cmsl1t.hist.binning as bn
 from cmsl1t.utils.draw import draw, label_canvas
-from cmsl1t.utils.fit_efficiency import fit_efficiency
+from cmsl1t.utils.fit_cache import FitCache, FitRequest, fit_efficiencies
+from cmsl1t.utils.hist import fill_efficiency_array
 import numpy as np
+import os
 
 from rootpy.plotting import Legend, HistStack, Efficiency
 from rootpy.context import preserve_current_style
@@ -27,6 +29,10 @@ class EfficiencyPlot(BasePlotter):
     drawstyle = 'HIST'
     drawstyle_data = 'P'
     markerstyle_overlay = 23
+    # Number of processes used to fit the efficiencies
+    fit_workers = 1
+    # How to fit the efficiencies, see cmsl1t.utils.fit_cache.BACKENDS
+    fit_backend = "root"
 
     def __init__(self, online_name, offline_name):
         name = ["efficiency", online_name, offline_name]
@@ -86,6 +92,17 @@ class EfficiencyPlot(BasePlotter):
                 passed = True
             efficiency.fill(passed, offline)
 
+    def fill_batch(self, pileup, offline, online):
+        """ Same as fill, but for numpy arrays with one entry per event """
+        for pileup_bin, mask in self.pileup_bins.bin_masks(pileup):
+            pu_offline, pu_online = offline[mask], online[mask]
+            for threshold_bin in self.thresholds:
+                threshold = self.thresholds.get_bin_center(threshold_bin)
+                efficiency = self.efficiencies.get_bin_contents(
+                    [pileup_bin, threshold_bin])
+                fill_efficiency_array(
+                    efficiency, pu_offline, pu_online > threshold)
+
     def draw(self, with_fits=False):
         # Fit the efficiencies if requested
         if with_fits:
@@ -103,7 +120,7 @@ class EfficiencyPlot(BasePlotter):
                 continue
             hist = all_pileup_effs.get_bin_contents(threshold)
             hist.drawstyle = EfficiencyPlot.drawstyle_data
-            self._dynamic_bin(hist)
+            hist = self._dynamic_bin(hist)
             hists.append(hist)
 
             label = label_template.format(
@@ -129,7 +146,7 @@ class EfficiencyPlot(BasePlotter):
                         continue
                     hist = self.efficiencies.get_bin_contents([pileup, threshold])
                     hist.drawstyle = EfficiencyPlot.drawstyle_data
-                    self._dynamic_bin(hist)
+                    hist = self._dynamic_bin(hist)
                     hists.append(hist)
                     if with_fits:
                         fits.append(self.fits.get_bin_contents(
@@ -162,7 +179,7 @@ class EfficiencyPlot(BasePlotter):
                 continue
             hist = all_pileup_effs.get_bin_contents(threshold)
             hist.drawstyle = EfficiencyPlot.drawstyle_data
-            self._dynamic_bin(hist)
+            hist = self._dynamic_bin(hist)
             hists.append(hist)
 
             label = label_template.format(
@@ -180,7 +197,7 @@ class EfficiencyPlot(BasePlotter):
             hist = emu_pileup_effs.get_bin_contents(threshold)
             hist.drawstyle = EfficiencyPlot.drawstyle_data
             hist.markerstyle = EfficiencyPlot.markerstyle_overlay
-            self._dynamic_bin(hist)
+            hist = self._dynamic_bin(hist)
             hists.append(hist)
 
             label = label_template.format(
@@ -220,14 +237,24 @@ class EfficiencyPlot(BasePlotter):
             self.__summarize_fits()
 
     def __fit_efficiencies(self):
+        # Fit all bins at once, so the fits can run in parallel
+        requests = {}
+        for bins, efficiency in self.efficiencies.flat_items_all():
+            threshold = self.thresholds.get_bin_center(bins[1])
+            requests[bins] = FitRequest(efficiency, threshold,
+                                        backend=self.fit_backend)
+        # Seed each threshold from the one below
+        for (pileup_bin, threshold_bin), request in requests.items():
+            if isinstance(threshold_bin, int) and threshold_bin > 0:
+                request.neighbour = requests[(pileup_bin, threshold_bin - 1)]
+        bins = sorted(requests, key=str)
+        cache = FitCache(os.path.join(self.output_dir, ".fit_cache"))
+        results = fit_efficiencies([requests[b] for b in bins],
+                                   self.fit_workers, cache)
+        results = dict(zip(bins, results))
+
         def make_fit(labels):
-            pileup_bin = labels["pileup"]
-            threshold_bin = labels["threshold"]
-            efficiency = self.efficiencies.get_bin_contents(
-                [pileup_bin, threshold_bin])
-            params = fit_efficiency(
-                efficiency, self.thresholds.get_bin_center(threshold_bin))
-            return params
+            return results[(labels["pileup"], labels["threshold"])]
 
         # Actually make the efficiencies
         self.fits = HistogramCollection([self.pileup_bins, self.thresholds],
@@ -309,7 +336,9 @@ class EfficiencyPlot(BasePlotter):
 
     def _dynamic_bin(self, eff):
         """
-        Re-build efficiency plots so that there are no bins with < min_ entries
+        Re-build efficiency plots so that there are no bins with < min_ entries.
+        Returns a re-binned copy, the efficiency itself is left as it is so
+        that drawing it again (e.g. in another worker) gives the same plot.
         """
 
         min_ = 16
@@ -350,5 +379,7 @@ class EfficiencyPlot(BasePlotter):
         hist_total.Sumw2(False)
         hist_passed.Sumw2(False)
 
-        eff.SetTotalHistogram(hist_total, "f")
-        eff.SetPassedHistogram(hist_passed, "f")
+        rebinned = eff.Clone()
+        rebinned.SetTotalHistogram(hist_total, "f")
+        rebinned.SetPassedHistogram(hist_passed, "f")
+        return rebinned
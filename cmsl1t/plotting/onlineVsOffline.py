@@ -5,6 +5,7 @@ from cmsl1t.hist.factory import HistFactory
 import cmsl1t.hist.binning as bn
 from cmsl1t.utils.draw import draw2D, label_canvas
 from cmsl1t.io import to_root
+from cmsl1t.utils.hist import fill_array_2d
 
 from rootpy.plotting import Legend, HistStack
 from rootpy.context import preserve_current_style
@@ -72,6 +73,12 @@ class OnlineVsOffline(BasePlotter):
     def fill(self, pileup, offline, online):
         self.plots[pileup].fill(offline, online)
 
+    def fill_batch(self, pileup, offline, online):
+        """ Same as fill, but for numpy arrays with one entry per event """
+        for pileup_bin, mask in self.pileup_bins.bin_masks(pileup):
+            fill_array_2d(self.plots.get_bin_contents([pileup_bin]),
+                          offline[mask], online[mask])
+
     def draw(self, with_fits=True):
         for pileup in self.pileup_bins.iter_all():
             plot = self.plots.get_bin_contents([pileup])
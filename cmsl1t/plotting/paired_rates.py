@@ -0,0 +1,230 @@
+from __future__ import print_function
+import numpy as np
+import pandas as pd
+
+from cmsl1t.plotting.base import BasePlotter
+from cmsl1t.plotting.rates import RatesPlot
+from cmsl1t.plotting.rate_vs_pileup import RateVsPileupPlot
+from cmsl1t.hist.hist_collection import HistogramCollection
+import cmsl1t.hist.binning as bn
+from cmsl1t.utils.hist import fill_array_2d
+
+from rootpy import asrootpy
+
+# bins on the 'source' axis of the 2D histograms
+HW, EMU = 0, 1
+SOURCE_SUFFIXES = {HW: '', EMU: '_Emu'}
+
+
+def _project(hist, source, name):
+    projection = asrootpy(hist.ProjectionX(name, source + 1, source + 1, 'e'))
+    projection.SetDirectory(None)
+    return projection
+
+
+class PairedRatesPlot(BasePlotter):
+    """
+    Rates and rate vs pileup for the hardware and emulator values of the same
+    quantity, filled together in a single call.
+
+    Every histogram has a second axis, the source (HW or Emu).  This saves
+    the lookup of the bins and the Python calls of a second plotter, but each
+    histogram is still filled once for HW and once for Emu.  The emulator can
+    have its own thresholds for the rate vs pileup, one for each hardware
+    threshold.  For drawing, the plotter is split into the equivalent
+    RatesPlot and RateVsPileupPlot objects, so the output is the same as for
+    separate plotters.  Events where hardware and emulator disagree are
+    counted per (hardware, emulator) threshold and the first max_mismatches
+    of them are kept for validation.
+    """
+    summed_attributes = ('n_events', 'n_different', 'disagreements',
+                         'mismatches')
+
+    def __init__(self, online_name, max_mismatches=1000):
+        name = ["paired_rates", online_name]
+        super(PairedRatesPlot, self).__init__("__".join(name))
+        self.online_name = online_name
+        self.max_mismatches = max_mismatches
+
+    def create_histograms(self, online_title, pileup_bins, thresholds,
+                          n_bins, low, high,
+                          pu_n_bins, pu_low, pu_high, legend_title="",
+                          emu_thresholds=None):
+        """ This is not in an init function so that we can by-pass this in the
+        case where we reload things from disk """
+        if emu_thresholds is None:
+            emu_thresholds = thresholds
+        if len(emu_thresholds) != len(thresholds):
+            raise ValueError(
+                "{0}: need one Emu threshold per HW threshold, got {1} and "
+                "{2}".format(self.online_name, emu_thresholds, thresholds))
+        self.online_title = online_title
+        self.legend_title = legend_title
+        self.pileup_bins = bn.Sorted(pileup_bins, "pileup",
+                                     use_everything_bin=True)
+        self.thresholds = bn.GreaterThan(thresholds, "threshold", True)
+        # rate_vs_pileup is indexed by the position of the threshold, which
+        # is the same for both
+        self.emu_thresholds = bn.GreaterThan(emu_thresholds, "threshold", True)
+
+        name = "__".join(["paired_rate_vs_threshold", self.online_name,
+                          "pu_{pileup}"])
+        title = " ".join([self.online_name, "vs.", "in PU bin: {pileup}"])
+        title = ";".join([title, self.online_title, "source"])
+        self.rates = HistogramCollection([self.pileup_bins],
+                                         "Hist2D", n_bins, low, high,
+                                         2, 0, 2, name=name, title=title)
+
+        name = "__".join(["paired_rate_vs_pileup", self.online_name,
+                          "thresh_{threshold}"])
+        title = " ".join([self.online_name, " rate vs pileup",
+                          "passing threshold: {threshold}"])
+        self.rate_vs_pileup = HistogramCollection([self.thresholds],
+                                                  "Hist2D", pu_n_bins,
+                                                  pu_low, pu_high, 2, 0, 2,
+                                                  name=name, title=title)
+
+        self.n_events = 0
+        self.n_different = 0
+        self.disagreements = np.zeros(len(self.thresholds), dtype=np.int64)
+        self.mismatches = []
+
+    def fill(self, pileup, hw, emu, entry=-1):
+        for hist in self.rates[pileup]:
+            hist.fill(hw, HW)
+            hist.fill(emu, EMU)
+        for source, value, binning in self._sources(hw, emu):
+            for index in binning.find_all_bins(value):
+                hist = self.rate_vs_pileup.get_bin_contents([index])
+                hist.fill(pileup, source)
+
+        self.n_events += 1
+        if hw == emu:
+            return
+        self.n_different += 1
+        for i, (threshold, emu_threshold) in enumerate(self._threshold_pairs()):
+            if (hw >= threshold) != (emu >= emu_threshold):
+                self.disagreements[i] += 1
+        if len(self.mismatches) < self.max_mismatches:
+            self.mismatches.append((entry, pileup, hw, emu))
+
+    def fill_batch(self, pileup, hw, emu, entries=None):
+        """ Same as fill, but for numpy arrays with one entry per event """
+        sources = self._sources(hw, emu)
+        for pileup_bin, mask in self.pileup_bins.bin_masks(pileup):
+            hist = self.rates.get_bin_contents([pileup_bin])
+            for source, values, _ in sources:
+                fill_array_2d(hist, values[mask], np.full(mask.sum(), source))
+        for source, values, binning in sources:
+            for threshold_bin, mask in binning.bin_masks(values):
+                hist = self.rate_vs_pileup.get_bin_contents([threshold_bin])
+                fill_array_2d(hist, pileup[mask], np.full(mask.sum(), source))
+
+        self.n_events += len(hw)
+        different = np.flatnonzero(hw != emu)
+        self.n_different += len(different)
+        for i, (threshold, emu_threshold) in enumerate(self._threshold_pairs()):
+            passes_hw = hw[different] >= threshold
+            passes_emu = emu[different] >= emu_threshold
+            self.disagreements[i] += np.count_nonzero(passes_hw != passes_emu)
+        n_free = self.max_mismatches - len(self.mismatches)
+        if n_free > 0:
+            different = different[:n_free]
+            if entries is None:
+                entries = np.full(len(hw), -1)
+            self.mismatches.extend(zip(
+                entries[different].tolist(), pileup[different].tolist(),
+                hw[different].tolist(), emu[different].tolist()))
+
+    def _sources(self, hw, emu):
+        return [(HW, hw, self.thresholds), (EMU, emu, self.emu_thresholds)]
+
+    def _threshold_pairs(self):
+        return zip(self.thresholds.bins, self.emu_thresholds.bins)
+
+    def to_rates_plots(self):
+        """
+        Returns the (hardware, emulator) RatesPlots for these histograms
+        """
+        return [self._split(RatesPlot, source) for source in (HW, EMU)]
+
+    def to_rate_vs_pileup_plots(self):
+        """
+        Returns the (hardware, emulator) RateVsPileupPlots for these histograms
+        """
+        return [self._split(RateVsPileupPlot, source) for source in (HW, EMU)]
+
+    def _split(self, plotter_class, source):
+        suffix = SOURCE_SUFFIXES[source]
+        plotter = plotter_class(self.online_name + suffix)
+        plotter.set_plot_output_cfg(self.output_dir, self.output_format)
+        plotter.online_title = self.online_title + suffix
+        plotter.legend_title = self.legend_title
+        if plotter_class is RatesPlot:
+            plotter.pileup_bins = binning = self.pileup_bins
+            name = ["rate_vs_threshold", plotter.online_name, "pu_{pileup}"]
+            collection = self.rates
+        else:
+            plotter.thresholds = binning = [self.thresholds,
+                                            self.emu_thresholds][source]
+            name = ["rate_vs_pileup", plotter.online_name, "thresh_{threshold}"]
+            collection = self.rate_vs_pileup
+        plotter.filename_format = "__".join(name)
+        plotter.plots = self._projected_collection(
+            collection, binning, source, plotter.filename_format)
+        plotter._is_built = True
+        return plotter
+
+    def _projected_collection(self, collection, binning, source, name):
+        def project(labels):
+            index = labels[binning.label]
+            hist = collection.get_bin_contents([index])
+            return _project(hist, source, name.format(**labels))
+        return HistogramCollection([binning], project)
+
+    def draw(self):
+        hw, emu = self.to_rates_plots()
+        hw.overlay_with_emu(emu)
+        hw, emu = self.to_rate_vs_pileup_plots()
+        hw.overlay_with_emu(emu)
+
+    def get_disagreements(self):
+        stats = dict(identifier=self.online_title, events=self.n_events,
+                     different=self.n_different)
+        labels = ['>= {0}'.format(threshold) if threshold == emu_threshold
+                  else '>= {0} / {1}'.format(threshold, emu_threshold)
+                  for threshold, emu_threshold in self._threshold_pairs()]
+        for label, count in zip(labels, self.disagreements):
+            stats[label] = count
+        columns = ['identifier', 'events', 'different'] + labels
+        return pd.DataFrame([stats])[columns]
+
+    def get_mismatches(self):
+        # Summing npz files (cmsl1t.io.npz) concatenates all the mismatches
+        df = pd.DataFrame(self.mismatches[:self.max_mismatches],
+                          columns=['entry', 'pileup', 'hw', 'emu'])
+        df.insert(0, 'identifier', self.online_title)
+        return df
+
+    def _is_consistent(self, new):
+        """
+        Check the two plotters are the consistent, so same binning and same axis names
+        """
+        return all([self.pileup_bins.bins == new.pileup_bins.bins,
+                    self.thresholds.bins == new.thresholds.bins,
+                    self.emu_thresholds.bins == new.emu_thresholds.bins,
+                    self.online_name == new.online_name,
+                    ])
+
+    def _merge(self, other):
+        """
+        Merge another plotter into this one
+        """
+        self.rates += other.rates
+        self.rate_vs_pileup += other.rate_vs_pileup
+        self.n_events += other.n_events
+        self.n_different += other.n_different
+        self.disagreements += other.disagreements
+        n_free = self.max_mismatches - len(self.mismatches)
+        self.mismatches.extend(other.mismatches[:max(n_free, 0)])
+        return self.rates
@@ -6,6 +6,7 @@ from cmsl1t.hist.hist_collection import HistogramCollection
 import cmsl1t.hist.binning as bn
 from cmsl1t.utils.draw import draw, label_canvas
 from cmsl1t.recalc.resolution import get_resolution_function
+from cmsl1t.utils.hist import fill_array
 
 from rootpy.context import preserve_current_style
 from rootpy.plotting import Legend
@@ -41,6 +42,11 @@ class RateVsPileupPlot(BasePlotter):
     def fill(self, pileup, online):
         self.plots[online].fill(pileup)
 
+    def fill_batch(self, pileup, online):
+        """ Same as fill, but for numpy arrays with one entry per event """
+        for threshold_bin, mask in self.thresholds.bin_masks(online):
+            fill_array(self.plots.get_bin_contents([threshold_bin]), pileup[mask])
+
     def draw(self, with_fits=False):
 
         for (threshold, ), hist in self.plots.flat_items_all():
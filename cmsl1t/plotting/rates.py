@@ -7,6 +7,7 @@ from cmsl1t.hist.factory import HistFactory
 import cmsl1t.hist.binning as bn
 from cmsl1t.utils.draw import draw, label_canvas
 from cmsl1t.utils.hist import cumulative_hist, normalise_to_collision_rate
+from cmsl1t.utils.hist import fill_array
 from cmsl1t.utils.hist import normalise_to_unit_area
 
 
@@ -43,6 +44,11 @@ class RatesPlot(BasePlotter):
     def fill(self, pileup, online):
         self.plots[pileup].fill(online)
 
+    def fill_batch(self, pileup, online):
+        """ Same as fill, but for numpy arrays with one entry per event """
+        for pileup_bin, mask in self.pileup_bins.bin_masks(pileup):
+            fill_array(self.plots.get_bin_contents([pileup_bin]), online[mask])
+
     def draw(self, with_fits=False):
         hists = []
         labels = []
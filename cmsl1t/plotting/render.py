@@ -0,0 +1,119 @@
+"""
+Render plots in parallel.
+
+Each PlotTask calls one drawing method of a plotter (draw, overlay_with_emu,
+...).  Plotters hold many ROOT objects, so rather than pickling them, each
+task runs in a process forked from the analysis process, which inherits the
+task.  Output file names are set by the plotters themselves, so they do not
+depend on which worker draws them.  A task whose process dies (e.g. ROOT
+crashing) is reported as failed.
+
+If a PlotCache is given, tasks whose inputs have not changed since the last
+time they were drawn are skipped.
+"""
+import multiprocessing
+import traceback
+from cmsl1t.utils.workers import Workers
+import logging
+logger = logging.getLogger(__name__)
+
+# Images saved by the plotters in this process
+_IMAGES = []
+
+
+def record_image(path):
+    _IMAGES.append(path)
+
+
+class PlotTask(object):
+
+    def __init__(self, plotter, method='draw', *args, **kwargs):
+        self.plotter = plotter
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self):
+        """ Run the task, returns the images it saved """
+        first = len(_IMAGES)
+        getattr(self.plotter, self.method)(*self.args, **self.kwargs)
+        return _IMAGES[first:]
+
+    @property
+    def key(self):
+        names = [getattr(arg, 'directory_name', repr(arg)) for arg in self.args]
+        return '.'.join([self.plotter.directory_name, self.method] + names)
+
+    def __repr__(self):
+        return 'PlotTask({0})'.format(self.key)
+
+
+def _set_batch_mode():
+    from rootpy import ROOT
+    ROOT.gROOT.SetBatch(True)
+
+
+def _run(index, task, setup=None):
+    """ Run a task, returns (index, traceback or None, images) """
+    try:
+        if setup is not None:
+            setup()
+        images = task()
+    except Exception:
+        return index, traceback.format_exc(), []
+    return index, None, images
+
+
+def _create_pool(n_workers, maxtasksperchild=None):
+    if hasattr(multiprocessing, 'get_context'):
+        return multiprocessing.get_context('fork').Pool(
+            n_workers, maxtasksperchild=maxtasksperchild)
+    return multiprocessing.Pool(n_workers, maxtasksperchild=maxtasksperchild)
+
+
+def render(tasks, n_workers=1, cache=None):
+    """
+    Run all tasks, using n_workers processes if n_workers > 1.
+
+    returns:
+      True if all tasks finished without raising an exception
+    """
+    if cache is not None:
+        n_tasks = len(tasks)
+        tasks = [task for task in tasks if not cache.is_fresh(task)]
+        if len(tasks) < n_tasks:
+            logger.info("Reusing {0} of {1} plots from {2}".format(
+                n_tasks - len(tasks), n_tasks, cache.filename))
+
+    if not n_workers or n_workers < 2 or len(tasks) < 2:
+        results = [_run(index, task) for index, task in enumerate(tasks)]
+    else:
+        results = _render_parallel(tasks, n_workers)
+
+    failures = [(index, error) for index, error, _ in results if error]
+    for index, error in failures:
+        logger.error("Could not render {0}:\n{1}".format(tasks[index], error))
+    if cache is not None:
+        for index, error, images in results:
+            if not error:
+                cache.update(tasks[index], images)
+        cache.save()
+    return not failures
+
+
+def _render_parallel(tasks, n_workers):
+    n_workers = min(n_workers, len(tasks))
+    logger.info("Rendering {0} plots with {1} workers".format(
+        len(tasks), n_workers))
+    workers = Workers(n_workers)
+    results = []
+    try:
+        for index, task in enumerate(tasks):
+            workers.submit(index, _run, index, task, _set_batch_mode)
+        while workers:
+            index, result, error = workers.next_finished()
+            # error is only set if the worker died before returning a result
+            results.append(result if error is None else (index, error, []))
+    finally:
+        workers.terminate()
+    return sorted(results)
@@ -5,7 +5,7 @@ from cmsl1t.hist.factory import HistFactory
 import cmsl1t.hist.binning as bn
 from cmsl1t.utils.draw import draw, label_canvas
 from cmsl1t.recalc.resolution import get_resolution_function
-from cmsl1t.utils.hist import normalise_to_unit_area
+from cmsl1t.utils.hist import normalise_to_unit_area, fill_array
 
 from rootpy.context import preserve_current_style
 from rootpy.plotting import Legend
@@ -48,6 +48,13 @@ class ResolutionPlot(BasePlotter):
         difference = self.resolution_method(online, offline)
         self.plots[pileup].fill(difference)
 
+    def fill_batch(self, pileup, offline, online):
+        """ Same as fill, but for numpy arrays with one entry per event """
+        difference = self.resolution_method.array(online, offline)
+        for pileup_bin, mask in self.pileup_bins.bin_masks(pileup):
+            fill_array(self.plots.get_bin_contents([pileup_bin]),
+                       difference[mask])
+
     def draw(self, with_fits=False):
         hists = []
         labels = []
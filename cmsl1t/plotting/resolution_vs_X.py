@@ -5,6 +5,7 @@ from cmsl1t.hist.factory import HistFactory
 import cmsl1t.hist.binning as bn
 from cmsl1t.utils.draw import draw2D, label_canvas
 from cmsl1t.recalc.resolution import get_resolution_function
+from cmsl1t.utils.hist import fill_array_2d
 
 from rootpy.context import preserve_current_style
 from rootpy.plotting import Legend
@@ -61,6 +62,13 @@ class ResolutionVsXPlot(BasePlotter):
         difference = self.resolution_method(online, offline)
         self.plots[pileup].fill(versus, difference)
 
+    def fill_batch(self, pileup, versus, offline, online):
+        """ Same as fill, but for numpy arrays with one entry per jet """
+        difference = self.resolution_method.array(online, offline)
+        for pileup_bin, mask in self.pileup_bins.bin_masks(pileup):
+            fill_array_2d(self.plots.get_bin_contents([pileup_bin]),
+                          versus[mask], difference[mask])
+
     def draw(self, with_fits=True):
         for (pileup, ), hist in self.plots.flat_items_all():
             self.__do_draw(pileup, hist)
@@ -1,23 +1,38 @@
 from __future__ import print_function
-import ROOT
 
 from cmsl1t.energySums import EnergySum, Mex, Mey, Met
+from cmsl1t.utils.module import load_L1TNTupleLibrary
 from .base import BaseProducer
 
+_energySumLookup = None
+
+
+def energySumTypes():
+    '''
+        {sum type: {'name':, 'type':}} of the L1 energy sums. The sum types
+        come from the L1TNtuple data formats library, which is loaded on first
+        use so that the producer can be imported before any ntuple is read
+    '''
+    global _energySumLookup
+    if _energySumLookup is None:
+        load_L1TNTupleLibrary()
+        import ROOT
+        sumTypes = ROOT.l1t.EtSum
+        _energySumLookup = {
+            sumTypes.kTotalEt: {'name': 'Ett', 'type': EnergySum},
+            sumTypes.kTotalEtHF: {'name': 'EttHF', 'type': EnergySum},
+            sumTypes.kTotalHt: {'name': 'Htt', 'type': EnergySum},
+            sumTypes.kTotalHtHF: {'name': 'HttHF', 'type': Met},
+            sumTypes.kMissingEt: {'name': 'Met', 'type': Met},
+            sumTypes.kMissingEtHF: {'name': 'MetHF', 'type': Met},
+            sumTypes.kMissingHt: {'name': 'Mht', 'type': Met},
+            sumTypes.kTotalEtx: {'name': 'Mex', 'type': Mex},
+            sumTypes.kTotalEty: {'name': 'Mey', 'type': Mey},
+        }
+    return _energySumLookup
+
 
 class Producer(BaseProducer):
-    sumTypes = ROOT.l1t.EtSum
-    energySumTypes = {
-        sumTypes.kTotalEt: {'name': 'Ett', 'type': EnergySum},
-        sumTypes.kTotalEtHF: {'name': 'EttHF', 'type': EnergySum},
-        sumTypes.kTotalHt: {'name': 'Htt', 'type': EnergySum},
-        sumTypes.kTotalHtHF: {'name': 'HttHF', 'type': Met},
-        sumTypes.kMissingEt: {'name': 'Met', 'type': Met},
-        sumTypes.kMissingEtHF: {'name': 'MetHF', 'type': Met},
-        sumTypes.kMissingHt: {'name': 'Mht', 'type': Met},
-        sumTypes.kTotalEtx: {'name': 'Mex', 'type': Mex},
-        sumTypes.kTotalEty: {'name': 'Mey', 'type': Mey},
-    }
 
     def __init__(self, inputs, outputs, **kwargs):
         self._expected_input_order = ['sumBx', 'type', 'et', 'phi']
@@ -25,18 +40,34 @@ class Producer(BaseProducer):
 
     def produce(self, event):
         variables = [event[i] for i in self._inputs]
-        energySumTypes = Producer.energySumTypes
+        sumTypes = energySumTypes()
         prefix = self._outputs[0] + '_'
 
         for sumBx, sumType, et, phi in zip(*variables):
             if sumBx != 0:
                 continue
-            if sumType in energySumTypes:
-                name = energySumTypes[sumType]['name']
-                obj = energySumTypes[sumType]['type']
+            if sumType in sumTypes:
+                name = sumTypes[sumType]['name']
+                obj = sumTypes[sumType]['type']
                 if obj == Met:
                     setattr(event, prefix + name, obj(et, phi))
                 else:
                     setattr(event, prefix + name, obj(et))
 
         return True
+
+
+def batch_sums(sumBx, sumType, sumEt, sumPhi):
+    '''
+        Columnar version of Producer.produce, for cmsl1t.jagged.JaggedArray
+        inputs.  Returns {name: (et, phi)} with one value per event for every
+        sum type in energySumTypes() (0 where an event has no such sum)
+    '''
+    in_bx = sumBx.content == 0
+    sums = {}
+    for sum_type, sum_info in energySumTypes().items():
+        selected = in_bx & (sumType.content == sum_type)
+        # Like the producer, the last matching sum of an event wins
+        sums[sum_info['name']] = (sumEt.select(selected).last(),
+                                  sumPhi.select(selected).last())
+    return sums
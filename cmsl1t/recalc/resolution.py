@@ -5,16 +5,24 @@ twopi = 2 * pi
 
 
 def get_resolution_function(resolution_type):
+    """
+    Returns the resolution function for one pair of values.
+    Where available, function.array works on numpy arrays instead.
+    """
     resolution_type = resolution_type.lower()
     if resolution_type == "energy":
         function = resolution_energy
         function.label = "({on} - {off})/ {off}"
+        function.array = resolution_energy_array
     elif resolution_type == "phi":
         function = resolution_phi
+        function.array = resolution_phi_array
     elif resolution_type == "eta":
         function = resolution_eta
+        function.array = _resolution_no_div
     elif resolution_type == "position_1d":
         function = resolution_position_1D
+        function.array = _resolution_no_div
     elif resolution_type == "position_2d":
         function = resolution_position_2D
         function.label = "|{on} - {off}|"
@@ -44,6 +52,23 @@ def resolution_phi(online, offline):
     return delta_phi_ret
 
 
+def resolution_energy_array(online, offline):
+    online = np.asarray(online, dtype=float)
+    offline = np.asarray(offline, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(offline != 0, (online - offline) / offline, np.nan)
+
+
+def resolution_phi_array(online, offline):
+    """
+    Same as resolution_phi for numpy arrays
+    """
+    delta_phi = np.asarray(online, dtype=float) - np.asarray(offline, dtype=float)
+    delta_phi = np.where(delta_phi > pi, delta_phi - twopi, delta_phi)
+    delta_phi_other = delta_phi % twopi
+    return np.where(delta_phi_other > pi, delta_phi, delta_phi_other)
+
+
 def resolution_eta(online, offline):
     return _resolution_no_div(online, offline)
 
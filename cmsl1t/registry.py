@@ -0,0 +1,33 @@
+'''
+    Analyzers and producers that come with cmsl1t.
+
+    A ConfigParser in static mode accepts these without looking for them, and
+    looks for any other module with cmsl1t.utils.module.find, so that configs
+    can be checked (e.g. when submitting batch jobs) without importing the
+    analyzers, ROOT or the data formats library.
+'''
+
+ANALYZERS = [
+    'cmsl1t.analyzers.HW_Emu_jetMet_rates',
+    'cmsl1t.analyzers.HW_Emu_jetMet_rates_columnar',
+    'cmsl1t.analyzers.demo_analyzer',
+    'cmsl1t.analyzers.inspector',
+    'cmsl1t.analyzers.jetMet_analyzer',
+    'cmsl1t.analyzers.jetMet_analyzer_columnar',
+    'cmsl1t.analyzers.legacy_analyzer',
+    'cmsl1t.analyzers.study_tower28_met',
+    'cmsl1t.analyzers.weekly_analyzer',
+]
+
+PRODUCERS = [
+    'cmsl1t.producers.gensums',
+    'cmsl1t.producers.jets',
+    'cmsl1t.producers.l1sums',
+    'cmsl1t.producers.met',
+]
+
+# Trees of load_trees that an analyzer cannot read (yet); configs that load them
+# for the analyzer are rejected
+UNSUPPORTED_TREES = {
+    'cmsl1t.analyzers.jetMet_analyzer_columnar': ['genTree'],
+}
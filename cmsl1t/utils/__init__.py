@@ -1,11 +1,11 @@
 import os
 import logging
-from rootpy import ROOT, ROOTError
 
 logger = logging.getLogger(__name__)
 
 
 def load_ROOT_library(library, lib_path='build'):
+    from rootpy import ROOT, ROOTError
     PROJECT_ROOT = os.environ.get('PROJECT_ROOT', os.getcwd())
     if library in ROOT.gSystem.GetLibraries():
         # already loaded
@@ -0,0 +1,297 @@
+"""
+Fits many efficiency curves, in parallel and with a cache on disk.
+
+Results are cached by a hash of the efficiency (passed and total histograms)
+and of the fit configuration, so redrawing or reloading the same histograms
+does not fit them again.  Each result is a small JSON file, so that several
+processes can share the same cache directory.  Results that were not used for
+longest are removed once there are more than max_entries of them.
+
+The asymmetric fit of a curve can be seeded from the result of a neighbouring
+threshold.  The seed is always the fit of the neighbour without a seed of its
+own, and the key of that fit is part of the cache key, so a result does not
+depend on what happened to be in the cache.  The fits therefore run in two
+rounds, each with all its fits in parallel: first the curves without a
+neighbour and the seeds, then the curves seeded from them.
+
+Two fitting backends are available:
+ - root: cmsl1t.utils.fit_efficiency, one ROOT fit per curve, run in a
+         process pool
+ - numpy: cmsl1t.utils.fit_efficiency_numpy, fits all curves at once
+"""
+from collections import OrderedDict
+import json
+import multiprocessing
+import os
+import tempfile
+import traceback
+from cmsl1t.plotting.cache import content_hash
+from cmsl1t.plotting.render import _create_pool
+from cmsl1t.utils.fit_efficiency import fit_efficiency, summarize_fit, \
+    restore_fit, get_symmetric_formula, get_asymmetric_formula
+import logging
+logger = logging.getLogger(__name__)
+
+# The requests of the current fit_efficiencies() call, inherited by the workers
+_REQUESTS = []
+BACKENDS = ('root', 'numpy')
+
+
+class FitRequest(object):
+    """
+    Arguments of one call to fit_efficiency.
+    neighbour -- another FitRequest (e.g. the previous threshold) whose
+                 result is used to seed the asymmetric fit
+    backend -- one of BACKENDS
+    """
+
+    def __init__(self, efficiency, in_mean, in_sigma=10, asymmetric=True,
+                 name="fit_efficiency", neighbour=None, backend='root'):
+        if backend not in BACKENDS:
+            raise ValueError("Unknown fit backend '{0}', use one of {1}".format(
+                backend, BACKENDS))
+        self.efficiency = efficiency
+        self.in_mean = in_mean
+        self.in_sigma = in_sigma
+        self.asymmetric = asymmetric
+        self.name = name
+        self.neighbour = neighbour
+        self.backend = backend
+        self._key = None
+        self._base_key = None
+
+    def _hash(self, seed):
+        formulas = [get_symmetric_formula()]
+        if self.asymmetric:
+            formulas.append(get_asymmetric_formula())
+        return content_hash(self.efficiency, self.in_mean, self.in_sigma,
+                            formulas, self.backend, seed)
+
+    @property
+    def base_key(self):
+        """ Key of the fit without a seed, which seeds the next threshold """
+        if self._base_key is None:
+            self._base_key = self._hash(None)
+        return self._base_key
+
+    @property
+    def key(self):
+        if self._key is None:
+            if self.neighbour is None:
+                self._key = self.base_key
+            else:
+                self._key = self._hash(self.neighbour.base_key)
+        return self._key
+
+    def fit(self, in_lambda_sigma=0.03):
+        params = fit_efficiency(self.efficiency, self.in_mean, self.in_sigma,
+                                self.asymmetric, self.name, in_lambda_sigma)
+        return summarize_fit(params)
+
+
+class FitCache(object):
+    """
+    Directory of fit results, one JSON file per key
+    max_entries -- number of results to keep, None for no limit
+    """
+
+    def __init__(self, directory, max_entries=10000):
+        self.directory = directory
+        self.max_entries = max_entries
+
+    def _filename(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key):
+        filename = self._filename(key)
+        if not os.path.exists(filename):
+            return None
+        try:
+            with open(filename) as cached:
+                summary = json.load(cached)
+        except (IOError, ValueError):
+            return None
+        try:
+            # marks the result as recently used
+            os.utime(filename, None)
+        except OSError:
+            pass
+        return summary
+
+    def put(self, key, summary):
+        if not os.path.exists(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                # Made by another process in the meantime
+                pass
+        # Write then rename, so other processes never see half a file
+        handle, tmp_name = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(handle, 'w') as output:
+            json.dump(summary, output)
+        os.rename(tmp_name, self._filename(key))
+
+    def evict(self, max_entries=None):
+        """
+        Remove the least recently used results until at most max_entries (by
+        default the limit of the cache) are left
+
+        returns: the number of results removed
+        """
+        if max_entries is None:
+            max_entries = self.max_entries
+        if max_entries is None or not os.path.isdir(self.directory):
+            return 0
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            filename = os.path.join(self.directory, name)
+            try:
+                entries.append((os.path.getmtime(filename), filename))
+            except OSError:
+                # Removed by another process in the meantime
+                continue
+        removed = 0
+        for _, filename in sorted(entries)[:max(len(entries) - max_entries, 0)]:
+            try:
+                os.remove(filename)
+                removed += 1
+            except OSError:
+                pass
+        if removed:
+            logger.info("Removed {0} cached fits from {1}".format(
+                removed, self.directory))
+        return removed
+
+
+def _seed(request, known):
+    neighbour = request.neighbour
+    if neighbour is None or not known.get(neighbour.base_key):
+        return {}
+    parameters = known[neighbour.base_key]["parameters"]
+    if len(parameters) < 2:
+        return {}
+    return dict(in_lambda_sigma=parameters[1][2])
+
+
+def _fit(todo, pool=None):
+    """ Fit (request, seed) pairs, returns the summaries in the same order """
+    root = [i for i, (r, _) in enumerate(todo) if r.backend != 'numpy']
+    numpy = [i for i, (r, _) in enumerate(todo) if r.backend == 'numpy']
+    root_todo = [todo[i] for i in root]
+    if pool is not None and len(root_todo) > 1:
+        summaries = _fit_parallel(root_todo, pool)
+    else:
+        summaries = [request.fit(**seed) for request, seed in root_todo]
+    summaries += _fit_numpy([todo[i] for i in numpy])
+    ordered = [None] * len(todo)
+    for i, summary in zip(root + numpy, summaries):
+        ordered[i] = summary
+    return ordered
+
+
+def _fit_numpy(requests):
+    """ Fit all (request, seed) pairs at once with the numpy backend """
+    from cmsl1t.utils import fit_efficiency_numpy as fit_numpy
+    summaries = []
+    # Curves can only be fitted together if they use the same model
+    for asymmetric in [True, False]:
+        group = [(i, request, seed) for i, (request, seed) in enumerate(requests)
+                 if request.asymmetric == asymmetric]
+        if not group:
+            continue
+        results = fit_numpy.summarize_fits(
+            [r.efficiency for _, r, _ in group],
+            [r.in_mean for _, r, _ in group],
+            [r.in_sigma for _, r, _ in group], asymmetric,
+            [seed.get('in_lambda_sigma', 0.03) for _, _, seed in group])
+        summaries += [(i, summary) for (i, _, _), summary in zip(group, results)]
+    return [summary for _, summary in sorted(summaries, key=lambda s: s[0])]
+
+
+def _run_fit(task):
+    index, seed = task
+    request = _REQUESTS[index]
+    try:
+        return index, request.fit(**seed), None
+    except Exception:
+        return index, None, traceback.format_exc()
+
+
+def _fit_parallel(todo, pool):
+    """ Fit (request, seed) pairs of _REQUESTS with the pool """
+    indices = dict((id(request), i) for i, request in enumerate(_REQUESTS))
+    tasks = [(indices[id(request)], seed) for request, seed in todo]
+    results = pool.map(_run_fit, tasks, chunksize=1)
+    summaries = []
+    for index, summary, error in results:
+        if error:
+            raise RuntimeError("Fit {0} failed:\n{1}".format(
+                _REQUESTS[index].name, error))
+        summaries.append(summary)
+    return summaries
+
+
+def fit_efficiencies(requests, n_workers=1, cache=None):
+    """
+    Run fit_efficiency for all FitRequests, skipping those in the cache.
+
+    returns:
+      the outputs of fit_efficiency, in the same order as the requests
+    """
+    known = {}
+
+    def is_known(key):
+        if key not in known and cache is not None:
+            summary = cache.get(key)
+            if summary is not None:
+                known[key] = summary
+        return key in known
+
+    # Fits without a seed (by key), then fits seeded from those
+    seeds = OrderedDict()
+    seeded = OrderedDict()
+    for request in requests:
+        if is_known(request.key):
+            continue
+        neighbour = request.neighbour
+        if neighbour is None:
+            seeds[request.key] = request
+            continue
+        seeded[request.key] = request
+        if not is_known(neighbour.base_key):
+            seeds[neighbour.base_key] = neighbour
+    n_fits = len(seeds) + len(seeded)
+    if requests:
+        n_cached = len([r for r in requests if r.key in known])
+        logger.info("Fitting {0} efficiencies, {1} from cache".format(
+            n_fits, n_cached))
+
+    global _REQUESTS
+    _REQUESTS = list(seeds.values()) + list(seeded.values())
+    n_root = len([r for r in _REQUESTS if r.backend != 'numpy'])
+    # Workers of a Pool cannot have a pool of their own
+    in_worker = multiprocessing.current_process().daemon
+    pool = None
+    if n_workers > 1 and n_root > 1 and not in_worker:
+        # One pool for both rounds, forked once all requests are known
+        pool = _create_pool(min(n_workers, n_root))
+    try:
+        for group, seeding in [(seeds, False), (seeded, True)]:
+            todo = [(request, _seed(request, known) if seeding else {})
+                    for request in group.values()]
+            for key, summary in zip(group, _fit(todo, pool)):
+                known[key] = summary
+                if cache is not None:
+                    cache.put(key, summary)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        _REQUESTS = []
+    if cache is not None:
+        cache.evict()
+
+    return [restore_fit(known[request.key], request.efficiency, request.name)
+            for request in requests]
@@ -1,15 +1,19 @@
 from collections import OrderedDict
 import math
+import numpy as np
 from rootpy.plotting.func import F1
 from rootpy.plotting.hist import _HistBase, Efficiency
 from rootpy.plotting.graph import _GraphBase
 from rootpy.ROOT import Fit, Math
 from rootpy import asrootpy
+from cmsl1t.utils.hist import bin_contents, bin_sumw2
 import array
 
+PARAMETER_NAMES = ("mu", "sigma_inv", "lambda_sigma")
+
 
 def fit_efficiency(efficiency, in_mean, in_sigma=10,
-                   asymmetric=True, name="fit_efficiency"):
+                   asymmetric=True, name="fit_efficiency", in_lambda_sigma=0.03):
     """
     Fit a efficiency curve
 
@@ -19,6 +23,8 @@ def fit_efficiency(efficiency, in_mean, in_sigma=10,
     - asymmetric -- use the full asymmetric fit, the cumulative dist of an
                     Exponentially Modified Gaussian (EMG), as opposed to a pure
                     Gaussian
+    - in_lambda_sigma -- starting value of lambda * sigma for the asymmetric
+                         fit, e.g. the result for a neighbouring threshold
     returns: the parameters describing the fit
     """
     efficiency = asrootpy(efficiency)
@@ -44,17 +50,17 @@ def fit_efficiency(efficiency, in_mean, in_sigma=10,
             mu = in_mean
             sigma_inv = 1. / in_sigma
             fitFcn.SetParameters(mu, sigma_inv)
-            fitFcn.SetParNames("mu", "sigma_inv")
+            fitFcn.SetParNames(*PARAMETER_NAMES[:2])
         elif i == 1:
             mu = fits[0].GetParameter(0)
             sigma_inv = fits[0].GetParameter(1)
-            lamda = 0.03  # should be within 0.04 and 0.06 it seems
+            lamda = in_lambda_sigma  # should be within 0.04 and 0.06 it seems
 
             p0 = mu
             p1 = sigma_inv
             p2 = lamda
             fitFcn.SetParameters(p0, p1, p2)
-            fitFcn.SetParNames("mu", "sigma_inv", "lambda_sigma")
+            fitFcn.SetParNames(*PARAMETER_NAMES)
 
         success = do_fit(efficiency, fitFcn)
 
@@ -99,12 +105,11 @@ def prepare_data_hist(efficiency):
     # Prepare the fit options
     opt = Fit.DataOptions()
 
-    # Do we have y error bars?
-    have_errors = False
-    for a_bin in efficiency:
-        if a_bin.error != 0:
-            have_errors = True
-            break
+    # Do we have y error bars? (without sumw2 the errors are sqrt(content))
+    sumw2 = bin_sumw2(efficiency)
+    if sumw2 is None:
+        sumw2 = bin_contents(efficiency)
+    have_errors = bool(np.any(sumw2 != 0))
 
     # If we have errors, ignore empty bins
     if have_errors:
@@ -144,6 +149,39 @@ def prepare_data_graph(efficiency):
     return opt, data
 
 
+def summarize_fit(params):
+    """
+    Plain python version of the output of fit_efficiency, e.g. to cache it
+    """
+    fits = [params["symmetric"]]
+    if "asymmetric" in params:
+        fits.append(params["asymmetric"])
+    return dict(
+        success=bool(params["success"]),
+        parameters=[[fit.GetParameter(i) for i in range(fit.GetNpar())]
+                    for fit in fits],
+        errors=[[fit.GetParError(i) for i in range(fit.GetNpar())]
+                for fit in fits],
+    )
+
+
+def restore_fit(summary, efficiency, name="fit_efficiency"):
+    """
+    Rebuild the output of fit_efficiency from the output of summarize_fit
+    """
+    formulas = [get_symmetric_formula(), get_asymmetric_formula()]
+    fits = []
+    for i, (formula, parameters, errors) in enumerate(
+            zip(formulas, summary["parameters"], summary["errors"])):
+        fitFcn = F1(formula, name="fit_{}_{}".format(name, i))
+        fitFcn.SetParNames(*PARAMETER_NAMES[:len(parameters)])
+        for j, (par, err) in enumerate(zip(parameters, errors)):
+            fitFcn.SetParameter(j, par)
+            fitFcn.SetParError(j, err)
+        fits.append(fitFcn)
+    return _create_output_dict(summary["success"], fits, asrootpy(efficiency))
+
+
 def _create_output_dict(success, fits, input_data):
     last_fit = fits[-1]
     out_params = dict(success=success, symmetric=fits[0])
@@ -0,0 +1,225 @@
+"""
+NumPy/SciPy version of cmsl1t.utils.fit_efficiency.
+
+Fits the same turn-on models (the Gaussian CDF and the CDF of an
+exponentially modified Gaussian, see get_symmetric_formula and
+get_asymmetric_formula) directly to the passed and total counts in each bin,
+with a binomial likelihood.  Many curves are fitted at once: every step of the
+minimisation evaluates the model, its derivatives and the likelihood for all
+curves together with array operations.
+"""
+from __future__ import division
+import numpy as np
+from scipy.special import erf, erfc, erfcx
+from cmsl1t.utils.fit_efficiency import restore_fit
+from cmsl1t.utils.hist import bin_contents, bin_edges
+
+# Smallest efficiency used in the logarithms of the likelihood
+EPSILON = 1e-12
+# A fit has converged if a Newton step would improve the log-likelihood by
+# less than this
+CONVERGENCE_TOLERANCE = 1e-4
+# Maximum number of steps of the minimisation
+MAX_ITERATIONS = 200
+
+
+def symmetric_model(x, parameters):
+    """ 0.5 * (1 + erf((x - mu) * sigma_inv)), for parameters (mu, sigma_inv) """
+    mu, sigma_inv = parameters[..., 0:1], parameters[..., 1:2]
+    return 0.5 * (1 + erf((x - mu) * sigma_inv))
+
+
+def asymmetric_model(x, parameters):
+    """
+    CDF of an exponentially modified Gaussian, for parameters
+    (mu, sigma_inv, lambda_sigma).  The exponential and the erfc of the second
+    term are combined through erfcx, so that neither overflows.
+    """
+    mu, sigma_inv = parameters[..., 0:1], parameters[..., 1:2]
+    lambda_sigma = parameters[..., 2:3]
+    x_prime = sigma_inv * (x - mu)
+    term_1 = 0.5 * (1 + erf(x_prime))
+    exponent = -lambda_sigma * (x_prime - lambda_sigma * 0.5)
+    b = lambda_sigma - x_prime
+    tail_exponent = -(x_prime - lambda_sigma * 0.5) ** 2 - lambda_sigma ** 2 * 0.25
+    with np.errstate(over='ignore', invalid='ignore'):
+        term_2 = np.where(
+            b > 0,
+            0.5 * np.exp(tail_exponent) * erfcx(np.abs(b)),
+            0.5 * np.exp(np.minimum(exponent, 700)) * erfc(b))
+    return term_1 - term_2
+
+
+def _model_and_derivatives(model, x, parameters):
+    """
+    The model and its derivatives wrt each parameter (central differences),
+    with shapes (n_curves, n_bins) and (n_curves, n_parameters, n_bins)
+    """
+    value = model(x, parameters)
+    derivatives = np.empty(parameters.shape + x.shape[1:])
+    for i in range(parameters.shape[1]):
+        step = 1e-6 * np.maximum(np.abs(parameters[:, i]), 1e-2)
+        shifted = parameters.copy()
+        shifted[:, i] += step
+        up = model(x, shifted)
+        shifted[:, i] -= 2 * step
+        down = model(x, shifted)
+        derivatives[:, i] = (up - down) / (2 * step)[:, None]
+    return value, derivatives
+
+
+def _negative_log_likelihood(model, x, passed, total, parameters):
+    """
+    Binomial negative log-likelihood of each curve, its gradient, and the
+    Fisher information matrix
+    """
+    value, derivatives = _model_and_derivatives(model, x, parameters)
+    p = np.clip(value, EPSILON, 1 - EPSILON)
+    failed = total - passed
+    nll = -np.sum(passed * np.log(p) + failed * np.log(1 - p), axis=-1)
+    weight = (passed - total * p) / (p * (1 - p))
+    gradient = -np.einsum('cb,cpb->cp', weight, derivatives)
+    information = np.einsum('cb,cpb,cqb->cpq', total / (p * (1 - p)),
+                            derivatives, derivatives)
+    return nll, gradient, information
+
+
+def _minimize(model, x, passed, total, start):
+    """
+    Levenberg-Marquardt minimisation of every curve's likelihood, using the
+    Fisher information in place of the Hessian.  All curves are stepped
+    together, each with its own damping.
+    """
+    parameters = start.copy()
+    damping = np.full(len(parameters), 1e-3)
+    nll, gradient, information = _negative_log_likelihood(
+        model, x, passed, total, parameters)
+    for _ in range(MAX_ITERATIONS):
+        scale = np.diagonal(information, axis1=1, axis2=2)
+        damped = information + damping[:, None, None] * \
+            (scale[:, :, None] * np.eye(scale.shape[1]))
+        step = np.einsum('cpq,cq->cp', np.linalg.pinv(damped), gradient)
+        trial = parameters - step
+        trial_nll, trial_gradient, trial_information = \
+            _negative_log_likelihood(model, x, passed, total, trial)
+        better = np.isfinite(trial_nll) & (trial_nll <= nll)
+        parameters[better] = trial[better]
+        gradient[better] = trial_gradient[better]
+        information[better] = trial_information[better]
+        improvement = np.where(better, nll - trial_nll, 0)
+        nll[better] = trial_nll[better]
+        damping = np.where(better, damping * 0.1, damping * 10)
+        stuck = damping > 1e10
+        converged = better & (improvement < CONVERGENCE_TOLERANCE * 0.1)
+        if np.all(converged | stuck):
+            break
+
+    covariance = np.linalg.pinv(information)
+    decrement = np.einsum('cp,cpq,cq->c', gradient, covariance, gradient)
+    variances = np.diagonal(covariance, axis1=1, axis2=2)
+    valid = np.all(np.isfinite(parameters), axis=1)
+    valid &= (decrement < CONVERGENCE_TOLERANCE) & np.all(variances > 0, axis=1)
+    errors = np.sqrt(np.abs(variances))
+    return parameters, errors, valid
+
+
+def _stack(arrays):
+    """ Stack 1D arrays of different lengths, padding with zeros """
+    stacked = np.zeros((len(arrays), max(len(a) for a in arrays)))
+    for i, array in enumerate(arrays):
+        stacked[i, :len(array)] = array
+    return stacked
+
+
+def efficiency_counts(efficiency):
+    """
+    Bin centres, passed and total counts (without under- and overflow) of a
+    TEfficiency
+    """
+    total = efficiency.GetTotalHistogram()
+    edges = bin_edges(total)
+    centres = 0.5 * (edges[1:] + edges[:-1])
+    passed = bin_contents(efficiency.GetPassedHistogram())[1:-1]
+    return centres, passed.astype(float), bin_contents(total)[1:-1].astype(float)
+
+
+def fit_counts(x, passed, total, in_mean, in_sigma=10, asymmetric=True,
+               in_lambda_sigma=0.03):
+    """
+    Fit many efficiency curves at once.
+
+    params:
+    - x, passed, total -- lists of arrays: bin centres, passed and total
+                          counts of each curve
+    - in_mean, in_sigma, in_lambda_sigma -- starting values, a number or one
+                                            per curve
+    returns: one summary per curve, as from
+             cmsl1t.utils.fit_efficiency.summarize_fit
+    """
+    n_curves = len(x)
+    if n_curves == 0:
+        return []
+    x, passed, total = _stack(x), _stack(passed), _stack(total)
+    in_mean = np.broadcast_to(np.asarray(in_mean, dtype=float), (n_curves,))
+    in_sigma = np.broadcast_to(np.asarray(in_sigma, dtype=float), (n_curves,))
+
+    start = np.column_stack([in_mean, 1. / in_sigma])
+    parameters, errors, valid = _minimize(
+        symmetric_model, x, passed, total, start)
+    fits = [(parameters, errors)]
+    if asymmetric:
+        in_lambda_sigma = np.broadcast_to(
+            np.asarray(in_lambda_sigma, dtype=float), (n_curves,))
+        start = np.column_stack([parameters, in_lambda_sigma])
+        parameters, errors, valid = _minimize(
+            asymmetric_model, x, passed, total, start)
+        fits.append((parameters, errors))
+
+    return [dict(success=bool(valid[i]),
+                 parameters=[p[i].tolist() for p, _ in fits],
+                 errors=[e[i].tolist() for _, e in fits])
+            for i in range(n_curves)]
+
+
+def _start_mean(in_mean):
+    # See cmsl1t.utils.fit_efficiency.fit_efficiency
+    return 50 if isinstance(in_mean, str) else in_mean
+
+
+def summarize_fits(efficiencies, in_means, in_sigma=10, asymmetric=True,
+                   in_lambda_sigma=0.03):
+    """
+    Fit a list of TEfficiencies at once.
+
+    returns: one summary per efficiency, as from
+             cmsl1t.utils.fit_efficiency.summarize_fit
+    """
+    counts = [efficiency_counts(efficiency) for efficiency in efficiencies]
+    return fit_counts(
+        [c[0] for c in counts], [c[1] for c in counts], [c[2] for c in counts],
+        [_start_mean(mean) for mean in in_means], in_sigma, asymmetric,
+        in_lambda_sigma)
+
+
+def fit_efficiencies(efficiencies, in_means, in_sigma=10, asymmetric=True,
+                     name="fit_efficiency", in_lambda_sigma=0.03):
+    """
+    Fit a list of TEfficiencies at once.
+
+    returns: for each efficiency, the same output as
+             cmsl1t.utils.fit_efficiency.fit_efficiency
+    """
+    summaries = summarize_fits(efficiencies, in_means, in_sigma, asymmetric,
+                               in_lambda_sigma)
+    return [restore_fit(summary, efficiency, name)
+            for summary, efficiency in zip(summaries, efficiencies)]
+
+
+def fit_efficiency(efficiency, in_mean, in_sigma=10,
+                   asymmetric=True, name="fit_efficiency", in_lambda_sigma=0.03):
+    """
+    Drop-in replacement for cmsl1t.utils.fit_efficiency.fit_efficiency, for
+    TEfficiency inputs
+    """
+    return fit_efficiencies([efficiency], [in_mean], in_sigma, asymmetric,
+                            name, in_lambda_sigma)[0]
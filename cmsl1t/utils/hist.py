@@ -1,11 +1,49 @@
-from cmsl1t.math import cumulative_sum_and_error
+import numpy as np
+from cmsl1t.math import reversed_cumulative_sum_inplace
+
+# numpy types of the bin content arrays, by the last letter of the ROOT class
+_BUFFER_TYPES = dict(D=np.float64, F=np.float32, I=np.int32, S=np.int16,
+                     C=np.int8)
+
+
+def _as_array(buffer, size, dtype):
+    if hasattr(buffer, 'reshape'):
+        # cppyy (ROOT >= 6.22)
+        buffer.reshape((size,))
+    else:
+        buffer.SetSize(size)
+    return np.frombuffer(buffer, dtype=dtype, count=size)
+
+
+def bin_contents(hist):
+    '''
+        Zero-copy numpy view of the bin contents of a histogram (including the
+        under- and overflow bins).  Changing the view changes the histogram.
+    '''
+    dtype = _BUFFER_TYPES.get(hist.ClassName()[-1], np.float64)
+    return _as_array(hist.GetArray(), hist.GetSize(), dtype)
+
+
+def bin_sumw2(hist):
+    '''
+        Zero-copy numpy view of the sum of squared weights of a histogram,
+        None if the histogram does not store them (errors are then sqrt(n))
+    '''
+    if hist.GetSumw2N() == 0:
+        return None
+    return _as_array(hist.GetSumw2().GetArray(), hist.GetSize(), np.float64)
 
 
 def cumulative_hist(hist, suffix='_cumul'):
+    '''
+        Clone of hist where every bin holds the sum of itself and all bins
+        above it, computed in place on the clone's buffers
+    '''
     h = hist.clone(hist.name + suffix)
-    values, errors = cumulative_sum_and_error(hist)
-    h.set_content(values)
-    h.set_error(errors)
+    reversed_cumulative_sum_inplace(bin_contents(h))
+    sumw2 = bin_sumw2(h)
+    if sumw2 is not None:
+        reversed_cumulative_sum_inplace(sumw2)
     return h
 
 
@@ -23,3 +61,65 @@ def normalise_to_unit_area(histograms):
             yield hist / hist.integral()
         else:
             yield hist.Clone()
+
+
+def bin_edges(hist, axis='x'):
+    ''' All bin edges along an axis, including the upper edge of the last bin '''
+    axis = getattr(hist, 'Get{0}axis'.format(axis.upper()))()
+    n_bins = axis.GetNbins()
+    return np.array([axis.GetBinLowEdge(i) for i in range(1, n_bins + 2)])
+
+
+def fill_array(hist, values, weights=None):
+    '''
+        Fill a 1D histogram with all entries of a numpy array in one call
+    '''
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    if not len(values):
+        return hist
+    if weights is None:
+        weights = np.ones(len(values))
+    weights = np.ascontiguousarray(weights, dtype=np.float64)
+    hist.FillN(len(values), values, weights)
+    return hist
+
+
+def fill_array_2d(hist, x, y, weights=None):
+    '''
+        Fill a 2D histogram with all (x, y) pairs of two numpy arrays in one call
+    '''
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    if not len(x):
+        return hist
+    if weights is None:
+        weights = np.ones(len(x))
+    weights = np.ascontiguousarray(weights, dtype=np.float64)
+    hist.FillN(len(x), x, y, weights)
+    return hist
+
+
+def fill_efficiency_array(efficiency, values, passed):
+    '''
+        Equivalent to calling efficiency.Fill(passed[i], values[i]) for all i.
+        TEfficiency has no FillN, so the counts per bin are computed with numpy
+        and added to the existing numbers of passed and total events.
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return efficiency
+    passed = np.asarray(passed, dtype=bool)
+    total_hist = efficiency.GetTotalHistogram()
+    passed_hist = efficiency.GetPassedHistogram()
+    edges = bin_edges(total_hist)
+    # ROOT bin numbers: 0 is the underflow, len(edges) the overflow
+    indices = np.searchsorted(edges, values, side='right')
+    n_total = np.bincount(indices, minlength=len(edges) + 1)
+    n_passed = np.bincount(indices[passed], minlength=len(edges) + 1)
+    for i in np.flatnonzero(n_total):
+        i = int(i)
+        efficiency.SetTotalEvents(
+            i, int(total_hist.GetBinContent(i) + n_total[i]))
+        efficiency.SetPassedEvents(
+            i, int(passed_hist.GetBinContent(i) + n_passed[i]))
+    return efficiency
@@ -1,8 +1,15 @@
 from importlib import import_module
+import ast
 import os
 import logging
 import sys
 from .. import PROJECT_ROOT
+try:
+    from importlib.machinery import PathFinder
+except ImportError:
+    # Python 2
+    import imp
+    PathFinder = None
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +36,81 @@ def exists(module_name):
         return True
 
 
+def _find_spec(name, path):
+    '''
+        (file, is package) of the module `name` in `path` (sys.path if None),
+        without executing it or its parent packages; None if there is none
+    '''
+    if PathFinder is not None:
+        spec = PathFinder.find_spec(name, path)
+        if spec is None:
+            return None
+        locations = spec.submodule_search_locations
+        if spec.origin in [None, 'namespace']:
+            # namespace package, without an __init__.py
+            return os.path.join(list(locations)[0], '__init__.py'), True
+        return spec.origin, locations is not None
+    try:
+        handle, filename, description = imp.find_module(name, path)
+    except ImportError:
+        return None
+    if handle:
+        handle.close()
+    if description[2] == imp.PKG_DIRECTORY:
+        return os.path.join(filename, '__init__.py'), True
+    return filename, False
+
+
+def _top_level_names(filename):
+    ''' Names defined at the top level of a source file, None if unknown '''
+    if not filename.endswith('.py'):
+        return None
+    try:
+        with open(filename) as source:
+            tree = ast.parse(source.read(), filename)
+    except (IOError, SyntaxError):
+        return None
+    names = set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.Assign):
+            names.update(t.id for t in node.targets if isinstance(t, ast.Name))
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            if any(a.name == '*' for a in node.names):
+                return None
+            names.update((a.asname or a.name).split('.')[0]
+                         for a in node.names)
+    return names
+
+
+def find(module_name):
+    '''
+        Static version of exists: looks for the module (or member of a module)
+        in the search path without importing anything, so neither ROOT nor
+        the data formats library are loaded
+    '''
+    path = None
+    found = None
+    tokens = module_name.split('.')
+    for i, token in enumerate(tokens):
+        spec = _find_spec(token, path)
+        if spec is None:
+            if found is None or i != len(tokens) - 1:
+                return False
+            # check if it is a member of a module instead
+            names = _top_level_names(found[0])
+            if names is None:
+                return exists(module_name)
+            return token in names
+        found = spec
+        if not spec[1]:
+            path = []
+        else:
+            path = [os.path.dirname(spec[0])]
+    return True
+
+
 def load_L1TNTupleLibrary(lib_name='L1TAnalysisDataformats.so'):
     import ROOT
     external_includes = os.path.join(PROJECT_ROOT, 'external')
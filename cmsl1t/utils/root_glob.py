@@ -1,21 +1,44 @@
 """
 Reproduce the standard glob package behaviour but use TSystem to be able to
 query remote file systems such as xrootd
+
+Remote directories at the same level of a pattern, and several patterns (see
+glob_many), can be listed in parallel, as each listing mostly waits for the
+server.  PyROOT keeps the GIL during every TSystem call, so the directories
+are listed (and remote files looked up) in forked worker processes; threads
+only go through the patterns and hand the listings to the workers.  Listings
+of remote directories can be kept in a ListingCache on disk for a limited time,
+so that starting the same job again does not list them again.
 """
 from __future__ import print_function
-from rootpy.ROOT import gSystem
 import glob as gl
+import hashlib
+import json
 import os.path
+import tempfile
+import time
 import fnmatch
+import logging
+logger = logging.getLogger(__name__)
+
+
+__all__ = ["glob", "iglob", "glob_many", "ListingCache"]
+
+# Imported with ROOT on first use, see _system
+gSystem = None
 
 
-__all__ = ["glob", "iglob"]
+def _system():
+    global gSystem
+    if gSystem is None:
+        from rootpy.ROOT import gSystem
+    return gSystem
 
 
 def __directory_iter(directory):
     while True:
         try:
-            file = gSystem.GetDirEntry(directory)
+            file = _system().GetDirEntry(directory)
             if not file:
                 break
             yield file
@@ -23,57 +46,186 @@ def __directory_iter(directory):
             break
 
 
-def glob(pathname):
+def enable_thread_safety():
+    '''
+        Makes ROOT safe to use from several threads, which has to be done
+        before they start.  Returns False if this ROOT cannot do it.
+    '''
+    try:
+        import ROOT
+        ROOT.EnableThreadSafety()
+    except (ImportError, AttributeError) as e:
+        logger.warn("ROOT cannot be used from threads ({0})".format(e))
+        return False
+    return True
+
+
+def is_remote(pathname):
+    return '://' in pathname and not pathname.startswith('file://')
+
+
+class ListingCache(object):
+    '''
+        Listings of remote directories, one JSON file per directory, that are
+        used for ttl seconds
+    '''
+
+    def __init__(self, directory, ttl=600):
+        self.directory = os.path.expanduser(directory)
+        self.ttl = ttl
+
+    def _filename(self, dirname):
+        key = hashlib.sha1(dirname.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, dirname):
+        filename = self._filename(dirname)
+        if not os.path.exists(filename):
+            return None
+        try:
+            with open(filename) as cached:
+                listing = json.load(cached)
+        except ValueError:
+            return None
+        if time.time() - listing['time'] > self.ttl:
+            return None
+        return listing['entries']
+
+    def put(self, dirname, entries):
+        if not os.path.exists(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                # Made by another process in the meantime
+                pass
+        # Write then rename, so other processes never see half a file
+        handle, tmp_name = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(handle, 'w') as output:
+            json.dump(dict(time=time.time(), dirname=dirname,
+                           entries=entries), output)
+        os.rename(tmp_name, self._filename(dirname))
+
+
+def _list_directory(dirname):
+    '''
+        The entries of a directory, None if it cannot be opened
+    '''
+    # Uses `TSystem` to open the directory.
+    # TSystem itself wraps up the calls needed to query xrootd.
+    directory = _system().OpenDirectory(dirname)
+    if not directory:
+        return None
+    entries = [f for f in __directory_iter(directory) if f not in [".", ".."]]
+    try:
+        _system().FreeDirectory(directory)
+    except TypeError:
+        pass
+    return entries
+
+
+def list_directory(dirname, cache=None):
+    dirname = _system().ExpandPathName(dirname)
+    use_cache = cache is not None and is_remote(dirname)
+    entries = cache.get(dirname) if use_cache else None
+    if entries is None:
+        entries = _list_directory(dirname)
+        if use_cache and entries is not None:
+            cache.put(dirname, entries)
+    return dirname, entries or []
+
+
+def _list_in_worker(args):
+    dirname, cache = args
+    return list_directory(dirname, cache)
+
+
+def _exists_in_worker(args):
+    pathname, cache = args
+    return root_exists(pathname, cache)
+
+
+def glob(pathname, cache=None, pool=None):
+    '''
+        cache -- a ListingCache for remote directories
+        pool -- a process pool to list the directories of a level in
+    '''
     # Let normal python glob try first
     try_glob = gl.glob(pathname)
     if try_glob:
         return try_glob
 
     # If pathname does not contain a wildcard:
-    if not gl.has_magic(pathname) and root_exists(pathname):
-        return [pathname]
+    if not gl.has_magic(pathname):
+        if pool is not None:
+            exists = pool.apply(_exists_in_worker, ((pathname, cache), ))
+        else:
+            exists = root_exists(pathname, cache)
+        if exists:
+            return [pathname]
 
     # Else use ROOT's remote system querying
-    return root_glob(pathname)
+    return root_glob(pathname, cache, pool)
 
 
-def root_exists(pathname):
+def root_exists(pathname, cache=None):
+    if cache is not None and is_remote(pathname):
+        dirname, basename = os.path.split(pathname)
+        entries = cache.get(_system().ExpandPathName(dirname))
+        if entries is not None and basename in entries:
+            return True
     # For some reason this method returns the opposite of what you'd expect
     # Also, dodgy function naming...
-    return not gSystem.AccessPathName(pathname)
+    return not _system().AccessPathName(pathname)
 
 
-def root_glob(pathname):
+def root_glob(pathname, cache=None, pool=None):
     # Split the pathname into a directory and basename
     # (which should include the wild-card)
     dirs, basename = os.path.split(pathname)
 
     if gl.has_magic(dirs):
-        dirs = root_glob(dirs)
+        dirs = root_glob(dirs, cache, pool)
     else:
         dirs = [dirs]
 
+    if pool is not None:
+        listings = pool.map(_list_in_worker, [(d, cache) for d in dirs],
+                            chunksize=1)
+    else:
+        listings = [list_directory(d, cache) for d in dirs]
+
     files = []
-    for dirname in dirs:
-        # Uses `TSystem` to open the directory.
-        # TSystem itself wraps up the calls needed to query xrootd.
-        dirname = gSystem.ExpandPathName(dirname)
-        directory = gSystem.OpenDirectory(dirname)
-
-        if directory:
-            for file in __directory_iter(directory):
-                if file in [".", ".."]:
-                    continue
-                if not fnmatch.fnmatchcase(file, basename):
-                    continue
-                files.append(os.path.join(dirname, file))
-            try:
-                gSystem.FreeDirectory(directory)
-            except TypeError:
-                pass
+    for dirname, entries in listings:
+        files.extend(os.path.join(dirname, f) for f in entries
+                     if fnmatch.fnmatchcase(f, basename))
     return files
 
 
+def glob_many(pathnames, workers=1, cache=None):
+    '''
+        All files matching any of the patterns, in the order of the patterns.
+        With remote patterns, up to `workers` patterns are gone through at a
+        time, and their directories are listed by `workers` processes.
+    '''
+    if workers < 2 or not any(is_remote(p) for p in pathnames):
+        return [f for p in pathnames for f in glob(p, cache)]
+    from multiprocessing.pool import ThreadPool
+    from cmsl1t.plotting.render import _create_pool
+    # Forked before the threads are started
+    directories = _create_pool(workers)
+    patterns = ThreadPool(workers)
+    try:
+        start = time.time()
+        found = patterns.map(lambda p: glob(p, cache, directories), pathnames)
+        logger.debug("Listed {0} patterns in {1:.1f} s".format(
+            len(pathnames), time.time() - start))
+    finally:
+        patterns.close()
+        directories.terminate()
+        directories.join()
+    return [f for files in found for f in files]
+
+
 def iglob(pathname):
     for name in glob(pathname):
         yield name
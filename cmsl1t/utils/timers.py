@@ -1,6 +1,8 @@
 from __future__ import print_function
+import json
 import time
 import functools
+from collections import OrderedDict
 
 
 def __timerfunc(func, printer=None):
@@ -35,3 +37,99 @@ def timerfunc_log_to(printer):
     """
     function_timer = functools.partial(__timerfunc, printer=printer)
     return function_timer
+
+
+perf_counter = getattr(time, 'perf_counter', time.time)
+
+
+class StageTimers(object):
+    """
+    Sampled timers of the stages of the event loop (reading, each producer,
+    each analyzer).  Only one event in sample_every is timed, so the timers
+    can stay on in production runs: for the other events, the only cost is
+    the call to sampled().
+    """
+
+    def __init__(self, sample_every=100):
+        self.sample_every = max(int(sample_every), 1)
+        # stage: [sampled seconds, sampled events, estimated total seconds]
+        self.stages = OrderedDict()
+        self._start = perf_counter()
+
+    def sampled(self, entry):
+        return entry % self.sample_every == 0
+
+    def add(self, stage, seconds, n_events=1, sampled=True):
+        """
+        Add the runtime of a stage for n_events events.  Set sampled to False
+        for stages that are timed every time (e.g. once per batch of events).
+        """
+        stats = self.stages.setdefault(stage, [0., 0, 0.])
+        stats[0] += seconds
+        stats[1] += n_events
+        stats[2] += seconds * (self.sample_every if sampled else 1)
+
+    def call(self, stage, func, *args):
+        """ Call func(*args) and add its runtime to the stage """
+        start = perf_counter()
+        value = func(*args)
+        self.add(stage, perf_counter() - start)
+        return value
+
+    def profile(self):
+        """
+        The time spent in each stage, extrapolated from the sampled events
+        """
+        estimated = sum(stats[2] for stats in self.stages.values())
+        stages = OrderedDict()
+        for stage, (seconds, events, total) in self.stages.items():
+            stages[stage] = dict(
+                sampled_seconds=seconds, sampled_events=events,
+                seconds_per_event=seconds / events if events else 0.,
+                estimated_seconds=total,
+                fraction=total / estimated if estimated else 0.)
+        return dict(sample_every=self.sample_every,
+                    wall_seconds=perf_counter() - self._start, stages=stages)
+
+    def summary(self):
+        """ The profile as a table """
+        profile = self.profile()
+        lines = ["{0:<40} {1:>12} {2:>14} {3:>8}".format(
+            "stage", "ms / event", "estimated [s]", "share")]
+        for stage, info in profile['stages'].items():
+            lines.append("{0:<40} {1:>12.4f} {2:>14.1f} {3:>8.1%}".format(
+                stage, info['seconds_per_event'] * 1e3,
+                info['estimated_seconds'], info['fraction']))
+        lines.append("(one event in {0} timed, {1:.1f} s in total)".format(
+            profile['sample_every'], profile['wall_seconds']))
+        return '\n'.join(lines)
+
+    def write_json(self, filename):
+        with open(filename, 'w') as output:
+            json.dump(self.profile(), output, indent=1)
+
+
+def timed_events(reader, timers):
+    """
+    (entry, event) of an EventReader, as enumerate(reader, reader.first_event)
+    but timing how long each event takes to be fetched.  Sampled events add
+    to 'read'.  Events whose fetch opened a file add to 'open files' instead,
+    for every file and without counting as events, so that neither the first
+    file nor the files opened at unsampled entries skew the time per event.
+    """
+    events = iter(reader)
+    entry = reader.first_event
+    while True:
+        opened = reader.files_opened
+        start = perf_counter()
+        try:
+            event = next(events)
+        except StopIteration:
+            return
+        seconds = perf_counter() - start
+        if reader.files_opened != opened:
+            timers.add('open files', seconds, n_events=0, sampled=False)
+        elif timers.sampled(entry):
+            timers.add('read', seconds)
+        yield entry, event
+        entry += 1
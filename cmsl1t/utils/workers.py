@@ -0,0 +1,107 @@
+'''
+    Runs calls in forked worker processes, one process per call.
+
+    A multiprocessing.Pool replaces a worker that dies (e.g. ROOT crashing on
+    a corrupt file) but never finishes the task it was running, so whoever
+    waits for that task waits forever.  Here every call gets its own process
+    and a pipe for its result: if the process exits without sending one, the
+    call is reported as failed.
+'''
+from collections import deque
+import multiprocessing
+import time
+import traceback
+import logging
+logger = logging.getLogger(__name__)
+
+
+def _context():
+    if hasattr(multiprocessing, 'get_context'):
+        return multiprocessing.get_context('fork')
+    return multiprocessing
+
+
+def _call(sender, function, args):
+    try:
+        result = function(*args), None
+    except Exception:
+        result = None, traceback.format_exc()
+    try:
+        sender.send(result)
+    except Exception:
+        sender.send((None, traceback.format_exc()))
+    sender.close()
+
+
+class Workers(object):
+    '''
+        At most n_workers calls at a time, each in a new forked process.
+        Functions and arguments are inherited by the fork, only the results
+        are pickled.
+    '''
+
+    def __init__(self, n_workers, poll_seconds=0.05):
+        self.n_workers = max(1, n_workers)
+        self.poll_seconds = poll_seconds
+        self._waiting = deque()
+        self._running = []
+
+    def __len__(self):
+        ''' Number of calls that have not finished yet '''
+        return len(self._waiting) + len(self._running)
+
+    def submit(self, key, function, *args):
+        ''' Calls function(*args); its result is returned with key '''
+        self._waiting.append((key, function, args))
+        self._start()
+
+    def _start(self):
+        context = _context()
+        while self._waiting and len(self._running) < self.n_workers:
+            key, function, args = self._waiting.popleft()
+            receiver, sender = context.Pipe(False)
+            process = context.Process(target=_call,
+                                      args=(sender, function, args))
+            process.daemon = True
+            process.start()
+            # Only the worker may keep the pipe open, so that it is closed
+            # when the worker exits
+            sender.close()
+            self._running.append((key, process, receiver))
+
+    def _result(self, process, receiver):
+        try:
+            return receiver.recv()
+        except EOFError:
+            process.join()
+            return None, "Worker process exited with code {0}".format(
+                process.exitcode)
+
+    def next_finished(self):
+        '''
+            Waits for the next call to finish
+
+            returns: (key, result, error), where error is the traceback of
+            the call, or why its process stopped, and None if it succeeded
+        '''
+        while self._running:
+            for task in self._running:
+                key, process, receiver = task
+                if not receiver.poll():
+                    continue
+                result, error = self._result(process, receiver)
+                receiver.close()
+                process.join()
+                self._running.remove(task)
+                self._start()
+                return key, result, error
+            time.sleep(self.poll_seconds)
+        raise ValueError("No calls are running")
+
+    def terminate(self):
+        self._waiting.clear()
+        for _, process, receiver in self._running:
+            process.terminate()
+            process.join()
+            receiver.close()
+        self._running = []
@@ -0,0 +1,24 @@
+import tempfile
+from cmsl1t.analyzers.BaseAnalyzer import BaseAnalyzer
+
+
+class FakePlotter(object):
+    fit_backend = "root"
+
+    def set_plot_output_cfg(self, outdir, fmt):
+        self.output_dir = outdir
+
+
+def test_plotter_settings():
+    output_folder = tempfile.mkdtemp()
+    analyzer = BaseAnalyzer(name='test', output_folder=output_folder,
+                            plots_folder=output_folder, file_format='png',
+                            fit_backend='numpy', fit_workers=4, do_fit=True)
+    assert analyzer.plotter_settings == dict(fit_backend='numpy',
+                                             fit_workers=4)
+    plotter = FakePlotter()
+    analyzer.register_plotter(plotter)
+    assert plotter.fit_backend == 'numpy'
+    # only settings the plotter has are handed to it
+    assert not hasattr(plotter, 'fit_workers')
+    assert FakePlotter.fit_backend == 'root'
@@ -1,5 +1,12 @@
+import os
 import unittest
+from contextlib import contextmanager
+from cmsl1t.batch import condor
 from cmsl1t.batch.condor import _parse_condor_submit_output
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
 
 NJOBS = 558
 CLUSTER_ID = 695608
@@ -15,3 +22,58 @@ class TestLSFBatch(unittest.TestCase):
         for i in range(NJOBS):
             job_id = str(CLUSTER_ID) + '.' + str(i)
             self.assertEqual(job_ids[i], job_id)
+
+
+class FakeResult(object):
+
+    def __init__(self, cluster):
+        self._cluster = cluster
+
+    def cluster(self):
+        return self._cluster
+
+
+class FakeSubmit(dict):
+    ''' Stands in for htcondor.Submit, queueing into a FakeSchedd '''
+
+    def queue_with_itemdata(self, txn, count, itemdata):
+        txn.clusters.append((dict(self), list(itemdata)))
+        return FakeResult(len(txn.clusters))
+
+
+class FakeHTCondor(object):
+    Submit = FakeSubmit
+
+
+class FakeSchedd(object):
+
+    def __init__(self):
+        self.clusters = []
+
+    @contextmanager
+    def transaction(self):
+        yield self
+
+
+class TestCondorBatch(unittest.TestCase):
+
+    def test_submit_single_cluster(self):
+        job_items = [dict(local_id='{0:04d}'.format(i),
+                          output_folder='/batch/job_{0:04d}'.format(i),
+                          entries='0:-1', files='a_{0}.root b_{0}.root'.format(i))
+                     for i in range(5000)]
+        schedd = FakeSchedd()
+        with patch.object(condor, 'htcondor', FakeHTCondor), \
+                patch.dict(os.environ, {'HOME': '/home/user'}):
+            results = condor.submit(job_items, '/batch/_configs/cfg.yaml',
+                                    '/batch', '/batch/logs', '/batch/run.sh',
+                                    schedd=schedd)
+        self.assertEqual(len(schedd.clusters), 1)
+        job_cfg, itemdata = schedd.clusters[0]
+        self.assertEqual(len(itemdata), 5000)
+        self.assertEqual(itemdata[3]['files'], 'a_3.root b_3.root')
+        self.assertIn('--input-files', job_cfg['arguments'])
+        self.assertIn('$(output_folder)', job_cfg['arguments'])
+        self.assertEqual(results[3]['batch_id'], '1.3')
+        self.assertEqual(results[3]['stdout_log'], '/batch/logs/job_0003.out')
+        self.assertEqual(results[3]['config_file'], '/batch/_configs/cfg.yaml')
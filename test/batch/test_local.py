@@ -0,0 +1,98 @@
+import imp
+import os
+import stat
+import time
+import pytest
+from cmsl1t.batch import local
+from cmsl1t.batch.common import Status, create_info_file, read_info_file
+
+RESUBMIT = os.path.join(os.path.dirname(__file__), '..', '..', 'bin',
+                        'cmsl1t_batch_resubmit')
+
+RUN_SCRIPT = '''#!/usr/bin/env bash
+echo "$@"
+if [ "$5" == "1:2" ]; then
+  exit 1
+fi
+'''
+
+
+@pytest.fixture
+def batch_dir(tmpdir):
+    run_script = tmpdir.join('run.sh')
+    run_script.write(RUN_SCRIPT)
+    os.chmod(str(run_script), os.stat(str(run_script)).st_mode | stat.S_IEXEC)
+    tmpdir.mkdir('logs')
+    return tmpdir
+
+
+def _items(n):
+    return [dict(local_id=str(i), output_folder='/out/job_{0}'.format(i),
+                 entries='{0}:{1}'.format(i, i + 1), files='a.root b.root')
+            for i in range(n)]
+
+
+def _submit(batch_dir, items, **kwargs):
+    return local.submit(items, str(batch_dir.join('cfg.yaml')), str(batch_dir),
+                        str(batch_dir.join('logs')),
+                        str(batch_dir.join('run.sh')), **kwargs)
+
+
+def test_run_jobs(batch_dir):
+    results = _submit(batch_dir, _items(3), workers=2, wait=True)
+    statuses = [local.get_status(r['batch_id']) for r in results]
+    assert statuses == [Status.FINISHED, Status.FAILED, Status.FINISHED]
+    with open(results[0]['stdout_log']) as output:
+        assert output.read().split() == [
+            str(batch_dir.join('cfg.yaml')), '--output-folder', '/out/job_0',
+            '--entries', '0:1', '--input-files', 'a.root', 'b.root']
+
+    # the failed job succeeds when run again with other entries
+    item = dict(_items(2)[1], entries='1:3')
+    result, = local.resubmit([item], str(batch_dir.join('cfg.yaml')),
+                             str(batch_dir), str(batch_dir.join('logs')),
+                             str(batch_dir.join('run.sh')), wait=True)
+    assert result['batch_id'] == results[1]['batch_id']
+    assert local.get_status(result['batch_id']) == Status.FINISHED
+
+
+def test_background(batch_dir):
+    results = _submit(batch_dir, _items(4), workers=2)
+    deadline = time.time() + 30
+    finished = [Status.FINISHED, Status.FAILED]
+    while time.time() < deadline:
+        statuses = [local.get_status(r['batch_id']) for r in results]
+        if all(status in finished for status in statuses):
+            break
+        assert all(status in finished + [Status.PENDING, Status.RUNNING]
+                   for status in statuses)
+        time.sleep(0.1)
+    assert statuses.count(Status.FINISHED) == 3
+
+
+def test_stopped_job(tmpdir):
+    status_file = str(tmpdir.join('job.status'))
+    # a process that no longer exists
+    local._write_state(status_file, 'RUNNING 999999999')
+    assert local.get_status(status_file) == Status.FAILED
+    local._write_state(status_file, 'RUNNING {0}'.format(os.getpid()))
+    assert local.get_status(status_file) == Status.RUNNING
+    assert local.get_status(str(tmpdir.join('missing'))) == Status.UNKNOWN
+
+
+def test_resubmit_info_file(batch_dir):
+    item = dict(local_id='007', output_folder=str(batch_dir.join('job_007')),
+                entries='1:2', files='a.root')
+    result, = _submit(batch_dir, [item], wait=True)
+    info = dict((key, [value]) for key, value in result.items())
+    info.update(local_id=['007'], output_folder=[item['output_folder']],
+                status=[Status.FAILED], stdout_log=['/old.out'])
+    info_file = create_info_file(info, str(batch_dir))
+
+    command = imp.load_source('cmsl1t_batch_resubmit', RESUBMIT)
+    command.run.main(['-i', info_file], standalone_mode=False)
+    df = read_info_file(info_file)
+    assert list(df['local_id']) == ['007']
+    assert list(df['stdout_log']) == ['/logs/job_007.out']
+    assert list(df['status']) == [Status.CREATED]
+    assert df['batch_id'][0].endswith('job_007.status')
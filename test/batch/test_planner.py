@@ -0,0 +1,90 @@
+import json
+import pytest
+from cmsl1t.batch.planner import FileIndex, Job, events_per_second, plan_jobs
+
+ENTRIES = {'a.root': 100, 'b.root': 10, 'c.root': 30, 'd.root': 60,
+           'e.root': 1000}
+
+
+@pytest.fixture
+def index(tmpdir):
+    measured = []
+
+    def measure(input_file, tree):
+        measured.append(input_file)
+        if input_file == 'broken.root':
+            raise IOError("Could not open broken.root")
+        return dict(entries=ENTRIES[input_file],
+                    bytes=ENTRIES[input_file] * 1000)
+    index = FileIndex(str(tmpdir.join('index.json')), measure=measure)
+    index.measured = measured
+    return index
+
+
+def test_file_index(index):
+    index.update(['a.root', 'b.root'])
+    index.update(['a.root', 'c.root', 'broken.root'])
+    assert sorted(index.measured) == ['a.root', 'b.root', 'broken.root',
+                                      'c.root']
+    assert index.get('c.root')['entries'] == 30
+    assert index.get('broken.root') is None
+
+    reloaded = FileIndex(index.filename, measure=None)
+    assert reloaded.get('a.root')['bytes'] == 100000
+
+
+def test_balanced_jobs(index):
+    files = ['a.root', 'b.root', 'c.root', 'd.root']
+    jobs = plan_jobs(files, index, per_job=100)
+    assert sorted(job.cost for job in jobs) == [100, 100]
+    assert sorted(job.files for job in jobs) == \
+        [['a.root'], ['b.root', 'c.root', 'd.root']]
+    assert all(job.nevents == -1 for job in jobs)
+
+    # as many jobs as with two files each, but of the same cost
+    jobs = plan_jobs(files, index, split_by='bytes', files_per_job=2)
+    assert [job.cost for job in jobs] == [100000, 100000]
+
+
+def test_jobs_within_budget(tmpdir):
+    costs = dict(('{0}.root'.format(i), c) for i, c in
+                 enumerate([60, 60, 60, 45, 30, 30, 20, 15, 10, 5, 99, 1]))
+
+    def measure(input_file, tree):
+        return dict(entries=costs[input_file], bytes=costs[input_file])
+    index = FileIndex(measure=measure)
+    files = sorted(costs)
+    for per_job in [100, 120, 150, 200]:
+        jobs = plan_jobs(files, index, per_job=per_job)
+        assert max(job.cost for job in jobs) <= per_job
+        assert sorted(sum([job.files for job in jobs], [])) == files
+    # three files of 0.6 of a job do not go into one job
+    jobs = plan_jobs(['0.root', '1.root', '2.root'], index, per_job=100)
+    assert [job.cost for job in jobs] == [60, 60, 60]
+
+
+def test_large_file_is_split(index):
+    jobs = plan_jobs(['a.root', 'e.root'], index, wall_seconds=10, rate=25)
+    assert jobs[0] == Job(['a.root'], 0, -1, 100)
+    assert [(job.first_event, job.nevents) for job in jobs[1:]] == \
+        [(0, 250), (250, 500), (500, 750), (750, 1000)]
+    assert all(job.files == ['e.root'] for job in jobs[1:])
+
+
+def test_events_per_second(tmpdir):
+    profile = tmpdir.join('profile.json')
+    profile.write(json.dumps({'stages': {
+        'read': {'seconds_per_event': 0.001},
+        'analyze demo': {'seconds_per_event': 0.003},
+    }}))
+    assert events_per_second(str(profile)) == pytest.approx(250)
+
+
+def test_file_index_workers(tmpdir):
+    def measure(input_file, tree):
+        return dict(entries=1, bytes=1)
+    index = FileIndex(str(tmpdir.join('index.json')), measure=measure,
+                      workers=4)
+    files = ['{0}.root'.format(i) for i in range(10)]
+    index.update(files)
+    assert all(index.get(f)['entries'] == 1 for f in files)
@@ -0,0 +1,61 @@
+from cmsl1t.benchmark import suite
+from cmsl1t.benchmark.events import synthetic_events, PF_JETS, L1_SUMS
+
+
+def test_synthetic_events():
+    events = synthetic_events(20, 6, sum_types=[1, 2, 3], seed=3)
+    assert len(events) == 20
+    for event in events:
+        n_jets = len(event.Jet_et)
+        assert all(len(event[alias]) == n_jets for alias in PF_JETS)
+        assert len(set(len(event[alias]) for alias in L1_SUMS)) == 1
+        assert set(event.L1Upgrade_sumType) == set([1, 2, 3])
+    again = synthetic_events(20, 6, sum_types=[1, 2, 3], seed=3)
+    assert [e.Jet_et for e in events] == [e.Jet_et for e in again]
+
+
+def test_measure():
+    calls = []
+
+    @suite.case('test case', jets=False)
+    def setup(context):
+        return lambda: calls.append(context.n_events)
+    try:
+        result = suite.measure('test case', 100, 4, repeat=2)
+    finally:
+        del suite.CASES['test case']
+    assert calls == [100, 100]
+    assert result['case'] == 'test case'
+    assert result['events'] == 100
+    assert result['jets'] is None
+    assert result['events_per_second'] > 0
+    assert result['peak_rss_mb'] > 0
+
+
+def test_compare():
+    baseline = [
+        dict(case='a', events=10, jets=4, events_per_second=100.,
+             peak_rss_mb=100.),
+        dict(case='b', events=10, jets=None, events_per_second=100.,
+             peak_rss_mb=100.),
+    ]
+    results = [
+        dict(case='a', events=10, jets=4, events_per_second=85.,
+             peak_rss_mb=150.),
+        dict(case='b', events=10, jets=None, events_per_second=50.,
+             peak_rss_mb=100.),
+        dict(case='c', events=10, jets=None, events_per_second=1.,
+             peak_rss_mb=100.),
+    ]
+    regressions = suite.compare(results, baseline, tolerance=0.2)
+    assert len(regressions) == 2
+    assert regressions[0].startswith('a (10 events, 4 jets): 150 MB')
+    assert regressions[1].startswith('b (10 events, None jets): 50 events/s')
+
+
+def test_write_and_read_results(tmpdir):
+    results = [dict(case='a', events=10, jets=4, events_per_second=100.,
+                    peak_rss_mb=100.)]
+    filename = str(tmpdir.join('benchmark', 'results.json'))
+    suite.write_results(results, filename)
+    assert suite.read_results(filename) == results
@@ -66,5 +66,13 @@ class TestLumiFilter(unittest.TestCase):
 
         self.assertFalse(lumiFilter(273302, 5))
 
+    def test_lumifilter_mask(self):
+        self.urlopen_mock.return_value = MockResponse(json.dumps(EXAMPLE_JSON))
+        lumiFilter = LuminosityFilter('dummy')
+        runs = np.array([273158, 273158, 273302, 273302, 1])
+        lumis = np.array([1, 13, 4, 5, 1])
+        expected = [lumiFilter(run, lumi) for run, lumi in zip(runs, lumis)]
+        self.assertEqual(lumiFilter.mask(runs, lumis).tolist(), expected)
+
     def tearDown(self):
         self.patcher.stop()
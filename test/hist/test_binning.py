@@ -63,3 +63,21 @@ def test_get_bin_edges():
     assert b.get_bin_lower(binning.Base.underflow) == binning.Base.underflow
     assert b.get_bin_lower(binning.Base.overflow) == binning.Base.overflow
     assert b.get_bin_lower(binning.Base.everything) == binning.Base.everything
+
+
+def test_sorted_bin_masks():
+    b = binning.Sorted([0, 10, 20], 'test', use_everything_bin=True)
+    keys = [-1, 0, 5, 10, 25]
+    masks = {index: mask.tolist() for index, mask in b.bin_masks(keys)}
+    for i, key in enumerate(keys):
+        for index in b.find_all_bins(key):
+            assert masks[index][i]
+    assert sum(sum(mask) for mask in masks.values()) == 2 * len(keys)
+
+
+def test_greater_than_bin_masks():
+    b = binning.GreaterThan([10, 20], 'test')
+    keys = [5, 10, 25]
+    masks = {index: mask.tolist() for index, mask in b.bin_masks(keys)}
+    assert masks == {0: [False, True, True], 1: [False, False, True],
+                     'overflow': [True, False, False]}
@@ -0,0 +1,122 @@
+import os
+import time
+import numpy as np
+import pytest
+from cmsl1t.io import branchcache
+from cmsl1t.io.branchcache import BranchCache, file_key, slice_column
+from cmsl1t.io.eventreader import EventReader
+from cmsl1t.jagged import JaggedArray
+
+TREE = 'l1UpgradeTree/L1UpgradeTree'
+
+
+@pytest.fixture
+def ntuples(monkeypatch, tmpdir):
+    ''' Two input files, their branches made up instead of read by uproot '''
+    content = {
+        'L1Upgrade.jetEt': [JaggedArray.from_lists([[10., 20.], [], [30.]]),
+                            JaggedArray.from_lists([[40.], [50., 60.]])],
+        'L1Upgrade.nJets': [np.array([2, 0, 1]), np.array([1, 2])],
+    }
+    files = []
+    for i in range(2):
+        files.append(str(tmpdir.join('L1Ntuple_{0}.root'.format(i))))
+        with open(files[-1], 'w') as ntuple:
+            ntuple.write('ntuple')
+    reads = []
+
+    def read_branch(input_file, treeName, branchName):
+        reads.append((os.path.basename(input_file), branchName))
+        return content[branchName][files.index(input_file)]
+
+    def tree_entries(input_file, treeName):
+        if treeName != TREE:
+            return None
+        return len(content['L1Upgrade.nJets'][files.index(input_file)])
+    monkeypatch.setattr(branchcache, '_read_branch', read_branch)
+    monkeypatch.setattr(branchcache, '_tree_entries', tree_entries)
+    return files, reads
+
+
+def test_column_is_cached(ntuples, tmpdir):
+    files, reads = ntuples
+    cache = BranchCache(str(tmpdir.join('cache')))
+    for _ in range(2):
+        jets = cache.column(files[0], TREE, 'L1Upgrade.jetEt')
+        counts = cache.column(files[0], TREE, 'L1Upgrade.nJets')
+    assert reads == [('L1Ntuple_0.root', 'L1Upgrade.jetEt'),
+                     ('L1Ntuple_0.root', 'L1Upgrade.nJets')]
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert isinstance(counts, np.memmap)
+    assert isinstance(jets.content.base, np.memmap)
+    assert list(jets[0]) == [10., 20.] and list(jets[2]) == [30.]
+    assert list(counts) == [2, 0, 1]
+    assert cache.num_entries(files[0], TREE) == 3
+
+
+def test_modified_file_is_read_again(ntuples, tmpdir):
+    files, reads = ntuples
+    key = file_key(files[0])
+    os.utime(files[0], (time.time() + 10, time.time() + 10))
+    assert file_key(files[0]) != key
+    assert file_key('root://host//store/L1Ntuple.root') == \
+        file_key('root://host//store/L1Ntuple.root')
+
+
+def test_eviction(ntuples, tmpdir):
+    files, reads = ntuples
+    cache = BranchCache(str(tmpdir.join('cache')))
+    cache.column(files[0], TREE, 'L1Upgrade.nJets')
+    cache.column(files[1], TREE, 'L1Upgrade.nJets')
+    oldest, newest = [paths for _, _, paths in cache.entries()]
+    os.utime(oldest[0], (time.time() - 100, time.time() - 100))
+    # using the oldest entry makes it the most recent
+    cache.column(files[0], TREE, 'L1Upgrade.nJets')
+    first, second = [size for _, size, _ in cache.entries()]
+    cache.evict(max(first, second))
+    assert [paths for _, _, paths in cache.entries()] == [oldest]
+
+    cache.max_bytes = cache.size
+    cache.column(files[0], TREE, 'L1Upgrade.jetEt')
+    assert cache.size <= cache.max_bytes
+
+
+def test_slice_column():
+    jets = JaggedArray.from_lists([[1.], [2., 3.], [], [4.]])
+    sliced = slice_column(jets, 1, 3)
+    assert [list(jets) for jets in sliced] == [[2., 3.], []]
+    assert list(slice_column(np.arange(4), 1, 3)) == [1, 2]
+
+
+def test_eventreader(ntuples, tmpdir):
+    files, reads = ntuples
+    ntuple_map = {'content': {TREE: {'branches': {
+        'L1Upgrade.jetEt': {'aliases': ['event.L1Upgrade_jetEt']},
+        'L1Upgrade.nJets': {'aliases': ['event.L1Upgrade_nJets']},
+    }}}}
+    cache = BranchCache(str(tmpdir.join('cache')))
+    reader = EventReader(files, ntuple_map, nevents=4, first_event=1,
+                         cache=cache)
+    jets = [list(event.L1Upgrade_jetEt) for event in reader]
+    assert jets == [[], [30.], [40.]]
+    assert [branch for _, branch in reads] == ['L1Upgrade.jetEt'] * 2
+
+    reader = EventReader(files, ntuple_map, cache=cache)
+    assert [int(event['L1Upgrade_nJets']) for event in reader] == \
+        [2, 0, 1, 1, 2]
+    assert cache.hits == 0 and cache.misses == 4
+
+
+def test_batchreader(ntuples, tmpdir):
+    from cmsl1t.io.batchreader import BatchReader
+    files, reads = ntuples
+    ntuple_map = {'content': {TREE: {'branches': {
+        'L1Upgrade.jetEt': {'aliases': ['event.L1Upgrade_jetEt']},
+    }}}}
+    cache = BranchCache(str(tmpdir.join('cache')))
+    reader = BatchReader(files, ntuple_map, batch_size=2, cache=cache)
+    reader.request(['L1Upgrade_jetEt'])
+    batches = [(list(entries), [list(jets) for jets in batch['L1Upgrade_jetEt']])
+               for entries, batch in reader]
+    assert batches == [([0, 1], [[10., 20.], []]), ([2], [[30.]]),
+                       ([3, 4], [[40.], [50., 60.]])]
@@ -0,0 +1,57 @@
+import os
+import tempfile
+from cmsl1t.io.checkpoint import Checkpoint, STATE_FILE
+from cmsl1t.io.npz import from_npz
+
+
+class CountPlotter(object):
+
+    def __init__(self):
+        self.directory_name = "count"
+        self.count = 0
+
+
+class FakeAnalyzer(object):
+
+    def __init__(self, name="fake"):
+        self.name = name
+        self.all_plots = [CountPlotter()]
+
+    def reload_histogram_files(self, filenames):
+        for filename in filenames:
+            self.all_plots[0].count += from_npz(filename)[0]["count"].count
+        return True
+
+
+def run(checkpoint, analyzer, n_events, stop=None):
+    first = checkpoint.first_event("events")
+    assert checkpoint.restore([analyzer])
+    for entry in range(first, n_events if stop is None else stop):
+        analyzer.all_plots[0].count += 1
+        checkpoint.update("events", entry + 1)
+
+
+def test_checkpoint_every_n_events():
+    directory = tempfile.mkdtemp()
+    checkpoint = Checkpoint(directory, ["a.root"], every=10)
+    run(checkpoint, FakeAnalyzer(), 100, stop=25)
+    assert os.path.exists(os.path.join(directory, STATE_FILE))
+    # Only the last checkpoint is kept
+    assert len(os.listdir(directory)) == 2
+
+    resumed = Checkpoint(directory, ["a.root"], every=10, resume=True)
+    assert resumed.first_event("events") == 20
+    analyzer = FakeAnalyzer()
+    run(resumed, analyzer, 100)
+    assert analyzer.all_plots[0].count == 100
+
+    resumed.clear()
+    assert not os.path.exists(directory)
+
+
+def test_no_resume_for_other_inputs():
+    directory = tempfile.mkdtemp()
+    checkpoint = Checkpoint(directory, ["a.root"], every=10)
+    run(checkpoint, FakeAnalyzer(), 100, stop=25)
+    resumed = Checkpoint(directory, ["b.root"], resume=True)
+    assert resumed.first_event("events") == 0
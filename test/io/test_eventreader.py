@@ -1,6 +1,11 @@
 import pytest
 from cmsl1t.io.eventreader import EventReader, Event
+from cmsl1t.io.access import AliasAccess
 from collections import namedtuple
+try:
+    from unittest.mock import patch  # In Python 3, mock is built-in
+except ImportError:
+    from mock import patch
 
 
 @pytest.fixture
@@ -44,3 +49,35 @@ def test_mapping(caloTree, mapping):
     assert observed == expected
     observed = event.emu_CaloTP_ecalTPCaliphi
     assert observed == expected
+
+
+def test_alias_access(caloTree, mapping):
+    trees = {
+        'l1CaloTowerEmuTree/L1CaloTowerTree': caloTree,
+    }
+    access = AliasAccess()
+    for _ in range(3):
+        access.add_events('events')
+        event = Event(trees, mapping, access)
+        event.emu_CaloTP_ecalTPCaliphi
+        event.emu_CaloTP_ecalTPCaliphi
+    assert access.counts == {'emu_CaloTP_ecalTPCaliphi': 3}
+
+    report = access.report(mapping)
+    assert report['events'] == 3
+    assert report['used'] == ['emu_CaloTP_ecalTPCaliphi']
+    assert report['aliases']['emu_CaloTP_ecalTPCaliphi']['events'] == 3
+    assert report['aliases']['emu_CaloTP_ecalTPCaliphi']['branch'] == \
+        'CaloTP.ecalTPCaliphi'
+    assert report['aliases']['emu_L1CaloTowerTree_CaloTP_ecalTPCaliphi'][
+        'events'] == 0
+    assert report['bytes_read'] is None
+
+    # estimates from the branch sizes
+    sizes = {('l1CaloTowerEmuTree/L1CaloTowerTree', 'CaloTP.ecalTPCaliphi'):
+             dict(zip_bytes_per_event=10., tot_bytes_per_event=40.)}
+    with patch('cmsl1t.io.access.branch_sizes', lambda *args: sizes):
+        report = access.report(mapping, ['L1Ntuple.root'])
+    alias = report['aliases']['emu_CaloTP_ecalTPCaliphi']
+    assert alias['estimated_zip_bytes_read'] == 30.
+    assert report['estimated_zip_bytes_read'] == 30.
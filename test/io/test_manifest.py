@@ -0,0 +1,52 @@
+import os
+import tempfile
+from cmsl1t.io.manifest import read_manifest, route_histogram_files, \
+    write_manifest
+
+
+class FakePlotter(object):
+
+    def __init__(self, name, value):
+        self.directory_name = name
+        self.value = value
+
+
+class FakeAnalyzer(object):
+
+    def __init__(self, name):
+        self.name = name
+
+    def might_contain_histograms(self, filename):
+        return os.path.basename(filename) == self.name + "_histograms.root"
+
+
+def hist_file(directory, name):
+    filename = os.path.join(directory, name + "_histograms.root")
+    open(filename, "w").close()
+    return filename
+
+
+def test_write_and_read_manifest():
+    filename = hist_file(tempfile.mkdtemp(), "test")
+    write_manifest(filename, "test", [FakePlotter("a", 1), FakePlotter("b", 2)])
+    manifest = read_manifest(filename)
+    assert manifest["analyzer"] == "test"
+    assert sorted(manifest["directories"]) == ["a", "b"]
+    assert read_manifest(hist_file(tempfile.mkdtemp(), "other")) is None
+
+
+def test_route_histogram_files():
+    analyzers = [FakeAnalyzer("first"), FakeAnalyzer("second")]
+    jobs = [tempfile.mkdtemp() for _ in range(3)]
+    with_manifest = [hist_file(job, "first") for job in jobs[:2]]
+    for i, filename in enumerate(with_manifest):
+        write_manifest(filename, "first", [FakePlotter("a", i)])
+    # Renamed file, only the manifest tells which analyzer wrote it
+    renamed = hist_file(jobs[2], "renamed")
+    write_manifest(renamed, "second", [FakePlotter("b", 0)])
+    without_manifest = hist_file(jobs[2], "second")
+
+    routes = route_histogram_files(
+        with_manifest + [renamed, without_manifest], analyzers)
+    assert routes[analyzers[0]] == with_manifest
+    assert routes[analyzers[1]] == [renamed, without_manifest]
@@ -1,6 +1,6 @@
 import pytest
 from cmsl1t.io.mapfile import \
-    default_alias, full_path_alias, shorthand_alias
+    default_alias, full_path_alias, shorthand_alias, prune_ntuple_map
 
 
 @pytest.fixture
@@ -43,3 +43,39 @@ def test_incorrect_emu_prefix(muonTree):
     observed = shorthand_alias(**muonTree)
     expected = 'event.Muon_isLooseMuon'
     assert observed == expected
+
+
+def test_prune_ntuple_map():
+    ntuple_map = {
+        'version': '0.0.1',
+        'content': {
+            'l1CaloTowerEmuTree/L1CaloTowerTree': {
+                'branches': {
+                    'CaloTP.ecalTPCaliphi': {
+                        'aliases': ['event.emu_CaloTP_ecalTPCaliphi',
+                                    'event.emu_ecalTPCaliphi'],
+                    },
+                    'CaloTP.ecalTPcompEt': {
+                        'aliases': ['event.emu_CaloTP_ecalTPcompEt'],
+                    },
+                },
+            },
+            'l1MuonRecoTree/Muon2RecoTree': {
+                'branches': {
+                    'Muon.isLooseMuon': {
+                        'aliases': ['event.Muon_isLooseMuon'],
+                    },
+                },
+            },
+        },
+    }
+    pruned = prune_ntuple_map(ntuple_map, ['emu_CaloTP_ecalTPCaliphi'])
+    assert list(pruned['content']) == ['l1CaloTowerEmuTree/L1CaloTowerTree']
+    branches = pruned['content']['l1CaloTowerEmuTree/L1CaloTowerTree'][
+        'branches']
+    assert branches == {
+        'CaloTP.ecalTPCaliphi': {'aliases': ['event.emu_CaloTP_ecalTPCaliphi']},
+    }
+    assert pruned['version'] == '0.0.1'
+    # the input map is left untouched
+    assert len(ntuple_map['content']) == 2
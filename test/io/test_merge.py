@@ -0,0 +1,89 @@
+import os
+import signal
+import tempfile
+from cmsl1t.io.merge import TreeMerge, merge_histogram_files
+from cmsl1t.io.npz import from_npz
+
+
+class CountPlotter(object):
+    summed_attributes = ('count', )
+
+    def __init__(self):
+        self.directory_name = "count"
+        self.count = 0
+
+
+class FakeAnalyzer(object):
+    """
+    Adds up the numbers in text files ([config:]number), or in npz files of
+    partial sums.  Numbers of different configs cannot be added.
+    """
+
+    def __init__(self):
+        self.all_plots = [CountPlotter()]
+        self.config = None
+
+    def reload_histogram_files(self, filenames):
+        for filename in filenames:
+            if filename.endswith(".npz"):
+                count = from_npz(filename)[0]["count"].count
+            else:
+                with open(filename) as input_file:
+                    content = input_file.read()
+                if content == "crash":
+                    os.kill(os.getpid(), signal.SIGKILL)
+                config, _, count = content.rpartition(":")
+                if self.config not in (None, config):
+                    return False
+                self.config = config
+                count = int(count)
+            self.all_plots[0].count += count
+        return True
+
+
+def write_inputs(values):
+    directory = tempfile.mkdtemp()
+    filenames = []
+    for i, value in enumerate(values):
+        filenames.append(os.path.join(directory, "{0}.txt".format(i)))
+        with open(filenames[-1], "w") as output:
+            output.write(value)
+    return filenames
+
+
+def test_merge_histogram_files():
+    filenames = write_inputs([str(i) for i in range(10)])
+    analyzer = FakeAnalyzer()
+    work_dir = tempfile.mkdtemp()
+    assert merge_histogram_files(analyzer, filenames, work_dir, n_workers=3)
+    assert analyzer.all_plots[0].count == sum(range(10))
+    assert not os.path.exists(work_dir)
+
+
+def test_bad_files_are_left_out_and_merge_resumes():
+    filenames = write_inputs(["1", "2", "not a number", "4", "5"])
+    work_dir = tempfile.mkdtemp()
+    output, failed = TreeMerge(FakeAnalyzer(), filenames, work_dir, 2).run()
+    assert list(failed) == [filenames[2]]
+    assert from_npz(output)[0]["count"].count == 12
+
+    merge = TreeMerge(FakeAnalyzer(), filenames, work_dir, 2)
+    assert merge._reuse_finished(merge.root) == 1
+    assert merge.run() == (output, failed)
+
+
+def test_crashed_worker_is_reported():
+    filenames = write_inputs(["1", "2", "crash", "4"])
+    output, failed = TreeMerge(FakeAnalyzer(), filenames, tempfile.mkdtemp(),
+                               2).run()
+    assert list(failed) == [filenames[2]]
+    assert "exited with code" in failed[filenames[2]]
+    assert from_npz(output)[0]["count"].count == 7
+
+
+def test_inputs_that_cannot_be_summed():
+    filenames = write_inputs(["1", "other:2"])
+    output, failed = TreeMerge(FakeAnalyzer(), filenames, tempfile.mkdtemp(),
+                               2).run()
+    assert output is None
+    assert sorted(failed) == filenames
@@ -0,0 +1,62 @@
+import os
+import tempfile
+from cmsl1t.io.npz import to_npz, from_npz
+from cmsl1t.plotting.paired_rates import PairedRatesPlot
+import cmsl1t.hist.binning as bn
+import numpy as np
+
+PU_BINS = [0, 25, 50, 999]
+THRESHOLDS = [20, 50]
+
+
+def filled_plotter(seed, n_points=1000):
+    random = np.random.RandomState(seed)
+    pileup = random.uniform(0, 80, n_points)
+    hw = random.uniform(0, 100, n_points)
+    emu = hw.copy()
+    emu[:10] += 40
+    plotter = PairedRatesPlot("Test")
+    plotter.build("L1 Test", PU_BINS, THRESHOLDS, 100, 0, 200, 16, 0, 80)
+    plotter.set_plot_output_cfg("tests/outputs", "png")
+    plotter.fill_batch(pileup, hw, emu, np.arange(n_points))
+    return plotter
+
+
+def rates(plotter):
+    everything = [bn.Base.everything]
+    return list(plotter.rates.get_bin_contents(everything).z())
+
+
+def write(plotter):
+    filename = os.path.join(tempfile.mkdtemp(), "test_histograms.npz")
+    to_npz([plotter], filename)
+    return filename
+
+
+def test_round_trip():
+    plotter = filled_plotter(1)
+    groups = from_npz(write(plotter))
+    assert len(groups) == 1
+    reloaded = groups[0][plotter.directory_name]
+    assert rates(reloaded) == rates(plotter)
+    assert reloaded.n_events == plotter.n_events
+    assert list(reloaded.disagreements) == list(plotter.disagreements)
+    assert reloaded.mismatches == plotter.mismatches
+    assert reloaded.thresholds.bins == plotter.thresholds.bins
+    assert reloaded.rates.GetEntries() == plotter.rates.GetEntries()
+
+
+def test_sum_files():
+    plotters = [filled_plotter(seed) for seed in range(3)]
+    groups = from_npz([write(plotter) for plotter in plotters])
+    assert len(groups) == 1
+    summed = groups[0][plotters[0].directory_name]
+
+    merged = filled_plotter(0)
+    for plotter in plotters[1:]:
+        merged.merge_in(plotter)
+    assert np.allclose(rates(summed), rates(merged))
+    assert summed.n_events == merged.n_events == 3000
+    assert summed.n_different == merged.n_different
+    assert list(summed.disagreements) == list(merged.disagreements)
+    assert len(summed.get_mismatches()) == len(merged.get_mismatches())
@@ -0,0 +1,121 @@
+import os
+import sys
+import threading
+import time
+import pytest
+from cmsl1t.io import prefetch
+from cmsl1t.io.prefetch import Prefetcher, is_remote
+
+SLOW_COPY = '''
+import sys, time
+time.sleep(1)
+with open(sys.argv[2], 'w') as output:
+    output.write(sys.argv[1])
+'''
+
+
+@pytest.fixture
+def input_files(tmpdir):
+    files = []
+    for i in range(5):
+        files.append(str(tmpdir.join('L1Ntuple_{0}.root'.format(i))))
+        with open(files[-1], 'w') as ntuple:
+            ntuple.write('x' * 100 * (i + 1))
+    return files
+
+
+def test_is_remote():
+    assert is_remote('root://eoscms.cern.ch//eos/cms/store/L1Ntuple.root')
+    assert not is_remote('/eos/cms/store/L1Ntuple.root')
+    assert not is_remote('file:///eos/cms/store/L1Ntuple.root')
+
+
+def test_local_copies(input_files, tmpdir):
+    prefetcher = Prefetcher(input_files, str(tmpdir.join('staging')),
+                            remote_only=False)
+    staged = []
+    for i, local in enumerate(prefetcher):
+        source = input_files[i]
+        assert local != source
+        assert os.path.basename(local).endswith(os.path.basename(source))
+        with open(local) as copy, open(source) as original:
+            assert copy.read() == original.read()
+        # the previous copy is gone once the next file is read
+        assert all(not os.path.exists(path) for path in staged)
+        staged.append(local)
+    assert os.listdir(str(tmpdir.join('staging'))) == []
+
+
+def test_local_files_are_read_in_place(input_files):
+    assert list(Prefetcher(input_files)) == input_files
+
+
+def test_depth_and_budget(input_files):
+    copied = []
+    lock = threading.Lock()
+
+    def copy(source, destination):
+        with lock:
+            copied.append(source)
+        with open(destination, 'w') as output:
+            output.write('x' * 100)
+
+    prefetcher = Prefetcher(input_files, depth=2, remote_only=False,
+                            copy=copy, workers=4)
+    files = iter(prefetcher)
+    next(files)
+    # the first file and the two after it, no more
+    with prefetcher._condition:
+        while len(prefetcher._staged) < 3:
+            prefetcher._condition.wait()
+    assert sorted(copied) == input_files[:3]
+    assert prefetcher.staged_bytes == 300
+    files.close()
+    assert prefetcher._staging is None
+
+    copied[:] = []
+    prefetcher = Prefetcher(input_files, depth=4, max_bytes=150,
+                            remote_only=False, copy=copy, workers=4)
+    files = iter(prefetcher)
+    next(files)
+    with prefetcher._condition:
+        while len(prefetcher._staged) < 2:
+            prefetcher._condition.wait()
+    assert prefetcher.staged_bytes == 200
+    assert len(copied) == 2
+    assert len(list(files)) == 4
+
+
+def test_failed_copy(input_files):
+    def copy(source, destination):
+        if source == input_files[1]:
+            raise IOError("No route to host")
+        with open(destination, 'w') as output:
+            output.write('x')
+
+    files = list(Prefetcher(input_files, remote_only=False, copy=copy))
+    assert files[1] == input_files[1]
+    assert len(files) == 5
+
+
+def test_remote_copies_do_not_block(monkeypatch):
+    monkeypatch.setattr(prefetch, '_copy_command',
+                        lambda source, destination: [sys.executable, '-c',
+                                                     SLOW_COPY, source,
+                                                     destination])
+    input_files = ['root://eos.example//store/L1Ntuple_{0}.root'.format(i)
+                   for i in range(2)]
+    prefetcher = Prefetcher(input_files)
+    prefetcher.start()
+    # the event loop keeps running while the files are copied
+    steps = 0
+    stop = time.time() + 0.5
+    while time.time() < stop:
+        steps += 1
+    with prefetcher._condition:
+        assert prefetcher._copying == 2
+    assert steps > 1000
+
+    for i, local in enumerate(prefetcher):
+        with open(local) as copy:
+            assert copy.read() == input_files[i]
@@ -0,0 +1,109 @@
+from collections import namedtuple
+import pytest
+from cmsl1t.benchmark.events import SyntheticEvent
+from cmsl1t.energySums import EnergySum, Met
+from cmsl1t.io.access import AliasAccess
+from cmsl1t.io.eventreader import Event, _create_alias_map
+from cmsl1t.io.skim import SkimWriter, product_layout, flatten_product, \
+    rebuild_product, skim_map, TREE
+from cmsl1t.jet import L1Jet
+
+
+def test_product_layout():
+    jets = [L1Jet(10., 0.5, 1., 0), L1Jet(20., -1., 2., 1)]
+    layout = product_layout('l1Jets', jets)
+    assert layout == {'class': 'cmsl1t.jet.L1Jet', 'collection': True,
+                      'fields': ['et', 'eta', 'phi', 'etCorr', 'bx']}
+    assert product_layout('l1Jets', []) is None
+    assert product_layout('l1Sums_Met', Met(30., 1.)) == {
+        'class': 'cmsl1t.energySums.Met', 'fields': ['et', 'phi'],
+        'collection': False}
+    # bound to another name than its own ('Sum')
+    assert product_layout('l1Sums_Ett', EnergySum(100.))['class'] == \
+        'cmsl1t.energySums.EnergySum'
+
+
+def test_round_trip():
+    jets = [L1Jet(10., 0.5, 1., 0), L1Jet(20., -1., 2., 1)]
+    layout = product_layout('l1Jets', jets)
+    columns = flatten_product('l1Jets', layout, jets)
+    assert columns['l1Jets_et'] == [10., 20.]
+    assert columns['l1Jets_bx'] == [0, 1]
+
+    rebuilt = rebuild_product(SyntheticEvent(**columns), 'l1Jets', layout)
+    assert [type(jet) for jet in rebuilt] == [L1Jet, L1Jet]
+    assert [(j.et, j.eta, j.phi, j.etCorr, j.bx) for j in rebuilt] == \
+        [(10., 0.5, 1., 10., 0), (20., -1., 2., 20., 1)]
+
+    met = Met(30., 1.)
+    layout = product_layout('l1Sums_Met', met)
+    columns = flatten_product('l1Sums_Met', layout, met)
+    assert rebuild_product(SyntheticEvent(**columns), 'l1Sums_Met',
+                           layout) == met
+
+
+def test_skim_map_is_read_back():
+    products = {'l1Sums_Met': product_layout('l1Sums_Met', Met(30., 1.))}
+    ntuple_map = skim_map(['Event_run', 'l1Sums_Met_et', 'l1Sums_Met_phi'],
+                          products)
+    assert _create_alias_map(ntuple_map) == {
+        'Event_run': (TREE, 'Event_run'),
+        'l1Sums_Met_et': (TREE, 'l1Sums_Met_et'),
+        'l1Sums_Met_phi': (TREE, 'l1Sums_Met_phi'),
+    }
+    assert ntuple_map['products'] == products
+
+    Events = namedtuple('Events', ['Event_run', 'l1Sums_Met_et',
+                                   'l1Sums_Met_phi'])
+    trees = {TREE: Events(1, 30., 1.)}
+    event = Event(trees, _create_alias_map(ntuple_map), None, products)
+    assert event.l1Sums_Met == Met(30., 1.)
+    assert event.l1Sums_Met is event.l1Sums_Met
+    assert event.Event_run == 1
+
+
+@pytest.fixture
+def writer(monkeypatch, tmpdir):
+    # the columns are checked before anything is written
+    monkeypatch.setattr(SkimWriter, '_open', lambda self: None)
+    access = AliasAccess()
+    writer = SkimWriter(str(tmpdir.join('skim.root')), products=['l1Sums'],
+                        select=lambda event: event.Sums_caloMetBE > 20,
+                        access=access, chunk_size=10)
+    return writer, access
+
+
+def _event(met, sum_et):
+    event = SyntheticEvent(Event_run=1, Sums_caloMetBE=met,
+                           L1Upgrade_sumEt=sum_et, Jet_et=[1., 2.])
+    event.l1Sums_Met = Met(sum_et[0], 0.5)
+    event.l1Sums_nSums = len(sum_et)
+    return event
+
+
+def test_writer_columns(writer):
+    writer, access = writer
+    assert writer.map_filename.endswith('skim.yaml')
+    access.record('Sums_caloMetBE')
+    access.record('L1Upgrade_sumEt')
+    assert not writer.add(_event(10., [1.]))
+    assert writer.add(_event(30., [2., 3.]))
+    assert writer.add(_event(40., [4.]))
+    assert writer.n_seen == 3
+
+    writer._define()
+    assert list(writer._columns.items()) == [
+        ('L1Upgrade_sumEt', True), ('Sums_caloMetBE', False),
+        ('Event_run', False), ('l1Sums_nSums', False),
+        ('l1Sums_Met_et', False), ('l1Sums_Met_phi', False)]
+    table = writer._table()
+    assert table['L1Upgrade_sumEt'] == [[2., 3.], [4.]]
+    assert table['Sums_caloMetBE'] == [30., 40.]
+    assert table['l1Sums_nSums'] == [2, 1]
+    assert table['l1Sums_Met_et'] == [2., 4.]
+    assert 'Jet_et' not in table
+
+
+def test_writer_needs_aliases():
+    with pytest.raises(ValueError):
+        SkimWriter('skim.root')
@@ -0,0 +1,45 @@
+import json
+import os
+import tempfile
+import time
+try:
+    from urllib2 import urlopen
+except ImportError:
+    from urllib.request import urlopen
+from cmsl1t.io.npz import from_npz
+from cmsl1t.io.snapshot import Snapshots, STATUS_FILE
+
+
+class CountPlotter(object):
+
+    def __init__(self):
+        self.directory_name = "count"
+        self.count = 0
+
+
+class FakeAnalyzer(object):
+
+    def __init__(self):
+        self.name = "fake"
+        self.all_plots = [CountPlotter()]
+
+
+def test_snapshots_in_background():
+    directory = os.path.join(tempfile.mkdtemp(), "live")
+    snapshots = Snapshots(directory, minutes=0.001, port=0)
+    analyzer = FakeAnalyzer()
+    snapshots.add([analyzer])
+    for entry in range(20):
+        analyzer.all_plots[0].count += 1
+        snapshots.n_events = entry + 1
+        time.sleep(0.01)
+    time.sleep(0.2)
+
+    with open(os.path.join(directory, STATUS_FILE)) as status:
+        assert json.load(status)["events"] == 20
+    snapshot = from_npz(os.path.join(directory, "fake_histograms.npz"))
+    assert snapshot[0]["count"].count == 20
+
+    url = "http://localhost:{0}/".format(snapshots._server.server_address[1])
+    assert json.loads(urlopen(url).read().decode())["events"] == 20
+    snapshots.stop()
@@ -0,0 +1,94 @@
+import numpy as np
+from cmsl1t.io.synthetic import branch_layout, draw_branch, find_distribution, \
+    _fill_source, Member, Tree, DEFAULT_DISTRIBUTIONS
+
+UPGRADE_TYPES = {
+    'nJets': 'unsigned short',
+    'jetEt': 'vector<float>',
+    'jetBx': 'vector<short>',
+    'nSums': 'unsigned short',
+    'sumType': 'vector<short>',
+    'sumBx': 'vector<short>',
+    'sumEt': 'vector<float>',
+    'name': 'TString',
+    'hits': 'vector<vector<int> >',
+}
+
+
+def upgrade():
+    return branch_layout('L1Upgrade', 'L1Analysis::L1AnalysisL1UpgradeDataFormat',
+                         UPGRADE_TYPES)
+
+
+def test_branch_layout():
+    members = dict((m.name, m) for m in upgrade().members)
+    assert sorted(members) == ['jetBx', 'jetEt', 'nJets', 'nSums', 'sumBx',
+                               'sumEt', 'sumType']
+    assert members['nJets'] == Member('nJets', 'int', None)
+    assert members['jetEt'] == Member('jetEt', 'float', 'nJets')
+    assert members['sumType'] == Member('sumType', 'int', 'nSums')
+
+
+def test_branch_layout_without_counters():
+    branch = branch_layout('Event', 'L1Analysis::L1AnalysisEventDataFormat',
+                           {'run': 'unsigned int', 'nPV': 'int',
+                            'hlt': 'vector<TString>'})
+    assert branch.members == [Member('nPV', 'int', None),
+                              Member('run', 'int', None)]
+    branch = branch_layout('Jet', 'L1Analysis::L1AnalysisRecoJetDataFormat',
+                           {'nJets': 'int', 'nCaloJets': 'int',
+                            'et': 'vector<float>', 'caloEt': 'vector<float>'})
+    counters = dict((m.name, m.counter) for m in branch.members)
+    assert counters['et'] == 'nJets'
+    assert counters['caloEt'] == 'nJets'
+
+
+def test_find_distribution():
+    spec = find_distribution('Event.run', DEFAULT_DISTRIBUTIONS)
+    assert spec['dist'] == 'constant'
+    spec = find_distribution('L1Upgrade.jetIEta', DEFAULT_DISTRIBUTIONS)
+    assert spec['dist'] == 'integers'
+    custom = [dict(match='L1Upgrade.jetEt', dist='uniform', low=1, high=2)]
+    spec = find_distribution('L1Upgrade.jetEt',
+                             custom + DEFAULT_DISTRIBUTIONS)
+    assert spec['dist'] == 'uniform'
+
+
+def test_draw_branch():
+    rng = np.random.RandomState(2)
+    pileup = np.array([10, 20, 30, 40])
+    columns, offsets = draw_branch(rng, upgrade(), 4, pileup,
+                                   DEFAULT_DISTRIBUTIONS)
+    assert list(offsets['nJets']) == [0] + list(np.cumsum(columns['nJets']))
+    assert len(columns['jetEt']) == offsets['nJets'][-1]
+    assert len(columns['jetBx']) == offsets['nJets'][-1]
+    assert np.all(columns['nSums'] == 100)
+    # one sum of each type per bunch crossing, in every event
+    for i in range(4):
+        start, stop = offsets['nSums'][i:i + 2]
+        pairs = set(zip(columns['sumBx'][start:stop],
+                        columns['sumType'][start:stop]))
+        assert len(pairs) == 100
+
+
+def test_draw_branch_event_numbers():
+    branch = branch_layout('Event', 'L1Analysis::L1AnalysisEventDataFormat',
+                           {'event': 'ULong64_t', 'lumi': 'int', 'nPV': 'int'})
+    rng = np.random.RandomState(2)
+    pileup = np.array([10, 20, 30])
+    columns, offsets = draw_branch(rng, branch, 3, pileup,
+                                   DEFAULT_DISTRIBUTIONS, first_event=999)
+    assert offsets == {}
+    assert list(columns['event']) == [1000, 1001, 1002]
+    assert list(columns['lumi']) == [1, 2, 2]
+    assert list(columns['nPV']) == [10, 20, 30]
+
+
+def test_fill_source():
+    source = _fill_source('fill_test', Tree('l1UpgradeTree/L1UpgradeTree',
+                                            'L1UpgradeTree', [upgrade()]))
+    assert 'void fill_test(TTree* tree, Long64_t n_events' in source
+    assert 'L1Analysis::L1AnalysisL1UpgradeDataFormat* c0 =' in source
+    assert 'c0->nJets = c' in source
+    assert 'c0->jetEt.assign(' in source
+    assert source.count('tree->Fill();') == 1
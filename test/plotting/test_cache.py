@@ -0,0 +1,52 @@
+import os
+import tempfile
+import numpy as np
+from cmsl1t.plotting.cache import PlotCache, task_hash
+from cmsl1t.plotting.render import PlotTask, render, record_image
+
+
+N_DRAWS = {}
+
+
+class FakePlotter(object):
+
+    def __init__(self, output_dir, name):
+        self.directory_name = name
+        self.output_dir = output_dir
+        self.values = np.arange(10.)
+
+    def draw(self):
+        N_DRAWS[self.directory_name] = N_DRAWS.get(self.directory_name, 0) + 1
+        filename = os.path.join(self.output_dir, self.directory_name + ".txt")
+        with open(filename, "w") as output:
+            output.write(str(self.values.sum()))
+        record_image(filename)
+
+
+def test_task_hash():
+    plotter = FakePlotter(tempfile.mkdtemp(), "plot")
+    task = PlotTask(plotter)
+    before = task_hash(task)
+    assert task_hash(PlotTask(plotter)) == before
+    plotter.values[3] = 5
+    assert task_hash(task) != before
+    assert task_hash(PlotTask(plotter, "overlay_with_emu", plotter)) != before
+
+
+def test_render_skips_unchanged():
+    output_dir = tempfile.mkdtemp()
+    cache_file = os.path.join(output_dir, "cache.json")
+    plotters = [FakePlotter(output_dir, name) for name in ["a", "b", "c"]]
+    N_DRAWS.clear()
+
+    def run():
+        tasks = [PlotTask(plotter) for plotter in plotters]
+        assert render(tasks, cache=PlotCache(cache_file))
+        return [N_DRAWS[plotter.directory_name] for plotter in plotters]
+
+    assert run() == [1, 1, 1]
+    assert run() == [1, 1, 1]
+    plotters[1].values *= 2
+    os.remove(os.path.join(output_dir, "c.txt"))
+    assert run() == [1, 2, 2]
+    assert run() == [1, 2, 2]
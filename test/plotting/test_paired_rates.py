@@ -0,0 +1,102 @@
+from __future__ import print_function
+from cmsl1t.plotting.paired_rates import PairedRatesPlot
+from cmsl1t.plotting.rates import RatesPlot
+from cmsl1t.plotting.rate_vs_pileup import RateVsPileupPlot
+import cmsl1t.hist.binning as bn
+import numpy as np
+import pytest
+
+PU_BINS = [0, 25, 50, 999]
+THRESHOLDS = [20, 50]
+
+
+def fake_data(n_points=1000):
+    pileup = np.random.uniform(0, 80, n_points)
+    hw = np.random.uniform(0, 100, n_points)
+    emu = hw.copy()
+    emu[:10] += 40
+    return pileup, hw, emu
+
+
+def build(plotter):
+    plotter.build("L1 Test", PU_BINS, THRESHOLDS, 100, 0, 200, 16, 0, 80)
+    plotter.set_plot_output_cfg("tests/outputs", "png")
+    return plotter
+
+
+def test_paired_matches_separate_plots():
+    pileup, hw, emu = fake_data()
+    paired = build(PairedRatesPlot("Test"))
+    separate = {}
+    for name in ["Test", "Test_Emu"]:
+        rates = RatesPlot(name)
+        rates.build("L1 " + name, PU_BINS, 100, 0, 200)
+        rate_vs_pileup = RateVsPileupPlot(name)
+        rate_vs_pileup.build("L1 " + name, THRESHOLDS, 16, 0, 80)
+        separate[name] = rates, rate_vs_pileup
+
+    for entry, (pu, on, on_emu) in enumerate(zip(pileup, hw, emu)):
+        paired.fill(pu, on, on_emu, entry)
+        for name, value in [("Test", on), ("Test_Emu", on_emu)]:
+            separate[name][0].fill(pu, value)
+            separate[name][1].fill(pu, value)
+
+    split_rates = paired.to_rates_plots()
+    split_rate_vs_pileup = paired.to_rate_vs_pileup_plots()
+    for i, name in enumerate(["Test", "Test_Emu"]):
+        rates, rate_vs_pileup = separate[name]
+        everything = [bn.Base.everything]
+        assert list(split_rates[i].plots.get_bin_contents(everything).y()) == \
+            list(rates.plots.get_bin_contents(everything).y())
+        for threshold in range(len(THRESHOLDS)):
+            assert list(split_rate_vs_pileup[i].plots.get_bin_contents([threshold]).y()) == \
+                list(rate_vs_pileup.plots.get_bin_contents([threshold]).y())
+        assert split_rates[i].filename_format == rates.filename_format
+
+
+def test_paired_fill_batch():
+    pileup, hw, emu = fake_data()
+    paired = build(PairedRatesPlot("Test"))
+    batched = build(PairedRatesPlot("Test"))
+    for entry, (pu, on, on_emu) in enumerate(zip(pileup, hw, emu)):
+        paired.fill(pu, on, on_emu, entry)
+    batched.fill_batch(pileup, hw, emu, np.arange(len(hw)))
+
+    everything = [bn.Base.everything]
+    assert list(batched.rates.get_bin_contents(everything).z()) == \
+        list(paired.rates.get_bin_contents(everything).z())
+    assert batched.n_different == paired.n_different == 10
+    assert list(batched.disagreements) == list(paired.disagreements)
+    assert batched.mismatches == paired.mismatches
+
+
+def test_paired_emu_thresholds():
+    pileup, hw, emu = fake_data()
+    emu_thresholds = [25, 60]
+    paired = PairedRatesPlot("Test")
+    paired.build("L1 Test", PU_BINS, THRESHOLDS, 100, 0, 200, 16, 0, 80,
+                 emu_thresholds=emu_thresholds)
+    separate = RateVsPileupPlot("Test_Emu")
+    separate.build("L1 Test_Emu", emu_thresholds, 16, 0, 80)
+    for entry, (pu, on, on_emu) in enumerate(zip(pileup, hw, emu)):
+        paired.fill(pu, on, on_emu, entry)
+        separate.fill(pu, on_emu)
+
+    split = paired.to_rate_vs_pileup_plots()[1]
+    assert split.thresholds.bins == emu_thresholds
+    for threshold in range(len(emu_thresholds)):
+        assert list(split.plots.get_bin_contents([threshold]).y()) == \
+            list(separate.plots.get_bin_contents([threshold]).y())
+
+    batched = PairedRatesPlot("Test")
+    batched.build("L1 Test", PU_BINS, THRESHOLDS, 100, 0, 200, 16, 0, 80,
+                  emu_thresholds=emu_thresholds)
+    batched.fill_batch(pileup, hw, emu, np.arange(len(hw)))
+    assert list(batched.disagreements) == list(paired.disagreements)
+    everything = [bn.Base.everything]
+    assert list(batched.rate_vs_pileup.get_bin_contents(everything).z()) == \
+        list(paired.rate_vs_pileup.get_bin_contents(everything).z())
+
+    with pytest.raises(ValueError):
+        PairedRatesPlot("Test").build("L1 Test", PU_BINS, THRESHOLDS, 100, 0,
+                                      200, 16, 0, 80, emu_thresholds=[25])
@@ -0,0 +1,57 @@
+import os
+import signal
+import tempfile
+from cmsl1t.plotting import render as render_module
+from cmsl1t.plotting.render import PlotTask, render
+
+
+class FakePlotter(object):
+
+    def __init__(self, output_dir, name):
+        self.directory_name = name
+        self.filename = os.path.join(output_dir, name + ".txt")
+
+    def draw(self, text="draw"):
+        with open(self.filename, "w") as output:
+            output.write(text)
+
+    def fail(self):
+        raise RuntimeError("cannot draw " + self.directory_name)
+
+    def crash(self):
+        os.kill(os.getpid(), signal.SIGKILL)
+
+
+def test_render_serial():
+    output_dir = tempfile.mkdtemp()
+    plotters = [FakePlotter(output_dir, "plot_{0}".format(i)) for i in range(3)]
+    tasks = [PlotTask(plotter, "draw", "text") for plotter in plotters]
+    assert render(tasks, n_workers=1)
+    for plotter in plotters:
+        with open(plotter.filename) as output:
+            assert output.read() == "text"
+
+    # failures are logged and reported like in the workers, not raised
+    tasks.insert(0, PlotTask(plotters[0], "fail"))
+    assert not render(tasks, n_workers=1)
+
+
+def test_render_parallel():
+    output_dir = tempfile.mkdtemp()
+    plotters = [FakePlotter(output_dir, "plot_{0}".format(i)) for i in range(5)]
+    tasks = [PlotTask(plotter) for plotter in plotters]
+    tasks.append(PlotTask(plotters[0], "fail"))
+    assert not render(tasks, n_workers=3)
+    assert sorted(os.listdir(output_dir)) == \
+        sorted(os.path.basename(p.filename) for p in plotters)
+
+
+def test_crashed_worker_is_reported(monkeypatch):
+    monkeypatch.setattr(render_module, '_set_batch_mode', lambda: None)
+    output_dir = tempfile.mkdtemp()
+    plotters = [FakePlotter(output_dir, "plot_{0}".format(i)) for i in range(4)]
+    tasks = [PlotTask(plotter) for plotter in plotters]
+    tasks.insert(1, PlotTask(plotters[0], "crash"))
+    assert not render(tasks, n_workers=2)
+    assert sorted(os.listdir(output_dir)) == \
+        sorted(os.path.basename(p.filename) for p in plotters)
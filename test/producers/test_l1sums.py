@@ -0,0 +1,48 @@
+import imp
+import os
+import sys
+import types
+from cmsl1t.energySums import EnergySum, Met
+from cmsl1t.producers import l1sums
+
+CMSL1T = os.path.join(os.path.dirname(__file__), '..', '..', 'bin', 'cmsl1t')
+INPUTS = ['l1Sum_sumBx', 'l1Sum_type', 'l1Sum_et', 'l1Sum_phi']
+
+
+class FakeEvent(dict):
+    pass
+
+
+def _fake_ROOT():
+    names = ['kTotalEt', 'kTotalEtHF', 'kTotalHt', 'kTotalHtHF', 'kMissingEt',
+             'kMissingEtHF', 'kMissingHt', 'kTotalEtx', 'kTotalEty']
+    EtSum = type('EtSum', (object, ), dict(zip(names, range(len(names)))))
+    ROOT = types.ModuleType('ROOT')
+    ROOT.l1t = types.ModuleType('l1t')
+    ROOT.l1t.EtSum = EtSum
+    return ROOT
+
+
+def test_load_producer_without_reader(monkeypatch, tmpdir):
+    # The data formats library is only loaded once the sum types are needed
+    loaded = []
+    monkeypatch.setattr(l1sums, 'load_L1TNTupleLibrary',
+                        lambda: loaded.append(True))
+    monkeypatch.setattr(l1sums, '_energySumLookup', None)
+    monkeypatch.setitem(sys.modules, 'ROOT', _fake_ROOT())
+
+    command = imp.load_source('cmsl1t_command', CMSL1T)
+    output_cfg = dict(folder=str(tmpdir), plots_folder=str(tmpdir))
+    producer = command.load_producer(
+        dict(name='l1Sums', module='cmsl1t.producers.l1sums', inputs=INPUTS,
+             outputs=['l1Sums']), output_cfg)
+    assert loaded == []
+
+    event = FakeEvent(l1Sum_sumBx=[0, 0, 1], l1Sum_type=[0, 4, 0],
+                      l1Sum_et=[100., 50., 10.], l1Sum_phi=[0., 1., 0.])
+    assert producer.produce(event)
+    assert loaded == [True]
+    assert isinstance(event.l1Sums_Ett, EnergySum)
+    assert event.l1Sums_Ett.et == 100.
+    assert isinstance(event.l1Sums_Met, Met)
+    assert event.l1Sums_Met.phi == 1.
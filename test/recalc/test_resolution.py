@@ -60,3 +60,16 @@ def test_resolution_position_2D():
     assert funcs.resolution_position_2D([1, 1], [1, 1]) == 0
     assert funcs.resolution_position_2D([1, 1], [-1, -1]) == 2 * sqrt(2)
     assert funcs.resolution_position_2D([1, 1], [1, -1]) == 2
+
+
+def test_resolution_arrays():
+    online = np.radians([10, 100, 15, 340, 300])
+    offline = np.radians([100, 10, 340, 15, 333])
+    expected = [funcs.resolution_phi(on, off) for on, off in zip(online, offline)]
+    assert funcs.resolution_phi_array(online, offline) == pytest.approx(expected)
+
+    online = np.array([10., 100., 0., 0.])
+    offline = np.array([100., 10., 100., 0.])
+    result = funcs.resolution_energy_array(online, offline)
+    assert result[:3] == pytest.approx([-0.9, 9., -1.])
+    assert np.isnan(result[3])
@@ -1,4 +1,5 @@
 from cmsl1t.config import (ConfigParser, resolve_file_paths)
+from copy import deepcopy
 import yaml
 
 import pyfakefs.fake_filesystem as fake_fs
@@ -148,3 +149,39 @@ def test_input_section_missing_files():
         config_with_missing_files = yaml.load(bad_input_files)
 
         pytest.raises(IOError, parser._read_config, config_with_missing_files)
+
+
+def test_static_validation():
+    def no_imports(name):
+        raise AssertionError("Imported " + name)
+    with patch('glob.glob', glob.glob), \
+            patch('cmsl1t.utils.module.exists', no_imports):
+        parser = ConfigParser(static=True)
+        parser._read_config(yaml.load(TEST_CONFIG))
+        assert parser.get('analysis', 'analyzers')[0]['module'] == \
+            'cmsl1t.analyzers.demo_analyzer'
+
+        parser = ConfigParser(static=True)
+        config_with_invalid_analyzer = yaml.load(
+            TEST_CONFIG.replace('cmsl1t.analyzers.demo_analyzer',
+                                'cmsl1t.analyzers.ben'))
+        pytest.raises(IOError, parser._read_config,
+                      config_with_invalid_analyzer)
+
+
+def test_unsupported_trees():
+    config = yaml.load(TEST_CONFIG.replace(
+        'cmsl1t.analyzers.demo_analyzer',
+        'cmsl1t.analyzers.jetMet_analyzer_columnar'))
+    with patch('glob.glob', glob.glob):
+        parser = ConfigParser(static=True)
+        parser._read_config(deepcopy(config))
+
+        config['analysis']['load_trees'] = ['event', 'genTree']
+        parser = ConfigParser(static=True)
+        pytest.raises(IOError, parser._read_config, deepcopy(config))
+
+        del config['analysis']['load_trees']
+        config['analysis']['analyzers']['demo1']['load_trees'] = ['genTree']
+        parser = ConfigParser(static=True)
+        pytest.raises(IOError, parser._read_config, config)
@@ -0,0 +1,44 @@
+import json
+import subprocess
+import sys
+
+# Modules needed by the commands that do not read any events (--help, config
+# checks, batch status); ROOT and rootpy are only loaded once they are used
+LIGHT_MODULES = [
+    'cmsl1t.config',
+    'cmsl1t.io',
+    'cmsl1t.io.eventreader',
+    'cmsl1t.io.batchreader',
+    'cmsl1t.utils.root_glob',
+    'cmsl1t.analyzers.BaseAnalyzer',
+]
+BUDGET_SECONDS = 1.
+
+MEASURE = '''
+import json, sys, time
+start = time.time()
+for name in sys.argv[1:]:
+    __import__(name)
+print(json.dumps({
+    'seconds': time.time() - start,
+    'loaded': sorted(set(m.split('.')[0] for m in sys.modules
+                         if m.split('.')[0] in ['ROOT', 'rootpy'])),
+}))
+'''
+
+
+def _measure(modules):
+    # A fresh interpreter, as the modules may already be loaded in this one
+    output = subprocess.check_output([sys.executable, '-c', MEASURE] + modules,
+                                     stderr=subprocess.STDOUT)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def test_no_ROOT_at_import():
+    assert _measure(LIGHT_MODULES)['loaded'] == []
+
+
+def test_import_time_budget():
+    # best of three, to be robust against a busy machine
+    seconds = min(_measure(LIGHT_MODULES)['seconds'] for _ in range(3))
+    assert seconds < BUDGET_SECONDS
@@ -0,0 +1,52 @@
+import numpy as np
+from cmsl1t.jagged import JaggedArray
+
+LISTS = [[1., 5., 3.], [], [2.], [4., 4.]]
+
+
+def test_from_lists():
+    jagged = JaggedArray.from_lists(LISTS)
+    assert len(jagged) == 4
+    assert jagged.counts.tolist() == [3, 0, 1, 2]
+    assert [list(values) for values in jagged] == LISTS
+
+
+def test_parents_and_local_index():
+    jagged = JaggedArray.from_lists(LISTS)
+    assert jagged.parents.tolist() == [0, 0, 0, 2, 3, 3]
+    assert jagged.local_index.tolist() == [0, 1, 2, 0, 0, 1]
+
+
+def test_select_events():
+    jagged = JaggedArray.from_lists(LISTS)
+    selected = jagged[np.array([True, True, False, True])]
+    assert [list(values) for values in selected] == [[1., 5., 3.], [], [4., 4.]]
+    selected = jagged[np.array([3, 0])]
+    assert [list(values) for values in selected] == [[4., 4.], [1., 5., 3.]]
+
+
+def test_select_elements():
+    jagged = JaggedArray.from_lists(LISTS)
+    selected = jagged.select(jagged.content > 2.)
+    assert [list(values) for values in selected] == [[5., 3.], [], [], [4., 4.]]
+
+
+def test_reductions():
+    jagged = JaggedArray.from_lists(LISTS)
+    assert jagged.max().tolist() == [5., 0., 2., 4.]
+    assert jagged.max(empty=-1).tolist() == [5., -1., 2., 4.]
+    assert jagged.sum().tolist() == [9., 0., 2., 8.]
+    assert jagged.first().tolist() == [1., 0., 2., 4.]
+    assert jagged.last().tolist() == [3., 0., 2., 4.]
+
+
+def test_argmax():
+    jagged = JaggedArray.from_lists(LISTS)
+    # ties go to the first element of an event
+    assert jagged.argmax().tolist() == [1, -1, 3, 4]
+
+
+def test_empty():
+    jagged = JaggedArray.from_lists([[], []])
+    assert jagged.max().tolist() == [0., 0.]
+    assert jagged.argmax().tolist() == [-1, -1]
@@ -33,3 +33,23 @@ def test_pfjet():
     assert jet.nemef == 6
     assert jet.nhef == 7
     assert jet.nMult == 8
+
+
+def test_match_batch():
+    from cmsl1t.jet import match, match_batch
+    from cmsl1t.jagged import JaggedArray
+    l1_jets = [[Jet(40, 0.1, 0.1), Jet(30, 2.2, 1.3)], [], [Jet(30, 4., 3.)]]
+    eta = JaggedArray.from_lists([[j.eta for j in jets] for jets in l1_jets])
+    phi = JaggedArray.from_lists([[j.phi for j in jets] for jets in l1_jets])
+    refs = [(0, Jet(35, 2., 1.3)), (0, Jet(35, 0., 0.)), (1, Jet(35, 0., 0.)),
+            (2, Jet(35, 0., 0.))]
+
+    matched = match_batch([e for e, _ in refs], [j.eta for _, j in refs],
+                          [j.phi for _, j in refs], eta, phi)
+    assert matched.tolist() == [1, 0, -1, -1]
+    for (event, ref), index in zip(refs, matched):
+        expected = match(ref, l1_jets[event])
+        if expected is None:
+            assert index == -1
+        else:
+            assert eta.content[index] == expected.eta
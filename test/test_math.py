@@ -1,6 +1,7 @@
 from __future__ import print_function
 import unittest
-from cmsl1t.math import _reversed_cumulative_sum
+import numpy as np
+from cmsl1t.math import _reversed_cumulative_sum, reversed_cumulative_sum_inplace
 
 
 class TestMath(unittest.TestCase):
@@ -10,3 +11,11 @@ class TestMath(unittest.TestCase):
         expected = [10, 9, 7, 4]
         result = _reversed_cumulative_sum(values).tolist()
         self.assertListEqual(result, expected)
+
+    def test_reversed_cumulative_sum_inplace(self):
+        for dtype in [np.float64, np.float32, np.int32]:
+            values = np.array([1, 2, 3, 4], dtype=dtype)
+            view = values[:]
+            reversed_cumulative_sum_inplace(view)
+            self.assertListEqual(values.tolist(), [10, 9, 7, 4])
+            self.assertEqual(values.dtype, dtype)
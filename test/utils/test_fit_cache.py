@@ -0,0 +1,120 @@
+import os
+import tempfile
+import cmsl1t.utils.fit_efficiency as fit
+from cmsl1t.utils.fit_cache import FitCache, FitRequest, fit_efficiencies
+from rootpy.plotting import F1, Hist
+try:
+    from unittest.mock import patch  # In Python 3, mock is built-in
+except ImportError:
+    from mock import patch
+
+
+def FakeEff(in_mean, in_sigma):
+    in_func = F1("TMath::Gaus(x,{},{},true)".format(in_mean, in_sigma), 0, 100)
+    resolution = Hist(50, 0, 100)
+    n_events = 200000
+    resolution.FillRandom(in_func.name, n_events)
+    resolution.Scale(1. / n_events)
+    return resolution.GetCumulative()
+
+
+def test_summarize_and_restore_fit():
+    params = fit.fit_efficiency(FakeEff(35., 10.), 30, 10, True)
+    restored = fit.restore_fit(fit.summarize_fit(params), FakeEff(35., 10.))
+    for name in ["mu", "sigma_inv", "lambda_sigma", "sigma", "lambda"]:
+        assert restored[name] == params[name]
+    assert restored["success"] == params["success"]
+    assert restored["asymmetric"].GetNpar() == 3
+
+
+def test_fit_efficiencies_uses_cache():
+    cache = FitCache(tempfile.mkdtemp())
+    requests = [FitRequest(FakeEff(mean, 10.), mean - 5)
+                for mean in [35., 60.]]
+    requests[1].neighbour = requests[0]
+
+    first = fit_efficiencies(requests, n_workers=2, cache=cache)
+    assert all(params["success"] for params in first)
+    for request in requests:
+        assert cache.get(request.key) is not None
+
+    def no_fit(*args, **kwargs):
+        raise AssertionError("Should have been read from the cache")
+    for request in requests:
+        request.fit = no_fit
+    second = fit_efficiencies(requests, cache=cache)
+    for before, after in zip(first, second):
+        assert before["mu"] == after["mu"]
+        assert before["lambda"] == after["lambda"]
+
+
+class SeedRecorder(FitRequest):
+    seeds = []
+
+    def fit(self, in_lambda_sigma=0.03):
+        self.seeds.append((self.name, in_lambda_sigma))
+        return {"parameters": [[0, 0, 0], [0, 0, self.in_mean / 100.]]}
+
+
+def test_fit_efficiencies_seeds_from_neighbours():
+    requests = [SeedRecorder([threshold], threshold, name=str(threshold))
+                for threshold in [20, 30, 40]]
+    for request, neighbour in zip(requests[1:], requests):
+        request.neighbour = neighbour
+    cache = FitCache(tempfile.mkdtemp())
+    del SeedRecorder.seeds[:]
+    with patch('cmsl1t.utils.fit_cache.restore_fit', lambda s, *args: s):
+        fit_efficiencies(requests[::-1], n_workers=1)
+        # first the seeds, then the thresholds seeded from them
+        seeds = SeedRecorder.seeds
+        assert sorted(seeds[:2]) == [('20', 0.03), ('30', 0.03)]
+        assert sorted(seeds[2:]) == [('30', 0.2), ('40', 0.3)]
+
+        # with the seeds in the cache, only the seeded fits are left
+        for request in requests[:2]:
+            cache.put(request.base_key, request.fit())
+        del SeedRecorder.seeds[:]
+        fit_efficiencies(requests, n_workers=1, cache=cache)
+        assert SeedRecorder.seeds == [('30', 0.2), ('40', 0.3)]
+
+
+class FakePool(object):
+    created = 0
+
+    def __init__(self, n_workers):
+        FakePool.created += 1
+
+    def map(self, function, tasks, chunksize=None):
+        FakePool.rounds.append(len(tasks))
+        return [function(task) for task in tasks]
+
+    def close(self):
+        pass
+
+    def join(self):
+        pass
+
+
+def test_fit_efficiencies_in_two_rounds():
+    requests = [SeedRecorder([threshold], threshold, name=str(threshold))
+                for threshold in [20, 30, 40, 50]]
+    for request, neighbour in zip(requests[1:], requests):
+        request.neighbour = neighbour
+    FakePool.rounds = []
+    with patch('cmsl1t.utils.fit_cache.restore_fit', lambda s, *args: s), \
+            patch('cmsl1t.utils.fit_cache._create_pool', FakePool):
+        fit_efficiencies(requests, n_workers=4)
+    # one pool, the three seeds in parallel, then the three seeded fits
+    assert FakePool.created == 1
+    assert FakePool.rounds == [3, 3]
+
+
+def test_fit_cache_eviction():
+    cache = FitCache(tempfile.mkdtemp(), max_entries=2)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, {"parameters": []})
+        os.utime(cache._filename(key), (i, i))
+    cache.get("a")
+    assert cache.evict() == 1
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
@@ -0,0 +1,52 @@
+import numpy as np
+import cmsl1t.utils.fit_efficiency as fit
+import cmsl1t.utils.fit_efficiency_numpy as fit_numpy
+from rootpy.plotting import F1
+
+
+def fake_counts(parameters, n_per_bin=2000, seed=1,
+                model=fit_numpy.asymmetric_model):
+    random = np.random.RandomState(seed)
+    x = np.arange(2.5, 200, 5.)
+    p = model(x[None], np.array([parameters]))[0]
+    total = random.poisson(n_per_bin, len(x)).astype(float)
+    passed = random.binomial(total.astype(int), np.clip(p, 0, 1))
+    return x, passed.astype(float), total
+
+
+def test_models_match_root_formulas():
+    x = np.linspace(0, 200, 41)
+    for formula, model, parameters in [
+            (fit.get_symmetric_formula(), fit_numpy.symmetric_model,
+             [60., 0.05]),
+            (fit.get_asymmetric_formula(), fit_numpy.asymmetric_model,
+             [60., 0.05, 0.7])]:
+        func = F1(formula, 0, 200)
+        func.SetParameters(*parameters)
+        expected = [func.Eval(value) for value in x]
+        values = model(x[None], np.array([parameters]))[0]
+        assert np.allclose(values, expected)
+
+
+def test_fit_counts():
+    truths = [[50., 0.06, 0.9], [80., 0.08, 0.5], [120., 0.05, 1.2]]
+    counts = [fake_counts(truth, seed=i) for i, truth in enumerate(truths)]
+    summaries = fit_numpy.fit_counts(
+        [c[0] for c in counts], [c[1] for c in counts], [c[2] for c in counts],
+        [t[0] - 10 for t in truths])
+    for truth, summary in zip(truths, summaries):
+        assert summary["success"]
+        parameters = np.array(summary["parameters"][1])
+        errors = np.array(summary["errors"][1])
+        assert np.all(np.abs(parameters - truth) < 5 * errors)
+
+
+def test_fit_counts_symmetric():
+    x, passed, total = fake_counts([70., 0.05], model=fit_numpy.symmetric_model)
+    summary, = fit_numpy.fit_counts([x], [passed], [total], 60, 10,
+                                    asymmetric=False)
+    assert summary["success"]
+    assert len(summary["parameters"]) == 1
+    parameters = np.array(summary["parameters"][0])
+    errors = np.array(summary["errors"][0])
+    assert np.all(np.abs(parameters - [70., 0.05]) < 5 * errors)
@@ -0,0 +1,22 @@
+import sys
+from cmsl1t import registry
+from cmsl1t.utils.module import find
+
+
+def test_find(monkeypatch):
+    # other tests may have imported it already
+    monkeypatch.delitem(sys.modules, 'cmsl1t.analyzers.demo_analyzer',
+                        raising=False)
+    assert find('cmsl1t.analyzers.demo_analyzer')
+    assert find('cmsl1t.recalc.met.l1MetNot28')
+    assert not find('cmsl1t.analyzers.no_analyzer')
+    assert not find('cmsl1t.no_package.demo_analyzer')
+    assert not find('no_package')
+    assert 'cmsl1t.analyzers.demo_analyzer' not in sys.modules
+
+
+def test_registry():
+    for name in registry.ANALYZERS:
+        assert find(name + '.Analyzer'), name
+    for name in registry.PRODUCERS:
+        assert find(name + '.Producer'), name
@@ -1,3 +1,5 @@
+import itertools
+import time
 import pytest
 
 import pyfakefs.fake_filesystem as fake_fs
@@ -53,3 +55,93 @@ def test_glob_xrootd_wildcard():
     filename = "root://lcgse01.phy.bris.ac.uk///cms/store/PhEDEx_LoadTest07/"\
         "LoadTest07_Debug_T2_UK_SGrid_Bristol/*"
     assert len(root_glob(filename)) == 256
+
+
+class FakeSystem(object):
+    ''' Stands in for gSystem with a remote file system of listings '''
+
+    def __init__(self, listings, log):
+        self.listings = listings
+        self.log = log
+
+    @property
+    def listed(self):
+        ''' Directories listed so far, also by worker processes '''
+        if not self.log.check():
+            return []
+        return self.log.read().splitlines()
+
+    def ExpandPathName(self, path):
+        return path
+
+    def AccessPathName(self, path):
+        dirname, basename = path.rsplit('/', 1)
+        return basename not in self.listings.get(dirname, [])
+
+
+REMOTE = 'root://eoscms.cern.ch//eos/cms/store/L1Ntuples'
+LISTINGS = {
+    REMOTE: ['0000', '0001', 'log'],
+    REMOTE + '/0000': ['L1Ntuple_1.root', 'L1Ntuple_2.root', 'crab.log'],
+    REMOTE + '/0001': ['L1Ntuple_3.root'],
+}
+
+
+@pytest.fixture
+def remote(tmpdir):
+    from cmsl1t.utils import root_glob as module
+    system = FakeSystem(LISTINGS, tmpdir.join('listed'))
+
+    def list_directory(dirname):
+        system.log.write(dirname + '\n', mode='a')
+        return LISTINGS.get(dirname)
+    with patch.object(module, 'gSystem', system), \
+            patch.object(module, '_list_directory', list_directory):
+        yield system
+
+
+def test_glob_many(remote):
+    from cmsl1t.utils.root_glob import glob_many
+    patterns = [REMOTE + '/000*/L1Ntuple_*.root', REMOTE + '/0001/*.log',
+                REMOTE + '/0000/L1Ntuple_2.root']
+    expected = [REMOTE + '/0000/L1Ntuple_1.root',
+                REMOTE + '/0000/L1Ntuple_2.root',
+                REMOTE + '/0001/L1Ntuple_3.root',
+                REMOTE + '/0000/L1Ntuple_2.root']
+    assert glob_many(patterns, workers=4) == expected
+    assert glob_many(patterns, workers=1) == expected
+
+
+def test_listings_overlap(remote, tmpdir):
+    from cmsl1t.utils import root_glob as module
+    times = tmpdir.join('times')
+
+    def list_directory(dirname):
+        start = time.time()
+        # Like a TSystem call, this keeps the GIL until it returns
+        sum(itertools.repeat(1, 10 ** 7))
+        times.write('{0} {1}\n'.format(start, time.time()), mode='a')
+        return ['L1Ntuple_1.root']
+    pattern = [REMOTE + '/000{0}/*.root'.format(i) for i in range(4)]
+    with patch.object(module, '_list_directory', list_directory):
+        assert len(module.glob_many(pattern, workers=4)) == 4
+    starts, stops = zip(*[map(float, line.split())
+                          for line in times.read().splitlines()])
+    # all four listings were under way at the same time
+    assert max(starts) < min(stops)
+
+
+def test_listing_cache(remote, tmpdir):
+    from cmsl1t.utils.root_glob import glob_many, ListingCache
+    cache = ListingCache(str(tmpdir), ttl=60)
+    pattern = [REMOTE + '/000*/L1Ntuple_*.root']
+    first = glob_many(pattern, workers=4, cache=cache)
+    assert len(remote.listed) == 3
+    assert glob_many(pattern, workers=4, cache=cache) == first
+    assert len(remote.listed) == 3
+    assert cache.get(REMOTE + '/0001') == ['L1Ntuple_3.root']
+
+    cache.ttl = -1
+    assert cache.get(REMOTE + '/0001') is None
+    glob_many(pattern, workers=4, cache=cache)
+    assert len(remote.listed) == 6
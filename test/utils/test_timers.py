@@ -1,6 +1,10 @@
 from __future__ import print_function
 import unittest
-from cmsl1t.utils.timers import timerfunc, timerfunc_log_to
+import json
+import tempfile
+import time
+from cmsl1t.utils.timers import timerfunc, timerfunc_log_to, StageTimers, \
+    timed_events
 
 
 def simple_logger(*args):
@@ -17,6 +21,21 @@ def wrapping_method_with_logger():
     pass
 
 
+class FakeReader(object):
+    ''' 30 events in files of 10, opening a file takes 0.05 s '''
+    first_event = 0
+
+    def __init__(self):
+        self.files_opened = 0
+
+    def __iter__(self):
+        for entry in range(30):
+            if entry % 10 == 0:
+                time.sleep(0.05)
+                self.files_opened += 1
+            yield entry
+
+
 class TestTimerfunc(unittest.TestCase):
 
     def test_wrapping(self):
@@ -26,3 +45,43 @@ class TestTimerfunc(unittest.TestCase):
     def test_wrapping_withlogger(self):
         wrapped = getattr(wrapping_method_with_logger, "__wrapped__")
         self.assertEqual(wrapped.__name__, 'wrapping_method_with_logger')
+
+
+class TestStageTimers(unittest.TestCase):
+
+    def test_sampling(self):
+        timers = StageTimers(sample_every=10)
+        sampled = [entry for entry in range(100) if timers.sampled(entry)]
+        self.assertEqual(sampled, list(range(0, 100, 10)))
+
+    def test_profile(self):
+        timers = StageTimers(sample_every=10)
+        for _ in range(5):
+            timers.add('read', 0.1)
+            self.assertEqual(timers.call('analyze', max, 1, 2), 2)
+        timers.add('batches', 1., n_events=100, sampled=False)
+        stages = timers.profile()['stages']
+        self.assertEqual(list(stages), ['read', 'analyze', 'batches'])
+        self.assertAlmostEqual(stages['read']['estimated_seconds'], 5.)
+        self.assertAlmostEqual(stages['read']['seconds_per_event'], 0.1)
+        self.assertAlmostEqual(stages['batches']['estimated_seconds'], 1.)
+        self.assertAlmostEqual(stages['batches']['seconds_per_event'], 0.01)
+        self.assertAlmostEqual(sum(s['fraction'] for s in stages.values()), 1.)
+        self.assertIn('analyze', timers.summary())
+
+        filename = tempfile.mktemp(suffix='.json')
+        timers.write_json(filename)
+        with open(filename) as profile:
+            self.assertEqual(json.load(profile)['sample_every'], 10)
+
+    def test_timed_events(self):
+        timers = StageTimers(sample_every=4)
+        events = list(timed_events(FakeReader(), timers))
+        self.assertEqual(events, [(entry, entry) for entry in range(30)])
+        stages = timers.profile()['stages']
+        # every file is counted once, and not as events
+        self.assertEqual(stages['open files']['sampled_events'], 0)
+        self.assertGreater(stages['open files']['estimated_seconds'], 0.15)
+        # entries 0, 4, ..., 28 without 0 and 20, which opened files
+        self.assertEqual(stages['read']['sampled_events'], 6)
+        self.assertLess(stages['read']['estimated_seconds'], 0.05)